@@ -0,0 +1,134 @@
+"""Analyse hors ligne de positions en lot.
+
+Lit des positions JSONL (une par ligne, au format `state` des requêtes play,
+ou la requête play entière) et écrit pour chacune, dans le même ordre, le
+meilleur coup, son score et le nombre de nœuds, en JSONL. L'entrée est lue au
+fil de l'eau et au plus `--window` positions sont en cours à la fois : la
+mémoire ne dépend pas de la taille du fichier. Les fichiers .gz sont lus et
+écrits compressés.
+
+    python analyse_quarto.py parties.jsonl.gz --depth 5 --workers 8 --output analyses.jsonl
+    python analyse_quarto.py - --seconds 0.5 < positions.jsonl
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from collections import deque
+from multiprocessing import Pool
+
+import projet_quarto as pq
+
+_searcher = None
+
+
+def _init_worker(tt_mb):
+    global _searcher
+    _searcher = pq.Searcher(pq.TranspositionTable(tt_mb))
+
+
+def analyse_position(state, depth=None, seconds=None):
+    """Meilleur coup joint de la position à profondeur fixe ou en temps limité.
+
+    La table de transposition du processus est gardée d'une position à
+    l'autre ; le solveur exact n'est pas utilisé, pour que `depth` garde son
+    sens.
+    """
+    global _searcher
+    if _searcher is None:
+        _init_worker(pq.TT_SIZE_MB)
+    masks, piece, remaining = pq.parse_state(state)
+    deadline = time.monotonic() + seconds if seconds is not None else None
+    start = time.perf_counter()
+    result = _searcher.search(masks, remaining, piece, deadline, depth)
+    return {
+        "pos": result.pos,
+        "piece": pq.PIECE_NAMES[result.piece] if result.piece is not None else None,
+        "score": pq.json_number(result.score),
+        "depth": result.depth,
+        "nodes": result.nodes,
+        "ms": round((time.perf_counter() - start) * 1000, 2),
+    }
+
+
+def _analyse_line(job):
+    """Analyse une ligne JSONL ; une ligne invalide donne un champ `error`"""
+    number, line, depth, seconds = job
+    record = {"line": number}
+    try:
+        item = json.loads(line)
+        if "id" in item:
+            record["id"] = item["id"]
+        state = item.get("state", item)
+        if pq.check_winner(state["board"]) or None not in state["board"]:
+            raise ValueError("partie terminée")
+        record.update(analyse_position(state, depth, seconds))
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def analyse_stream(lines, depth=None, seconds=None, workers=1, window=None, tt_mb=pq.TT_SIZE_MB):
+    """Itère sur les analyses des lignes, dans leur ordre, sans lire plus de
+    `window` lignes d'avance (lignes vides ignorées)"""
+    jobs = ((number, line, depth, seconds) for number, line in enumerate(lines, 1) if line.strip())
+    if workers <= 1:
+        _init_worker(tt_mb)
+        yield from map(_analyse_line, jobs)
+        return
+    window = window or 4 * workers
+    with Pool(workers, initializer=_init_worker, initargs=(tt_mb,)) as pool:
+        pending = deque()
+        for job in jobs:
+            pending.append(pool.apply_async(_analyse_line, (job,)))
+            if len(pending) >= window:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
+
+
+def open_text(path, mode):
+    """Fichier texte, compressé si son nom finit par .gz ; '-' : entrée ou sortie standard"""
+    if path == "-":
+        return sys.stdin if mode == "r" else sys.stdout
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="fichier JSONL des positions ('-' : entrée standard)")
+    budget = parser.add_mutually_exclusive_group()
+    budget.add_argument("--depth", type=int, help="profondeur fixe, en coups joints")
+    budget.add_argument("--seconds", type=float, help="temps de recherche par position")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="nombre de processus")
+    parser.add_argument("--window", type=int, help="positions en cours au plus (défaut : 4 par processus)")
+    parser.add_argument("--tt-mb", type=int, default=pq.TT_SIZE_MB, help="table de transposition par processus")
+    parser.add_argument("--output", default="-", help="fichier JSONL des analyses ('-' : sortie standard)")
+    args = parser.parse_args(argv)
+    if args.depth is None and args.seconds is None:
+        args.depth = 4
+    source = open_text(args.input, "r")
+    sink = open_text(args.output, "w")
+    errors = 0
+    try:
+        for record in analyse_stream(source, args.depth, args.seconds, args.workers, args.window, args.tt_mb):
+            errors += "error" in record
+            sink.write(json.dumps(record) + "\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if sink is not sys.stdout:
+            sink.close()
+        else:
+            sink.flush()
+    if errors:
+        print(f"{errors} ligne(s) invalide(s)", file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,384 @@
+"""Serveur de tournoi local et arène de parties moteur contre moteur.
+
+    python arena_quarto.py server --port 3000 --games 2
+    python arena_quarto.py arena --games 1000 --workers 8 --set-a TIMEOUT=0.1 \\
+        --b ancien_quarto.py --set-b TIMEOUT=0.1
+
+Le serveur remplace celui du tournoi (SERVER_ADDRESS) hors ligne : mêmes
+requêtes JSON subscribe/ping/play, délai de TIMEOUT secondes, coups vérifiés
+et erreurs renvoyées dans `errors` comme le fait le vrai serveur. L'arène
+joue les parties dans des processus, moteurs appelés directement, avec le
+même arbitre.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import math
+import os
+import random
+import time
+from multiprocessing import Pool
+
+import projet_quarto as pq
+
+LIVES = 3  # coups refusés tolérés avant de perdre la partie
+TIME_LIMIT = pq.TIMEOUT
+
+
+class IllegalMove(Exception):
+    """Coup refusé par l'arbitre"""
+
+
+class Game:
+    """Partie arbitrée : état au format du serveur, légalité des coups, vies et erreurs.
+
+    Un coup est joint : poser la pièce reçue (`pos`, absent au premier coup)
+    puis donner une pièce (`piece`, absente quand il n'en reste plus).
+    """
+    def __init__(self, players, first=0):
+        self.players = list(players)
+        self.current = first
+        self.board = [None] * 16
+        self.piece = None
+        self.winner = None  # indice du gagnant, None pour une nulle
+        self.over = False
+        self.moves = 0
+        self.lives = [LIVES, LIVES]
+        self.errors = [[], []]  # erreurs de chaque joueur, renvoyées avec ses requêtes
+
+    def state(self):
+        return {"players": self.players, "current": self.current, "board": list(self.board), "piece": self.piece}
+
+    def request(self):
+        """Requête play pour le joueur au trait"""
+        return {
+            "request": "play",
+            "lives": self.lives[self.current],
+            "errors": self.errors[self.current],
+            "state": self.state(),
+        }
+
+    def available(self):
+        """Pièces ni sur le plateau ni à placer"""
+        used = set(self.board) | {self.piece}
+        return [name for name in pq.PIECE_NAMES if name not in used]
+
+    def play(self, move):
+        """Applique le coup du joueur au trait ; lève IllegalMove sans rien modifier"""
+        if not isinstance(move, dict):
+            raise IllegalMove(f"coup mal formé : {move!r}")
+        pos, give = move.get("pos"), move.get("piece")
+        board = list(self.board)
+        if self.piece is not None:
+            if not isinstance(pos, int) or isinstance(pos, bool) or not 0 <= pos < 16:
+                raise IllegalMove(f"case invalide : {pos!r}")
+            if board[pos] is not None:
+                raise IllegalMove(f"case {pos} déjà occupée")
+            board[pos] = self.piece
+        won = pq.check_winner(board)
+        remaining = [name for name in pq.PIECE_NAMES if name not in board]
+        if not won and remaining and give not in remaining:
+            raise IllegalMove(f"pièce indisponible : {give!r}")
+        self.board = board
+        self.moves += 1
+        if won:
+            self.winner, self.over = self.current, True
+        elif not remaining:
+            self.over = True
+        else:
+            self.piece = give
+            self.current = 1 - self.current
+
+    def submit(self, move, elapsed, time_limit=TIME_LIMIT):
+        """Arbitre le coup reçu après `elapsed` secondes ; retourne l'erreur enregistrée ou None.
+
+        Un coup hors délai ou illégal coûte une vie et le joueur rejoue la même
+        position ; sans vie restante, il perd la partie.
+        """
+        try:
+            if elapsed > time_limit:
+                raise IllegalMove(f"délai dépassé : {elapsed:.2f} s")
+            self.play(move)
+            return None
+        except IllegalMove as e:
+            return self.forfeit(str(e), move)
+
+    def forfeit(self, message, move=None):
+        """Enregistre une erreur du joueur au trait"""
+        error = {"message": message, "move": move}
+        self.errors[self.current].append(error)
+        self.lives[self.current] -= 1
+        if self.lives[self.current] <= 0:
+            self.winner, self.over = 1 - self.current, True
+        return error
+
+
+def random_move(game, rng):
+    """Coup au hasard qui ne gagne pas et ne donne pas une pièce gagnante quand c'est possible"""
+    masks = pq.board_to_masks(game.board)
+    free = pq.empty_squares(masks[0])
+    rng.shuffle(free)
+    if game.piece is None:
+        free = [None]
+    code = pq.piece_to_code(game.piece) if game.piece is not None else None
+    for pos in free:
+        if pos is not None and pq.wins_with(masks, pos, code):
+            continue
+        placed = pq.place(masks, pos, code) if pos is not None else masks
+        remaining = pq.pieces_to_mask(game.available())
+        safe = remaining & ~pq.deadly_pieces(placed)
+        if safe:
+            return {"pos": pos, "piece": pq.PIECE_NAMES[rng.choice(pq.mask_to_codes(safe))]}
+    return {"pos": free[0], "piece": rng.choice(game.available() or [None])}
+
+
+# Serveur de tournoi local
+async def send_request(address, message, time_limit=None):
+    """Envoie une requête à un joueur et attend sa réponse (asyncio.TimeoutError après time_limit)"""
+    async def exchange():
+        reader, writer = await asyncio.open_connection(*address)
+        try:
+            await pq.write_message(writer, message)
+            return await pq.read_message(reader)
+        finally:
+            writer.close()
+    return await asyncio.wait_for(exchange(), time_limit)
+
+
+class LocalServer:
+    """Serveur de tournoi : inscrit les joueurs, vérifie qu'ils répondent au ping et
+    fait jouer `games` parties à chaque nouveau joueur contre chacun des autres"""
+    def __init__(self, port=3000, host='', games=2, time_limit=TIME_LIMIT):
+        self.port = port
+        self.host = host
+        self.games = games
+        self.time_limit = time_limit
+        self.players = {}  # nom -> (hôte, port)
+        self.results = []  # (joueurs, gagnant ou None, erreurs)
+        self.server = None
+        self.matches = []
+        self.lock = asyncio.Lock()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def close(self):
+        for task in self.matches:
+            task.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def handle(self, reader, writer):
+        try:
+            req = await pq.read_message(reader)
+            if req.get("request") != "subscribe":
+                await pq.write_message(writer, {"response": "error", "error": "requête inconnue"})
+                return
+            host = writer.get_extra_info("peername")[0]
+            name = req["name"]
+            await pq.write_message(writer, {"response": "ok"})
+            self.matches.append(asyncio.create_task(self.register(name, (host, req["port"]))))
+        except Exception as e:
+            print(f"Erreur: {e}")
+        finally:
+            writer.close()
+
+    async def register(self, name, address):
+        try:
+            pong = await send_request(address, {"request": "ping"}, self.time_limit)
+        except (OSError, asyncio.TimeoutError, ValueError) as e:
+            print(f"{name} ne répond pas au ping : {e}")
+            return
+        if pong.get("response") != "pong":
+            print(f"{name} : réponse inattendue au ping {pong}")
+            return
+        opponents = [other for other in self.players if other != name]
+        self.players[name] = address
+        print(f"{name} inscrit ({address[0]}:{address[1]})")
+        for other in opponents:
+            for n in range(self.games):
+                async with self.lock:
+                    await self.play_game([name, other], first=n % 2)
+
+    async def play_game(self, names, first=0):
+        """Joue une partie entre deux joueurs inscrits ; retourne la partie terminée"""
+        game = Game(names, first)
+        while not game.over:
+            player = names[game.current]
+            start = time.perf_counter()
+            try:
+                response = await send_request(self.players[player], game.request(), self.time_limit)
+                move = response.get("move")
+            except asyncio.TimeoutError:
+                game.forfeit(f"délai dépassé : {self.time_limit:.2f} s")
+                continue
+            except (OSError, ValueError) as e:
+                game.forfeit(f"pas de réponse : {e}")
+                continue
+            game.submit(move, time.perf_counter() - start, self.time_limit)
+        winner = names[game.winner] if game.winner is not None else None
+        self.results.append((names, winner, game.errors))
+        print(f"{names[0]} contre {names[1]} : {winner or 'nulle'} en {game.moves} coups")
+        return game
+
+    async def run(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+
+# Arène
+# Un moteur est décrit par (fichier, réglages) : une version de projet_quarto.py
+# et des valeurs données à ses constantes de module (TIMEOUT, CANONICAL_DEPTH...).
+_engines = {}
+
+def load_engine(spec):
+    """Module moteur de `spec`, chargé une fois par processus"""
+    engine = _engines.get(spec)
+    if engine is None:
+        path, overrides = spec
+        module_spec = importlib.util.spec_from_file_location(f"quarto_engine_{len(_engines)}", path)
+        engine = importlib.util.module_from_spec(module_spec)
+        module_spec.loader.exec_module(engine)
+        for name, value in overrides:
+            setattr(engine, name, value)
+        _engines[spec] = engine
+    return engine
+
+
+def play_engines(engines, first=0, random_plies=0, seed=0, time_limit=TIME_LIMIT):
+    """Partie entre deux moteurs chargés ; retourne (gagnant, coups, durées par moteur)"""
+    game = Game(["a", "b"], first)
+    rng = random.Random(seed)
+    for _ in range(random_plies):
+        if game.over:
+            break
+        game.play(random_move(game, rng))
+    latencies = ([], [])
+    while not game.over:
+        engine = engines[game.current]
+        state = game.state()
+        start = time.perf_counter()
+        try:
+            move = {
+                "pos": engine.find_best_pos(state, time.time()),
+                "piece": engine.find_best_piece(state, time.time()),
+            }
+        except Exception as e:
+            game.forfeit(f"exception : {e!r}")
+            continue
+        elapsed = time.perf_counter() - start
+        latencies[game.current].append(elapsed)
+        game.submit(move, elapsed, time_limit)
+    return game.winner, game.moves, latencies
+
+
+def _arena_game(job):
+    """Exécuté dans un processus : une partie de l'arène"""
+    spec_a, spec_b, first, random_plies, seed, time_limit = job
+    engines = (load_engine(spec_a), load_engine(spec_b))
+    return play_engines(engines, first, random_plies, seed, time_limit)
+
+
+def run_arena(spec_a, spec_b, games, workers=None, random_plies=2, seed=0, time_limit=TIME_LIMIT):
+    """Joue `games` parties (premier joueur alterné) ; retourne les résultats et la durée totale"""
+    jobs = [(spec_a, spec_b, n % 2, random_plies, seed + n, time_limit) for n in range(games)]
+    start = time.perf_counter()
+    with Pool(workers) as pool:
+        results = list(pool.imap_unordered(_arena_game, jobs))
+    return results, time.perf_counter() - start
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(results, elapsed):
+    """Score du moteur a (victoire 1, nulle 1/2) avec son intervalle de confiance à 95 %,
+    coups par seconde et distribution des durées de coup de chaque moteur"""
+    scores = [1.0 if winner == 0 else 0.0 if winner == 1 else 0.5 for winner, _, _ in results]
+    n = len(scores)
+    mean = sum(scores) / n
+    variance = sum((s - mean) ** 2 for s in scores) / (n - 1) if n > 1 else 0.0
+    margin = 1.96 * math.sqrt(variance / n)
+    moves = sum(count for _, count, _ in results)
+    summary = {
+        "games": n,
+        "wins_a": scores.count(1.0),
+        "wins_b": scores.count(0.0),
+        "draws": scores.count(0.5),
+        "score_a": mean,
+        "score_a_ci95": (max(0.0, mean - margin), min(1.0, mean + margin)),
+        "moves_per_s": moves / elapsed if elapsed else None,
+    }
+    for i, name in enumerate("ab"):
+        durations = [d for _, _, latencies in results for d in latencies[i]]
+        summary[f"latency_{name}"] = {
+            f"p{int(q * 100)}": percentile(durations, q) for q in (0.5, 0.9, 0.99)
+        }
+        summary[f"latency_{name}"]["max"] = max(durations) if durations else None
+    return summary
+
+
+def parse_overrides(items):
+    """["NOM=valeur", ...] -> réglages (valeur lue en JSON, sinon gardée en texte)"""
+    overrides = []
+    for item in items or ():
+        name, _, text = item.partition("=")
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            value = text
+        overrides.append((name, value))
+    return tuple(sorted(overrides))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serveur de tournoi local et arène Quarto")
+    sub = parser.add_subparsers(dest="command", required=True)
+    server = sub.add_parser("server", help="serveur de tournoi local")
+    server.add_argument("--port", type=int, default=pq.SERVER_ADDRESS[1])
+    server.add_argument("--games", type=int, default=2, help="parties par paire de joueurs")
+    server.add_argument("--time-limit", type=float, default=TIME_LIMIT)
+    arena = sub.add_parser("arena", help="parties moteur contre moteur")
+    arena.add_argument("--a", default=pq.__file__, help="fichier du moteur a")
+    arena.add_argument("--b", default=pq.__file__, help="fichier du moteur b")
+    arena.add_argument("--set-a", action="append", help="réglage NOM=valeur du moteur a")
+    arena.add_argument("--set-b", action="append", help="réglage NOM=valeur du moteur b")
+    arena.add_argument("--games", type=int, default=100)
+    arena.add_argument("--workers", type=int, default=os.cpu_count())
+    arena.add_argument("--random-plies", type=int, default=2, help="coups d'ouverture tirés au hasard")
+    arena.add_argument("--seed", type=int, default=0)
+    arena.add_argument("--time-limit", type=float, default=TIME_LIMIT)
+    arena.add_argument("--output", help="fichier JSON du résumé")
+    args = parser.parse_args(argv)
+    if args.command == "server":
+        asyncio.run(LocalServer(args.port, games=args.games, time_limit=args.time_limit).run())
+    elif args.command == "arena":
+        spec_a = (os.path.abspath(args.a), parse_overrides(args.set_a))
+        spec_b = (os.path.abspath(args.b), parse_overrides(args.set_b))
+        results, elapsed = run_arena(spec_a, spec_b, args.games, args.workers, args.random_plies,
+                                     args.seed, args.time_limit)
+        summary = summarize(results, elapsed)
+        low, high = summary["score_a_ci95"]
+        print(f"{summary['games']} parties : a {summary['wins_a']}, b {summary['wins_b']}, nulles {summary['draws']}")
+        print(f"score de a : {summary['score_a']:.3f} (IC 95 % : {low:.3f} - {high:.3f})")
+        print(f"{summary['moves_per_s']:.1f} coups/s")
+        for name in "ab":
+            latency = summary[f"latency_{name}"]
+            print(f"durée des coups de {name} : " + ", ".join(
+                f"{key} {value * 1000:.0f} ms" for key, value in latency.items() if value is not None))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,288 @@
+"""Mesures de performance du moteur.
+
+    python bench_quarto.py batch     # plateaux/s : evaluate_board scalaire contre le lot NumPy
+    python bench_quarto.py suite     # corpus fixe, comparé à bench_baseline.json
+
+La suite écrit ses mesures en JSON (--output) et échoue (code 1) si l'une
+d'elles se dégrade de plus de --tolerance par rapport à la référence. La
+référence dépend de la machine : la régénérer avec --update-baseline.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows : pas de mémoire maximale
+    resource = None
+
+import projet_quarto as pq
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+# Corpus fixe : (nom, plateau, pièce à placer, profondeur mesurée par time_to_depth).
+# Le nombre du nom est celui des cases vides ; en fin de partie, la recherche va
+# jusqu'au bout (profondeur None) et on mesure aussi le solveur exact.
+CORPUS = (
+    ("opening-16", [None] * 16, "BDEP", 4),
+    ("opening-15", ['BDFC', None, None, None, None, None, None, None, None, None, None, None, None, None, None, None],
+     "SDEP", 4),
+    ("opening-13", [None, None, None, None, None, None, None, 'BLFP', 'SLFP', None, None, 'SDEC', None, None, None, None],
+     "SDFC", 4),
+    ("middlegame-10", [None, None, 'BLEC', 'SDFC', None, None, 'SDEP', None, None, None, 'BDEP', None, None, 'BLFP', None,
+                       'SLFC'], "SLFP", 6),
+    ("middlegame-9", [None, 'BLFC', 'SLEP', 'BLEC', 'BDFC', None, None, None, None, None, None, 'SLFC', 'SDEC', None,
+                      'SLFP', None], "SDFP", 6),
+    ("endgame-9", ['SLEP', None, None, None, None, None, 'SDFC', None, 'BLEP', None, None, 'BDFC', None, 'SDFP', 'SLFP',
+                   'BLFC'], "SDEC", None),
+    ("endgame-8", [None, 'BDFP', None, None, 'BLFP', None, 'SLEC', 'SDFP', 'SDEC', 'SDFC', None, None, 'BLEP', 'SDEP', None,
+                   None], "BLEC", None),
+)
+
+
+def random_boards(count, seed=0):
+    """Plateaux sans ligne gagnante, de 0 à 15 pièces"""
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        masks, _, piece = pq.random_position(rng.randint(1, 16), rng)
+        boards.append(masks)
+    return boards
+
+
+def bench_batch_eval(count=20000, batch_sizes=(16, 256, 4096), seed=0):
+    """Plateaux évalués par seconde : scalaire, faire/défaire incrémental et lots NumPy"""
+    boards = random_boards(count, seed)
+    results = {}
+    start = time.perf_counter()
+    for masks in boards:
+        pq.evaluate_masks(masks)
+        pq.deadly_pieces(masks)
+    results["scalar"] = count / (time.perf_counter() - start)
+
+    # Le coût d'une pose + évaluation + retrait dans la recherche
+    state = pq.SearchState(pq.EMPTY_BOARD, pq.ALL_PIECES & ~1, 0)
+    start = time.perf_counter()
+    for n in range(count):
+        state.play(n % 16)
+        state.evaluate()
+        state.deadly()
+        state.undo_play()
+    results["incremental"] = count / (time.perf_counter() - start)
+
+    if pq.np is not None:
+        rows = pq.boards_to_array(boards)
+        for size in batch_sizes:
+            start = time.perf_counter()
+            for first in range(0, count, size):
+                batch = rows[first:first + size]
+                pq.batch_evaluate(batch)
+                pq.batch_deadly(batch)
+            results[f"numpy_{size}"] = count / (time.perf_counter() - start)
+    return results
+
+
+def corpus_state(board, piece):
+    return {"board": list(board), "piece": piece, "errors": []}
+
+
+def _rate(func, boards, repeat):
+    """Appels par seconde de func sur les plateaux, répétés `repeat` fois"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for board in boards:
+            func(board)
+    return repeat * len(boards) / (time.perf_counter() - start)
+
+
+def peak_memory_kb():
+    """Mémoire résidente maximale du processus (ko), None si indisponible"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def calibrate(size=200000):
+    """Durée d'une charge fixe en Python pur, indépendante du moteur : sert à
+    ramener la référence à la vitesse de la machine au moment de la mesure"""
+    rng = random.Random(0)
+    values = [rng.getrandbits(16) for _ in range(size)]
+    start = time.perf_counter()
+    total = 0
+    for value in values:
+        total += (value & 0xFF) ^ (value >> 8)
+    sorted(values)
+    return time.perf_counter() - start
+
+
+def higher_is_better(name):
+    return name.endswith(("_per_s", "_depth"))
+
+
+def bench_suite(timeout=1.0, runs=3):
+    """Meilleure valeur de chaque mesure sur `runs` passages du corpus"""
+    best = {}
+    for _ in range(runs):
+        for name, value in run_suite(timeout).items():
+            if name not in best:
+                best[name] = value
+            else:
+                best[name] = max(best[name], value) if higher_is_better(name) else min(best[name], value)
+    return best
+
+
+def run_suite(timeout=1.0, repeat=200, playouts=1000):
+    """Mesures sur le corpus : {nom de la mesure: valeur}.
+
+    Suffixes `_per_s` et `_depth` : plus c'est grand, mieux c'est ; `_s` et
+    `_kb` : l'inverse. Le livre d'ouvertures, la table de fin de partie et
+    la réflexion sont écartés, l'arbre de MCTS repart de zéro, pour mesurer la
+    recherche elle-même.
+    """
+    metrics = {"calibration_s": calibrate()}
+    boards = [board for _, board, _, _ in CORPUS]
+    metrics["check_winner_per_s"] = _rate(pq.check_winner, boards, repeat)
+    metrics["evaluate_board_per_s"] = _rate(pq.evaluate_board, boards, repeat)
+
+    saved = pq.BOOK, pq.TABLEBASE, pq.TIMEOUT, pq.PONDER, pq.MCTS_SEARCHER
+    pq.BOOK, pq.TABLEBASE, pq.TIMEOUT, pq.PONDER = None, None, timeout, False
+    pq.MCTS_SEARCHER = pq.MonteCarloSearcher(seed=0)
+    pq.PONDERER.results = {}
+    try:
+        for name, board, piece, depth in CORPUS:
+            state = corpus_state(board, piece)
+            masks, code, remaining = pq.parse_state(state)
+
+            # Temps pour atteindre une profondeur fixe, tables vides
+            searcher = pq.Searcher(pq.TranspositionTable())
+            start = time.perf_counter()
+            result = searcher.search(masks, remaining, code, max_depth=depth)
+            elapsed = time.perf_counter() - start
+            label = "full" if depth is None else depth
+            metrics[f"{name}.time_to_depth_{label}_s"] = elapsed
+            metrics[f"{name}.search_nodes_per_s"] = result.nodes / elapsed
+
+            # Débit des simulations de MCTS, arbre neuf
+            mcts = pq.MonteCarloSearcher(seed=0)
+            start = time.perf_counter()
+            mcts.search(masks, remaining, code, max_playouts=playouts)
+            metrics[f"{name}.mcts_playouts_per_s"] = playouts / (time.perf_counter() - start)
+            if depth is None:
+                solver = pq.EndgameSolver(pq.TranspositionTable(pq.ENDGAME_TT_SIZE_MB))
+                start = time.perf_counter()
+                solver.solve(masks, remaining, code)
+                metrics[f"{name}.solve_s"] = time.perf_counter() - start
+
+            # Coup complet dans le temps imparti, comme pour une requête
+            pq.TT.clear()
+            pq.ENDGAME_SOLVER.tt.clear()
+            pq._last_search = (None, None)
+            start = time.perf_counter()
+            pq.find_best_pos(state, time.time())
+            pq.find_best_piece(state, time.time())
+            elapsed = time.perf_counter() - start
+            result = pq._last_search[1]
+            metrics[f"{name}.find_best_move_depth"] = result.depth
+            metrics[f"{name}.find_best_move_nodes_per_s"] = result.nodes / elapsed
+
+            # minimax_cached à profondeur 3
+            pq.TT.clear()
+            start = time.perf_counter()
+            pq.minimax_cached(tuple(board), tuple(pq.get_available_pieces(state)), piece, 3, True,
+                              -float('inf'), float('inf'))
+            metrics[f"{name}.minimax_cached_s"] = time.perf_counter() - start
+    finally:
+        pq.BOOK, pq.TABLEBASE, pq.TIMEOUT, pq.PONDER, pq.MCTS_SEARCHER = saved
+    peak = peak_memory_kb()
+    if peak is not None:
+        metrics["peak_memory_kb"] = peak
+    return metrics
+
+
+def compare(metrics, baseline, tolerance=0.3, min_time=0.01):
+    """Mesures dégradées de plus de `tolerance` (fraction) : liste de messages.
+
+    Les durées inférieures à `min_time` secondes, trop bruitées, sont ignorées.
+    Les mesures de temps et de débit sont corrigées de la vitesse relative de
+    la machine (`calibration_s`) ; la profondeur et la mémoire ne le sont pas.
+    """
+    speed = 1.0
+    if metrics.get("calibration_s") and baseline.get("calibration_s"):
+        speed = metrics["calibration_s"] / baseline["calibration_s"]
+    regressions = []
+    for name, reference in sorted(baseline.items()):
+        value = metrics.get(name)
+        if value is None or not reference or name == "calibration_s":
+            continue
+        if name.endswith("_per_s"):
+            reference /= speed
+        elif name.endswith("_s"):
+            reference *= speed
+        if name.endswith("_s") and not name.endswith("_per_s") and max(value, reference) < min_time:
+            continue
+        if higher_is_better(name):
+            ratio = reference / value if value else float('inf')
+        else:
+            ratio = value / reference
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name} : {value:.4g} contre {reference:.4g} ({ratio - 1:+.0%})")
+    return regressions
+
+
+def write_results(path, metrics):
+    with open(path, "w") as f:
+        json.dump({
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "metrics": metrics,
+        }, f, indent=2, sort_keys=True)
+
+
+def read_metrics(path):
+    with open(path) as f:
+        return json.load(f)["metrics"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Mesures de performance du moteur Quarto")
+    sub = parser.add_subparsers(dest="command", required=True)
+    batch = sub.add_parser("batch", help="évaluation scalaire contre évaluation en lot")
+    batch.add_argument("--count", type=int, default=20000)
+    suite = sub.add_parser("suite", help="corpus fixe comparé à la référence")
+    suite.add_argument("--timeout", type=float, default=1.0, help="TIMEOUT des requêtes simulées")
+    suite.add_argument("--runs", type=int, default=3, help="passages du corpus (on garde le meilleur)")
+    suite.add_argument("--output", help="fichier JSON des résultats")
+    suite.add_argument("--baseline", default=BASELINE_PATH, help="fichier JSON de référence")
+    suite.add_argument("--tolerance", type=float, default=0.3, help="dégradation tolérée (fraction)")
+    suite.add_argument("--update-baseline", action="store_true", help="remplace la référence par ces mesures")
+    args = parser.parse_args(argv)
+    if args.command == "batch":
+        for name, rate in bench_batch_eval(args.count).items():
+            print(f"{name:>12} : {rate:12,.0f} plateaux/s")
+    elif args.command == "suite":
+        metrics = bench_suite(args.timeout, args.runs)
+        for name, value in sorted(metrics.items()):
+            print(f"{name:>40} : {value:12,.4g}")
+        if args.output:
+            write_results(args.output, metrics)
+        if args.update_baseline:
+            write_results(args.baseline, metrics)
+            return 0
+        if not os.path.exists(args.baseline):
+            print(f"pas de référence {args.baseline}")
+            return 0
+        regressions = compare(metrics, read_metrics(args.baseline), args.tolerance)
+        for line in regressions:
+            print("RÉGRESSION", line)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Génération hors ligne du livre d'ouvertures.
+
+Parcourt les positions des premiers coups joints depuis le plateau vide,
+réduites par symétrie, les analyse en profondeur sur plusieurs processus et
+écrit le livre binaire lu par projet_quarto.OpeningBook.
+
+    python book_quarto.py --plies 3 --seconds 20 --workers 8
+"""
+import argparse
+import os
+import time
+from multiprocessing import Pool
+
+import projet_quarto as pq
+
+
+def opening_positions(plies):
+    """Positions canoniques atteignables en au plus `plies` coups joints.
+
+    Retourne {clé canonique: (masques, pièces restantes, pièce à placer)}.
+    Le premier coup ne fait que donner une pièce.
+    """
+    start = (pq.EMPTY_BOARD, pq.ALL_PIECES, None)
+    positions = {pq.canonical_key(*start, True)[0]: start}
+    frontier = [start]
+    for _ in range(plies):
+        next_frontier = []
+        for masks, remaining, piece in frontier:
+            if piece is None:
+                children = [(masks, remaining & ~(1 << give), give) for give in pq.mask_to_codes(remaining)]
+            else:
+                children = []
+                for pos in pq.empty_squares(masks[0]):
+                    if pq.wins_with(masks, pos, piece):
+                        continue
+                    new_masks = pq.place(masks, pos, piece)
+                    children += [(new_masks, remaining & ~(1 << give), give) for give in pq.mask_to_codes(remaining)]
+            for child in children:
+                key = pq.canonical_key(*child, True)[0]
+                if key not in positions:
+                    positions[key] = child
+                    next_frontier.append(child)
+        frontier = next_frontier
+    return positions
+
+
+def analyse(job):
+    """Recherche une position et retourne (clé, coup canonique, score)"""
+    key, (masks, remaining, piece), seconds = job
+    searcher = pq.Searcher(pq.TranspositionTable())
+    result = searcher.search(masks, remaining, piece, time.monotonic() + seconds)
+    _, sym = pq.canonical_key(masks, remaining, piece, True)
+    pos = 16 if result.pos is None else pq.square_to_canonical(sym, result.pos)
+    move = pos << 4 | pq.piece_to_canonical(sym, result.piece)
+    return key, move, result.score if result.score is not None else 0
+
+
+def build_book(path, plies, seconds, workers=None):
+    """Analyse toutes les positions d'ouverture et écrit le livre ; retourne le nombre d'entrées"""
+    positions = opening_positions(plies)
+    jobs = [(key, position, seconds) for key, position in positions.items()]
+    entries = {}
+    with Pool(workers) as pool:
+        for done, (key, move, score) in enumerate(pool.imap_unordered(analyse, jobs), 1):
+            entries[key] = (move, score)
+            print(f"\r{done}/{len(jobs)} positions", end="", flush=True)
+    print()
+    pq.OpeningBook.write(path, entries)
+    return len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--plies", type=int, default=3, help="nombre de coups joints couverts")
+    parser.add_argument("--seconds", type=float, default=10.0, help="temps de recherche par position")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="nombre de processus")
+    parser.add_argument("--output", default=pq.BOOK_PATH, help="fichier du livre")
+    args = parser.parse_args(argv)
+    count = build_book(args.output, args.plies, args.seconds, args.workers)
+    print(f"{count} positions écrites dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()
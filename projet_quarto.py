@@ -1,8 +1,27 @@
 import socket
 import json
+import asyncio
 import time
+import os
+import mmap
+import struct
+import zlib
 import random
-from functools import lru_cache
+import math
+import itertools
+import multiprocessing
+import threading
+import sys
+import cProfile
+from array import array
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # évaluation vectorisée indisponible, on garde la version scalaire
+    np = None
 
 # Configuration
 PORT = 677
@@ -11,6 +30,39 @@ MATRICULES = ["23397", "23158"]
 TIMEOUT = 3.0
 SERVER_ADDRESS = ('172.17.10.133', 3000)
 MAX_RECV_LENGTH = 10000
+MAX_MESSAGE_LENGTH = 1 << 20  # taille maximale d'une requête reçue en plusieurs paquets
+LATENCY_HISTORY = 1000  # durées de réponse conservées par type de requête
+TT_SIZE_MB = 32  # budget mémoire de la table de transposition
+TT_PATH = None  # sauvegarde de la table de transposition d'un lancement à l'autre (None : aucune)
+TT_FLUSH_INTERVAL = 60.0  # secondes minimales entre deux sauvegardes de la table
+SEARCH_BUDGET = 0.8  # part du TIMEOUT accordée à la recherche
+WORKERS = max(1, (os.cpu_count() or 1) - 1)  # processus de recherche (1 : séquentiel)
+ENGINE_POOL = 0  # processus moteurs préchauffés du serveur, pour les parties simultanées (0 ou 1 : aucun)
+ENGINE_PIN_CPUS = True  # épingler chaque processus moteur sur un cœur (Linux)
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'quarto_book.bin')  # None : pas de livre
+TABLEBASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'quarto_tablebase.bin')
+TABLEBASE_PLY = 2  # poses après la racine jusqu'auxquelles la recherche consulte la table de fin de partie
+EVAL_VERSION = 1  # à incrémenter à chaque changement de evaluate_board (des poids chargés en dérivent une autre)
+EVAL_WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'quarto_weights.json')
+ENDGAME_EMPTY = 9  # nombre de cases vides à partir duquel on tente la résolution exacte
+ENDGAME_TT_SIZE_MB = 16
+# Évaluation NumPy des fils aux nœuds de profondeur 1 et à la racine (si NumPy est
+# installé). Désactivée par défaut : pour les 16 plateaux au plus d'un nœud, le
+# coût fixe de NumPy dépasse le faire/défaire incrémental (voir bench_quarto.py).
+BATCH_EVAL = False
+BATCH_MIN = 8  # nombre minimal de plateaux pour passer par NumPy
+CANONICAL_DEPTH = 3  # profondeur restante à partir de laquelle les clés sont canoniques
+ASPIRATION_WINDOW = 120  # demi-largeur de la fenêtre autour du score de l'itération précédente
+FORCED_EXTENSION = True  # suivre sans réduire la profondeur les coups dont la pièce donnée est la seule sûre
+PONDER = True  # réfléchir pendant le temps de l'adversaire (serveur persistant)
+LOG_PATH = None  # journal JSON des requêtes play (None : sortie standard)
+CAPTURE_PATH = None  # enregistrement des requêtes reçues et de nos réponses, pour replay_quarto.py (None : aucun)
+PROFILE = None  # "cprofile" ou "sample" : profil de chaque requête play (None : désactivé)
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'profiles')
+PROFILE_INTERVAL = 0.005  # période d'échantillonnage (s) du profil "sample"
+PONDER_SLICE = 0.2  # première tranche de temps (s) par réponse anticipée, doublée à chaque tour
+MCTS_MIN_EMPTY = 17  # cases vides à partir desquelles on joue par MCTS plutôt qu'alpha-beta (17 : jamais)
+MCTS_EXPLORATION = 0.7  # constante d'exploration de UCB1
 
 
 # Inscription au serveur
@@ -27,322 +79,2994 @@ def s_inscrire():
         response = s.recv(MAX_RECV_LENGTH).decode()
     print("Réponse du serveur:", response)
 
+# Représentation compacte
+# Une pièce est un entier de 4 bits : le bit i vaut 1 si la pièce porte la
+# seconde lettre de l'attribut i (taille B/S, couleur D/L, remplissage E/F,
+# forme C/P). Le plateau est un tuple de masques 16 bits
+# (cases occupées, attribut 0, attribut 1, attribut 2, attribut 3).
+ATTRIBUTES = ("BS", "DL", "EF", "CP")
+LETTER_BITS = {
+    letter: (1 << i) if j else 0
+    for i, values in enumerate(ATTRIBUTES)
+    for j, letter in enumerate(values)
+}
+PIECE_NAMES = tuple(
+    ''.join(values[(code >> i) & 1] for i, values in enumerate(ATTRIBUTES))
+    for code in range(16)
+)
+ALL_PIECES = 0xFFFF  # masque des 16 pièces (bit = code de la pièce)
+FULL_BOARD = 0xFFFF
+EMPTY_BOARD = (0, 0, 0, 0, 0)
+
+def _squares_mask(squares):
+    mask = 0
+    for sq in squares:
+        mask |= 1 << sq
+    return mask
+
+# Les dix lignes gagnantes : lignes, colonnes puis diagonales
+LINES = tuple(
+    [_squares_mask(i*4 + j for j in range(4)) for i in range(4)]
+    + [_squares_mask(j*4 + i for j in range(4)) for i in range(4)]
+    + [_squares_mask(i*4 + i for i in range(4)),
+       _squares_mask(i*4 + (3-i) for i in range(4))]
+)
+LINES_BY_SQUARE = tuple(tuple(line for line in LINES if line >> sq & 1) for sq in range(16))
+CENTER_MASK = _squares_mask([5, 6, 9, 10])
+CORNER_MASK = _squares_mask([0, 3, 12, 15])
+# Ordre de parcours des cases : centre > coins > bords
+POSITION_VALUES = tuple(3 if CENTER_MASK >> i & 1 else 2 if CORNER_MASK >> i & 1 else 1 for i in range(16))
+SQUARE_ORDER = tuple(sorted(range(16), key=lambda x: -POSITION_VALUES[x]))
+
+def piece_to_code(piece):
+    """Convertit une pièce texte ("BDEC") en entier 4 bits, quel que soit l'ordre des lettres"""
+    code = 0
+    for letter in piece:
+        code |= LETTER_BITS[letter]
+    return code
+
+def code_to_piece(code):
+    return PIECE_NAMES[code]
+
+def pieces_to_mask(pieces):
+    """Convertit une liste de pièces texte en masque 16 bits"""
+    mask = 0
+    for piece in pieces:
+        mask |= 1 << piece_to_code(piece)
+    return mask
+
+def mask_to_codes(mask):
+    return [code for code in range(16) if mask >> code & 1]
+
+def board_to_masks(board):
+    """Convertit le plateau JSON (liste de 16 pièces ou None) en masques"""
+    occ = a0 = a1 = a2 = a3 = 0
+    for sq, piece in enumerate(board):
+        if piece is not None:
+            bit = 1 << sq
+            code = piece_to_code(piece)
+            occ |= bit
+            if code & 1: a0 |= bit
+            if code & 2: a1 |= bit
+            if code & 4: a2 |= bit
+            if code & 8: a3 |= bit
+    return (occ, a0, a1, a2, a3)
+
+def masks_to_board(masks):
+    """Convertit les masques en plateau JSON"""
+    occ = masks[0]
+    board = [None] * 16
+    for sq in range(16):
+        if occ >> sq & 1:
+            board[sq] = PIECE_NAMES[sum(1 << i for i in range(4) if masks[i+1] >> sq & 1)]
+    return board
+
+def piece_at(masks, sq):
+    return sum(1 << i for i in range(4) if masks[i+1] >> sq & 1)
+
+def place(masks, sq, code):
+    """Retourne un nouveau plateau avec la pièce `code` posée en `sq`"""
+    bit = 1 << sq
+    occ, a0, a1, a2, a3 = masks
+    return (occ | bit,
+            a0 | bit if code & 1 else a0,
+            a1 | bit if code & 2 else a1,
+            a2 | bit if code & 4 else a2,
+            a3 | bit if code & 8 else a3)
+
+def empty_squares(occ):
+    """Cases libres dans l'ordre centre > coins > bords"""
+    return [sq for sq in SQUARE_ORDER if not occ >> sq & 1]
+
+def is_winning(masks):
+    """Vrai si une ligne complète partage un attribut"""
+    occ = masks[0]
+    for line in LINES:
+        if occ & line == line:
+            for attr in masks[1:]:
+                common = attr & line
+                if common == 0 or common == line:
+                    return True
+    return False
+
+def wins_with(masks, sq, code):
+    """Vrai si poser `code` sur la case libre `sq` complète une ligne gagnante"""
+    occ = masks[0]
+    bit = 1 << sq
+    for line in LINES_BY_SQUARE[sq]:
+        rest = line ^ bit
+        if occ & rest == rest:
+            for i in range(4):
+                common = masks[i+1] & rest
+                if common == (rest if code >> i & 1 else 0):
+                    return True
+    return False
+
+def evaluate_masks(masks):
+    """Heuristique de `evaluate_board` calculée sur les masques"""
+    occ = masks[0]
+    attrs = masks[1:]
+    score = 0
+    for line in LINES:
+        filled = occ & line
+        if filled == line:
+            for attr in attrs:
+                common = attr & line
+                if common == 0 or common == line:
+                    return float('inf')  # Victoire
+        elif filled:
+            count = filled.bit_count()
+            for attr in attrs:
+                common = attr & filled
+                if common == 0 or common == filled:
+                    score += SHARED_WEIGHT * count  # Bonus pour attributs communs
+                elif count == 3:
+                    score -= DANGER_WEIGHT  # Pénalité pour situation dangereuse
+    # Bonus pour le centre
+    score += CENTER_WEIGHT * (occ & CENTER_MASK).bit_count()
+    return score
+
+# PIECES_WITH[i][v] : masque des pièces dont l'attribut i vaut v
+PIECES_WITH = tuple(
+    tuple(sum(1 << code for code in range(16) if (code >> i & 1) == v) for v in (0, 1))
+    for i in range(4)
+)
+
+# DEADLY_BY_SHARED[uns | zéros << 4] : pièces qui complètent une ligne de trois
+# pièces dont les attributs partagés valent 1 (uns) ou 0 (zéros)
+def _deadly_for_shared(shared):
+    deadly = 0
+    for i in range(4):
+        if shared >> i & 1:
+            deadly |= PIECES_WITH[i][1]
+        if shared >> (4 + i) & 1:
+            deadly |= PIECES_WITH[i][0]
+    return deadly
+
+DEADLY_BY_SHARED = tuple(_deadly_for_shared(shared) for shared in range(256))
+
+def threats(masks):
+    """Index des menaces : (case vide, pièces gagnantes) pour chaque ligne remplie aux trois quarts"""
+    occ = masks[0]
+    result = []
+    for line in LINES:
+        filled = occ & line
+        if filled != line and filled.bit_count() == 3:
+            shared = 0
+            for i in range(4):
+                common = masks[i+1] & filled
+                if common == filled:
+                    shared |= 1 << i
+                elif common == 0:
+                    shared |= 1 << (4 + i)
+            if shared:
+                result.append(((line & ~occ).bit_length() - 1, DEADLY_BY_SHARED[shared]))
+    return result
+
+def deadly_pieces(masks):
+    """Masque des pièces qui gagnent si on les pose sur ce plateau"""
+    deadly = 0
+    for _, pieces in threats(masks):
+        deadly |= pieces
+    return deadly
+
+def danger_score(masks, code):
+    """`piece_danger_score` sur les masques : 100 par case où `code` gagne"""
+    squares = 0
+    for sq, pieces in threats(masks):
+        if pieces >> code & 1:
+            squares |= 1 << sq
+    return 100 * squares.bit_count()
+
 # Fonctions utilitaires améliorées
 def get_available_positions(board):
     """Retourne les positions disponibles triées par importance (centre > coins > bords)"""
-    positions = [i for i, p in enumerate(board) if p is None]
-    position_values = [3 if i in [5, 6, 9, 10] else 2 if i in [0, 3, 12, 15] else 1 for i in range(16)]
-    positions.sort(key=lambda x: -position_values[x])#on trie selon la valeur négative (pour trier du plus grand au plus petit).
-    return positions
+    return [sq for sq in SQUARE_ORDER if board[sq] is None]
 
 def get_available_pieces(state):
-    used = set(frozenset(p) for p in state["board"] if p is not None)
+    """Pièces encore libres, en texte dans l'ordre des attributs (BS, DL, EF, CP)"""
+    used = 0
+    for piece in state["board"]:
+        if piece is not None:
+            used |= 1 << piece_to_code(piece)
     if state["piece"]:
-        used.add(frozenset(state["piece"]))
-
-    all_pieces = set()
-    for size in ["B", "S"]:
-        for color in ["D", "L"]:
-            for weight in ["E", "F"]:
-                for shape in ["C", "P"]:
-                    all_pieces.add(frozenset(size + color + weight + shape))
-    list_res=[]
-    for elem in list(all_pieces-used):
-        mot=''.join(elem)
-        list_res.append(mot)
-    return  list_res
+        used |= 1 << piece_to_code(state["piece"])
+    return [PIECE_NAMES[code] for code in range(16) if not used >> code & 1]
+
+def parse_state(state):
+    """Convertit l'état JSON reçu du serveur en (masques, pièce à placer, pièces restantes)"""
+    masks = board_to_masks(state["board"])
+    piece = piece_to_code(state["piece"]) if state["piece"] else None
+    remaining = pieces_to_mask(get_available_pieces(state))
+    return masks, piece, remaining
 
 def piece_danger_score(piece, board):
     """Évalue à quel point une pièce est dangereuse pour l'adversaire"""
-    score = 0
-    for pos in get_available_positions(board):
-        new_board = board.copy()
-        new_board[pos] = piece
-        if check_winner(new_board):
-            score += 100  # Pièce qui peut faire gagner immédiatement
-    return score
+    return danger_score(board_to_masks(board), piece_to_code(piece))
 
 # Fonctions d'évaluation améliorées
 def has_common_attribute(pieces):
     """Vérifie si les pièces ont un attribut commun"""
     if not pieces or None in pieces:
         return False
-    for i in range(4):  # Vérifie chaque attribut
-        if len(set(p[i] for p in pieces)) == 1:
-            return True
-    return False
+    ones = zeros = 0xF
+    for piece in pieces:
+        code = piece_to_code(piece)
+        ones &= code
+        zeros &= ~code
+    return bool((ones | zeros) & 0xF)
 
 def check_winner(board):
     """Vérifie s'il y a un gagnant sur le plateau"""
-    # Convertir en grille 4x4
-    grid = [board[i*4:(i+1)*4] for i in range(4)]
-    
-    # Vérifier lignes et colonnes
-    for i in range(4):
-        row = grid[i]
-        if None not in row and has_common_attribute(row):
-            return True
-        column = [grid[j][i] for j in range(4)]
-        if None not in column and has_common_attribute(column):
-            return True
-    
-    # Vérifier diagonales
-    diag1 = [grid[i][i] for i in range(4)]
-    diag2 = [grid[i][3-i] for i in range(4)]
-    if (None not in diag1 and has_common_attribute(diag1)) or \
-       (None not in diag2 and has_common_attribute(diag2)):
-        return True
-    
-    return False
+    return is_winning(board_to_masks(board))
 
 def evaluate_board(board):
     """Heuristique sophistiquée pour évaluer le plateau"""
-    score = 0
-    lines = []
+    return evaluate_masks(board_to_masks(board))
+
+# Poids de l'heuristique
+# shared : bonus par pièce et par attribut partagé d'une ligne incomplète ;
+# danger : pénalité par attribut non partagé d'une ligne remplie aux trois
+# quarts ; center : bonus par case centrale occupée. Les poids par défaut sont
+# remplacés au démarrage par ceux de EVAL_WEIGHTS_PATH (écrit par tune_quarto.py).
+DEFAULT_WEIGHTS = {"shared": 10, "danger": 20, "center": 5}
+BASE_EVAL_VERSION = EVAL_VERSION
+# Valeur maximale de chaque terme (10 lignes de trois pièces partageant 4 attributs,
+# 10 lignes de trois sans attribut partagé, 4 cases centrales) ; le score doit
+# rester loin des scores de victoire de la recherche
+FEATURE_BOUNDS = {"shared": 120, "danger": 40, "center": 4}
+EVAL_LIMIT = 5000
+
+def _line_scores(shared_weight, danger_weight):
+    """Contribution d'une ligne incomplète à `evaluate_board`, selon le nombre de
+    cases remplies et le masque (4 bits) des attributs partagés"""
+    return tuple(
+        tuple(
+            0 if count in (0, 4) else
+            shared_weight * count * bin(shared).count("1")
+            - (danger_weight * (4 - bin(shared).count("1")) if count == 3 else 0)
+            for shared in range(16)
+        )
+        for count in range(5)
+    )
+
+def set_eval_weights(weights):
+    """Installe des poids entiers {"shared", "danger", "center"} dans toutes les
+    versions de l'évaluation ; des poids autres que DEFAULT_WEIGHTS donnent une
+    EVAL_VERSION dérivée, pour que table sauvegardée et livre soient écartés"""
+    global SHARED_WEIGHT, DANGER_WEIGHT, CENTER_WEIGHT, LINE_SCORES, EVAL_VERSION
+    if set(weights) != set(DEFAULT_WEIGHTS) or not all(type(value) is int for value in weights.values()):
+        raise ValueError(f"poids attendus : {sorted(DEFAULT_WEIGHTS)}, entiers")
+    if sum(abs(value) * FEATURE_BOUNDS[name] for name, value in weights.items()) > EVAL_LIMIT:
+        raise ValueError(f"poids trop grands : |score| pourrait dépasser {EVAL_LIMIT}")
+    SHARED_WEIGHT, DANGER_WEIGHT, CENTER_WEIGHT = weights["shared"], weights["danger"], weights["center"]
+    LINE_SCORES = _line_scores(SHARED_WEIGHT, DANGER_WEIGHT)
+    if weights == DEFAULT_WEIGHTS:
+        EVAL_VERSION = BASE_EVAL_VERSION
+    else:
+        EVAL_VERSION = 0x8000 | zlib.crc32(json.dumps(weights, sort_keys=True).encode()) & 0x7FFF
+
+def eval_weights():
+    """Poids en vigueur"""
+    return {"shared": SHARED_WEIGHT, "danger": DANGER_WEIGHT, "center": CENTER_WEIGHT}
+
+def load_eval_weights(path=EVAL_WEIGHTS_PATH):
+    """Charge les poids du fichier s'il existe et correspond à la forme actuelle de
+    l'évaluation, sinon garde les poids par défaut ; retourne les poids en vigueur"""
+    weights = DEFAULT_WEIGHTS
+    if path is not None and os.path.exists(path):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get("version") != BASE_EVAL_VERSION:
+                raise ValueError(f"évaluation {data.get('version')}, attendue {BASE_EVAL_VERSION}")
+            set_eval_weights(data["weights"])
+            return eval_weights()
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"Poids de l'évaluation ignorés ({path}) : {e}")
+    set_eval_weights(weights)
+    return eval_weights()
+
+load_eval_weights()
+
+# Symétries
+# Les 32 permutations des cases qui conservent les dix lignes : lignes et
+# colonnes permutées par une permutation qui commute avec le retournement
+# (rotations, miroirs, échange intérieur/extérieur, échange des lignes du
+# milieu), éventuellement suivies d'une transposition.
+def _board_symmetries():
+    commuting = [p for p in itertools.permutations(range(4)) if all(p[3-i] == 3 - p[i] for i in range(4))]
+    result = set()
+    for rows in commuting:
+        for cols in (rows, tuple(3 - r for r in rows)):
+            for transpose in (False, True):
+                perm = []
+                for sq in range(16):
+                    r, c = rows[sq // 4], cols[sq % 4]
+                    perm.append(c*4 + r if transpose else r*4 + c)
+                result.add(tuple(perm))
+    return tuple(sorted(result))  # l'identité en premier
+
+BOARD_SYMMETRIES = _board_symmetries()
+# Seules les symétries qui gardent le centre conservent `evaluate_board`
+EVAL_SYMMETRIES = tuple(
+    perm for perm in BOARD_SYMMETRIES
+    if all(perm[sq] in (5, 6, 9, 10) for sq in (5, 6, 9, 10))
+)
+ATTRIBUTE_PERMUTATIONS = tuple(itertools.permutations(range(4)))
+PIECE_PERMS = tuple(
+    tuple(sum(1 << perm[i] for i in range(4) if code >> i & 1) for code in range(16))
+    for perm in ATTRIBUTE_PERMUTATIONS
+)
+PIECE_PERMS_INV = tuple(
+    tuple(table.index(code) for code in range(16)) for table in PIECE_PERMS
+)
+# Applique une permutation d'attributs à deux cases codées sur un octet
+_NIBBLE_PAIR_PERMS = tuple(
+    tuple(table[b & 0xF] | table[b >> 4] << 4 for b in range(256)) for table in PIECE_PERMS
+)
+
+def _symmetry_tables(symmetries):
+    tables = []
+    for perm in symmetries:
+        inverse = [0] * 16
+        for sq, image in enumerate(perm):
+            inverse[image] = sq
+        low = tuple(sum(1 << perm[sq] for sq in range(8) if b >> sq & 1) for b in range(256))
+        high = tuple(sum(1 << perm[sq + 8] for sq in range(8) if b >> sq & 1) for b in range(256))
+        tables.append((perm, tuple(inverse), low, high))
+    return tuple(tables)
+
+_SYMMETRY_TABLES = {
+    BOARD_SYMMETRIES: _symmetry_tables(BOARD_SYMMETRIES),
+    EVAL_SYMMETRIES: _symmetry_tables(EVAL_SYMMETRIES),
+}
+
+def canonical_form(masks, remaining, current_piece, symmetries=EVAL_SYMMETRIES):
+    """Forme canonique d'une position à symétries près.
+
+    Les pièces sont d'abord normalisées par complément (la pièce à placer, ou à
+    défaut la première pièce du plateau transformé, devient 0), puis on garde
+    la plus petite image sur les symétries du plateau et les permutations
+    d'attributs. Retourne (plateau canonique, pièces restantes, transformation)
+    où le plateau canonique est (cases occupées, codes sur 4 bits par case).
+    """
+    occ = masks[0]
+    codes = [0] * 16
+    for sq in range(16):
+        if occ >> sq & 1:
+            codes[sq] = piece_at(masks, sq)
     
-    # Toutes les lignes possibles
-    for i in range(4):
-        lines.append([board[i*4 + j] for j in range(4)])  # Lignes
-        lines.append([board[j*4 + i] for j in range(4)])  # Colonnes
-    lines.append([board[i*4 + i] for i in range(4)])     # Diagonale 1
-    lines.append([board[i*4 + (3-i)] for i in range(4)]) # Diagonale 2
+    # Étape 1 : occupation minimale, calculée sans toucher aux pièces
+    candidates = []
+    best_occ = None
+    for table in _SYMMETRY_TABLES[symmetries]:
+        image = table[2][occ & 0xFF] | table[3][occ >> 8]
+        if best_occ is None or image < best_occ:
+            best_occ = image
+            candidates = [table]
+        elif image == best_occ:
+            candidates.append(table)
+    squares = [i for i in range(16) if best_occ >> i & 1]
     
-    for line in lines:
-        if None in line:
-            # Évaluer les lignes incomplètes
-            filled = [p for p in line if p is not None]
-            count = len(filled)
-            
-            for attr in range(4):
-                unique_attrs = set(p[attr] for p in filled)
-                if len(unique_attrs) == 1:
-                    score += 10 * count  # Bonus pour attributs communs
-                elif count == 3 and len(unique_attrs) == 2:
-                    score -= 20  # Pénalité pour situation dangereuse
+    # Étape 2 : plus petit codage des pièces parmi les candidats
+    best = None
+    for perm, inverse, _, _ in candidates:
+        if current_piece is not None:
+            flip = current_piece
+        elif squares:
+            flip = codes[inverse[squares[0]]]
         else:
-            # Ligne complète
-            for attr in range(4):
-                if len(set(p[attr] for p in line)) == 1:
-                    return float('inf')  # Victoire
-    
-    # Bonus pour le centre et les coins
-    center_positions = [5, 6, 9, 10]
-    for pos in center_positions:
-        if board[pos] is not None:
-            score += 5
-    
-    return score
+            flip = 0
+        base = 0
+        for i in squares:
+            base |= (codes[inverse[i]] ^ flip) << 4*i
+        for k, pair_table in enumerate(_NIBBLE_PAIR_PERMS):
+            packed = 0
+            for shift in range(0, 64, 8):
+                packed |= pair_table[base >> shift & 0xFF] << shift
+            if best is not None and packed > best[0]:
+                continue
+            piece_table = PIECE_PERMS[k]
+            rest = 0
+            for code in range(16):
+                if remaining >> code & 1:
+                    rest |= 1 << piece_table[code ^ flip]
+            if best is None or (packed, rest) < best[:2]:
+                best = (packed, rest, (perm, inverse, k, flip))
+    packed, rest, sym = best
+    return (best_occ, packed), rest, sym
 
-# Algorithme Minimax optimisé
-@lru_cache(maxsize=None)
-def minimax_cached(board_tuple, pieces_tuple, current_piece, depth, is_maximizing, alpha, beta):
-    """Version avec mémoization de l'algorithme Minimax"""
-    board = list(board_tuple)
-    remaining_pieces = list(pieces_tuple) if pieces_tuple else []
-    
-    # Conditions terminales
-    if check_winner(board):
-        return float('inf') if not is_maximizing else -float('inf')
-    if depth == 0 or not remaining_pieces:
-        return evaluate_board(board)
-    
+def square_to_canonical(sym, sq):
+    return sym[0][sq]
+
+def square_from_canonical(sym, sq):
+    return sym[1][sq]
+
+def piece_to_canonical(sym, code):
+    return PIECE_PERMS[sym[2]][code ^ sym[3]]
+
+def piece_from_canonical(sym, code):
+    return PIECE_PERMS_INV[sym[2]][code] ^ sym[3]
+
+# Hachage de Zobrist : clé 64 bits mise à jour par XOR à chaque coup
+_zobrist_rng = random.Random(0x5175A7)
+Z_SQUARE = tuple(tuple(_zobrist_rng.getrandbits(64) for _ in range(16)) for _ in range(16))
+Z_REMAINING = tuple(_zobrist_rng.getrandbits(64) for _ in range(16))
+Z_PIECE = tuple(_zobrist_rng.getrandbits(64) for _ in range(16))
+Z_MAXIMIZING = _zobrist_rng.getrandbits(64)
+
+def zobrist_hash(masks, remaining, current_piece, is_maximizing):
+    """Clé complète d'une position ; la recherche la met ensuite à jour incrémentalement"""
+    key = Z_MAXIMIZING if is_maximizing else 0
+    for sq in range(16):
+        if masks[0] >> sq & 1:
+            key ^= Z_SQUARE[sq][piece_at(masks, sq)]
+    for code in mask_to_codes(remaining):
+        key ^= Z_REMAINING[code]
+    if current_piece is not None:
+        key ^= Z_PIECE[current_piece]
+    return key
+
+Z_CANONICAL = _zobrist_rng.getrandbits(64)
+
+def canonical_key(masks, remaining, current_piece, is_maximizing, symmetries=EVAL_SYMMETRIES):
+    """Clé de Zobrist de la forme canonique, et transformation vers celle-ci"""
+    (occ, packed), rest, sym = canonical_form(masks, remaining, current_piece, symmetries)
+    key = Z_CANONICAL ^ (Z_MAXIMIZING if is_maximizing else 0)
+    for sq in range(16):
+        if occ >> sq & 1:
+            key ^= Z_SQUARE[sq][packed >> 4*sq & 0xF]
+    for code in range(16):
+        if rest >> code & 1:
+            key ^= Z_REMAINING[code]
     if current_piece is not None:
-        # Placer la pièce
+        key ^= Z_PIECE[0]
+    return key, sym
+
+# Table de transposition
+EXACT, LOWER, UPPER = 0, 1, 2
+NO_MOVE = -1
+
+class TranspositionTable:
+    """Table de transposition de taille fixe.
+
+    Chaque seau contient deux entrées : la première garde la recherche la plus
+    profonde de la génération courante, la seconde est remplacée à chaque fois.
+    Une entrée stocke la clé complète, la profondeur, le type de borne
+    (EXACT/LOWER/UPPER), le score et le meilleur coup (case ou pièce).
+
+    Avec un fichier (`path`), la table repart de la dernière sauvegarde,
+    projetée en mémoire en copie privée : la recherche n'écrit jamais dans le
+    fichier. flush() écrit une sauvegarde complète dans un fichier temporaire
+    puis le renomme, si bien qu'un arrêt brutal laisse l'ancienne sauvegarde ou
+    la nouvelle, entière. Fichier : un en-tête (signature, version du format,
+    EVAL_VERSION, nombre d'emplacements, génération, CRC32 des tableaux) puis
+    les tableaux de FIELDS, l'un après l'autre.
+    """
+    ENTRY_BYTES = 8 + 8 + 1 + 1 + 2 + 1  # clé, score, profondeur, borne, coup, génération
+    MAGIC = b"QRTOTTBL"
+    VERSION = 1  # à incrémenter quand les clés ou les scores changent de sens
+    HEADER = struct.Struct('<8sHHIII')
+    FIELDS = (('keys', 'Q'), ('scores', 'd'), ('moves', 'h'), ('depths', 'b'), ('flags', 'B'), ('generations', 'B'))
+
+    def __init__(self, size_mb=TT_SIZE_MB, path=None):
+        buckets = 1
+        while buckets * 4 * self.ENTRY_BYTES <= size_mb * 2**20:
+            buckets *= 2
+        self.bucket_mask = buckets - 1
+        slots = 2 * buckets
+        self.path = path
+        self.last_flush = time.monotonic()
+        self._map = None
+        if path is None or not self._load(path, slots):
+            self.keys = array('Q', bytes(8 * slots))
+            self.scores = array('d', bytes(8 * slots))
+            self.depths = array('b', [-1]) * slots
+            self.flags = array('B', bytes(slots))
+            self.moves = array('h', [NO_MOVE]) * slots
+            self.generations = array('B', bytes(slots))
+            self.generation = 0
+        self.reset_stats()
+
+    def _load(self, path, slots):
+        """Projette la sauvegarde `path` ; False si elle est absente ou invalide"""
+        if not os.path.exists(path):
+            return False
+        size = self.HEADER.size + slots * self.ENTRY_BYTES
+        table = None
+        try:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size != size:
+                    raise ValueError("taille incohérente")
+                table = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+            magic, version, eval_version, saved_slots, generation, crc = self.HEADER.unpack_from(table, 0)
+            if magic != self.MAGIC:
+                raise ValueError("signature invalide")
+            if version != self.VERSION:
+                raise ValueError(f"version de format {version}, attendue {self.VERSION}")
+            if eval_version != EVAL_VERSION:
+                raise ValueError(f"évaluation {eval_version}, attendue {EVAL_VERSION}")
+            with memoryview(table) as view:
+                if saved_slots != slots or zlib.crc32(view[self.HEADER.size:]) != crc:
+                    raise ValueError("contenu incohérent")
+        except (OSError, ValueError) as e:
+            print(f"Table de transposition ignorée ({path}) : {e}")
+            if table is not None:
+                table.close()
+            return False
+        self._map = table
+        view = memoryview(table)
+        offset = self.HEADER.size
+        for name, code in self.FIELDS:
+            end = offset + slots * array(code).itemsize
+            setattr(self, name, view[offset:end].cast(code))
+            offset = end
+        self.generation = generation
+        return True
+
+    def flush(self):
+        """Sauvegarde complète dans `path` : fichier temporaire, fsync, puis renommage atomique"""
+        if self.path is None:
+            return
+        crc = 0
+        for name, _ in self.FIELDS:
+            crc = zlib.crc32(getattr(self, name), crc)
+        header = self.HEADER.pack(self.MAGIC, self.VERSION, EVAL_VERSION, len(self.keys), self.generation, crc)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            for name, _ in self.FIELDS:
+                f.write(getattr(self, name))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self.last_flush = time.monotonic()
+
+    def due(self, interval=None):
+        """Vrai si la précédente sauvegarde date de plus de `interval` secondes (TT_FLUSH_INTERVAL)"""
+        interval = TT_FLUSH_INTERVAL if interval is None else interval
+        return self.path is not None and time.monotonic() - self.last_flush >= interval
+
+    def flush_if_due(self, interval=None):
+        """Sauvegarde si la précédente date de plus de `interval` secondes (TT_FLUSH_INTERVAL)"""
+        if self.due(interval):
+            try:
+                self.flush()
+            except OSError as e:
+                print(f"Sauvegarde de la table impossible ({self.path}) : {e}")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def reset_stats(self):
+        self.hits = self.misses = self.collisions = 0
+        self.stores = self.evictions = 0
+
+    def stats(self):
+        """Compteurs d'utilisation, pour dimensionner la table"""
+        used = sum(1 for d in self.depths if d >= 0)
+        return {
+            "slots": len(self.keys),
+            "size_bytes": len(self.keys) * self.ENTRY_BYTES,
+            "used": used,
+            "hits": self.hits,
+            "misses": self.misses,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "evictions": self.evictions,
+        }
+
+    def new_search(self):
+        """Change de génération : les entrées anciennes deviennent remplaçables"""
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        slots = len(self.keys)
+        self.depths = array('b', [-1]) * slots
+        self.moves = array('h', [NO_MOVE]) * slots
+        self.reset_stats()
+
+    def lookup(self, key):
+        """Retourne (profondeur, borne, score, coup) ou None"""
+        slot = (key & self.bucket_mask) << 1
+        keys = self.keys
+        depths = self.depths
+        for i in (slot, slot + 1):
+            if keys[i] == key and depths[i] >= 0:
+                self.hits += 1
+                return depths[i], self.flags[i], self.scores[i], self.moves[i]
+        self.misses += 1
+        if depths[slot] >= 0 or depths[slot + 1] >= 0:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, flag, score, move):
+        slot = (key & self.bucket_mask) << 1
+        keys = self.keys
+        depths = self.depths
+        if keys[slot] == key and depths[slot] >= 0:
+            i = slot
+        elif depths[slot] < 0 or depths[slot] <= depth or self.generations[slot] != self.generation:
+            # L'entrée profonde descend dans l'emplacement « toujours remplacé »
+            i = slot
+            if depths[slot] >= 0:
+                if depths[slot + 1] >= 0 and keys[slot + 1] != key:
+                    self.evictions += 1
+                self._copy(slot, slot + 1)
+        else:
+            i = slot + 1
+            if depths[i] >= 0 and keys[i] != key:
+                self.evictions += 1
+        self.stores += 1
+        keys[i] = key
+        depths[i] = min(depth, 127)
+        self.flags[i] = flag
+        self.scores[i] = score
+        self.moves[i] = move
+        self.generations[i] = self.generation
+
+    def entries(self):
+        """Tableaux de FIELDS en octets, à passer à merge() dans un autre processus"""
+        return tuple(bytes(getattr(self, name)) for name, _ in self.FIELDS)
+
+    def merge(self, entries):
+        """Reprend les entrées d'une table de même taille (`entries()`) là où elles sont
+        plus profondes que les nôtres ; retourne le nombre d'emplacements repris"""
+        other = {name: array(code, data) for (name, code), data in zip(self.FIELDS, entries)}
+        if len(other['keys']) != len(self.keys):
+            return 0
+        if np is not None:
+            depths = np.frombuffer(self.depths, dtype=np.int8)
+            deeper = np.frombuffer(other['depths'], dtype=np.int8) > depths
+            for name, code in self.FIELDS:
+                mine = np.frombuffer(getattr(self, name), dtype=code)
+                mine[deeper] = np.frombuffer(other[name], dtype=code)[deeper]
+            return int(deeper.sum())
+        deeper = [i for i, (theirs, mine) in enumerate(zip(other['depths'], self.depths)) if theirs > mine]
+        for name, _ in self.FIELDS:
+            mine, theirs = getattr(self, name), other[name]
+            for i in deeper:
+                mine[i] = theirs[i]
+        return len(deeper)
+
+    def _copy(self, src, dst):
+        self.keys[dst] = self.keys[src]
+        self.depths[dst] = self.depths[src]
+        self.flags[dst] = self.flags[src]
+        self.scores[dst] = self.scores[src]
+        self.moves[dst] = self.moves[src]
+        self.generations[dst] = self.generations[src]
+
+TT = TranspositionTable(path=TT_PATH)
+
+# Évaluation vectorisée
+# Un lot de plateaux est un tableau (N, 16) d'octets : le code de la pièce
+# (4 bits) par case, EMPTY_CODE pour une case vide.
+EMPTY_CODE = 16
+LINE_SQUARES = tuple(tuple(sq for sq in range(16) if line >> sq & 1) for line in LINES)
+CENTER_SQUARES = (5, 6, 9, 10)
+
+def boards_to_array(boards):
+    """Convertit une liste de plateaux (masques) en lot NumPy"""
+    rows = np.full((len(boards), 16), EMPTY_CODE, dtype=np.uint8)
+    for n, masks in enumerate(boards):
+        for sq in range(16):
+            if masks[0] >> sq & 1:
+                rows[n, sq] = piece_at(masks, sq)
+    return rows
+
+def _batch_lines(rows):
+    """Pour chaque plateau et ligne : cases remplies, attributs partagés à 1 et à 0 (masques 4 bits)"""
+    pieces = rows[:, LINE_SQUARES]                                  # (N, 10, 4)
+    count = 4 - (pieces == EMPTY_CODE).sum(axis=2)                  # (N, 10)
+    all_ones = np.bitwise_and.reduce(_AND_CODES[pieces], axis=2)    # une case vide est neutre
+    all_zeros = np.bitwise_and.reduce(_AND_COMPLEMENTS[pieces], axis=2)
+    return count, all_ones, all_zeros
+
+def batch_features(rows):
+    """Termes de `evaluate_board` par plateau du lot, (N, 3) entiers : attributs
+    partagés fois pièces des lignes incomplètes, attributs non partagés des lignes
+    de trois, cases centrales occupées ; et le masque des plateaux gagnants"""
+    count, all_ones, all_zeros = _batch_lines(rows)
+    shared = _SHARED_COUNT[all_ones | all_zeros]
+    partial = (count > 0) & (count < 4)
+    features = np.stack([
+        np.where(partial, count * shared, 0).sum(axis=1),
+        np.where(count == 3, 4 - shared, 0).sum(axis=1),
+        (rows[:, CENTER_SQUARES] != EMPTY_CODE).sum(axis=1),
+    ], axis=1)
+    won = ((count == 4) & (shared > 0)).any(axis=1)
+    return features, won
+
+def batch_evaluate(rows):
+    """`evaluate_board` sur tout un lot ; retourne un tableau de scores (inf si gagnant)"""
+    features, won = batch_features(rows)
+    score = features @ np.array([SHARED_WEIGHT, -DANGER_WEIGHT, CENTER_WEIGHT])
+    return np.where(won, np.inf, score.astype(np.float64))
+
+def batch_deadly(rows):
+    """Masque (16 bits) des pièces qui gagneraient posées sur chaque plateau du lot"""
+    count, all_ones, all_zeros = _batch_lines(rows)
+    deadly = _DEADLY_TABLE[all_ones | all_zeros.astype(np.int64) << 4]
+    return np.bitwise_or.reduce(np.where(count == 3, deadly, 0), axis=1)
+
+_POPCOUNT4 = tuple(bin(i).count("1") for i in range(16))
+if np is not None:
+    _AND_CODES = np.array(list(range(16)) + [0xF], dtype=np.uint8)
+    _AND_COMPLEMENTS = np.array([code ^ 0xF for code in range(16)] + [0xF], dtype=np.uint8)
+    _SHARED_COUNT = np.array(_POPCOUNT4, dtype=np.int64)
+    _DEADLY_TABLE = np.array(DEADLY_BY_SHARED, dtype=np.int64)
+
+# État de recherche incrémental
+LINE_IDS_BY_SQUARE = tuple(tuple(i for i, line in enumerate(LINES) if line >> sq & 1) for sq in range(16))
+# Cadre d'annulation : case, score, lignes aux trois quarts, index des pièces
+# gagnantes, victoires, clé, puis (compte, ET, ET des compléments) par ligne
+UNDO_FRAME = 6 + 3 * max(len(ids) for ids in LINE_IDS_BY_SQUARE)
+GIVE_FRAME = -1  # marque d'un cadre de don (la pièce précédente suit)
+class SearchState:
+    """Position de recherche modifiée sur place (faire/défaire un coup).
+
+    Tient à jour, pour chaque ligne, le nombre de cases remplies et les
+    attributs partagés (ET des codes, ET des compléments), ainsi que la clé de
+    Zobrist et le score heuristique : un coup ne touche que ses 2 ou 3 lignes.
+    L'index `deadly_mask` des pièces gagnantes (lignes remplies aux trois
+    quarts et valeurs d'attributs qui les complètent) suit de la même façon.
+
+    De quoi défaire chaque pose ou don est écrit dans une pile de cadres
+    alloués une fois pour toutes (`frames`, hauteur `top`) : faire et défaire
+    un coup n'alloue rien. Les listes de coups restent construites par nœud.
+    """
+    __slots__ = ('occ', 'attrs', 'board', 'remaining', 'piece', 'key', 'counts', 'ones', 'zeros',
+                 'three', 'deadly_mask', 'wins', 'score', 'frames', 'top')
+
+    def __init__(self, masks, remaining, piece):
+        self.occ = 0
+        self.attrs = [0, 0, 0, 0]
+        self.board = [EMPTY_CODE] * 16  # code de la pièce par case
+        self.counts = [0] * len(LINES)
+        self.ones = [0xF] * len(LINES)
+        self.zeros = [0xF] * len(LINES)
+        self.three = 0   # masque des lignes remplies aux trois quarts
+        self.deadly_mask = 0  # pièces qui gagneraient posées maintenant
+        self.wins = 0    # lignes complètes gagnantes
+        self.score = 0
+        self.key = 0
+        # Un cadre par pose ou don : au plus 16 de chaque
+        self.frames = [[0] * UNDO_FRAME for _ in range(32)]
+        self.top = 0
+        for sq in range(16):
+            if masks[0] >> sq & 1:
+                self.piece = piece_at(masks, sq)
+                self.play(sq)
+        self.top = 0
+        self.remaining = remaining
+        self.piece = piece
+        for code in mask_to_codes(remaining):
+            self.key ^= Z_REMAINING[code]
+        if piece is not None:
+            self.key ^= Z_PIECE[piece]
+
+    def masks(self):
+        return (self.occ,) + tuple(self.attrs)
+
+    def play(self, sq):
+        """Pose la pièce courante sur la case `sq` (la pièce reste courante jusqu'au don)"""
+        code = self.piece
+        counts, ones, zeros = self.counts, self.ones, self.zeros
+        frame = self.frames[self.top]
+        self.top += 1
+        frame[0] = sq
+        frame[1] = self.score
+        frame[2] = self.three
+        frame[3] = self.deadly_mask
+        frame[4] = self.wins
+        frame[5] = self.key
+        j = 6
+        for i in LINE_IDS_BY_SQUARE[sq]:
+            frame[j] = counts[i]
+            frame[j + 1] = ones[i]
+            frame[j + 2] = zeros[i]
+            j += 3
+        bit = 1 << sq
+        self.occ |= bit
+        self.board[sq] = code
+        attrs = self.attrs
+        for i in range(4):
+            if code >> i & 1:
+                attrs[i] |= bit
+        self.key ^= Z_SQUARE[sq][code]
+        score = self.score
+        if CENTER_MASK & bit:
+            score += CENTER_WEIGHT
+        closed = False
+        for i in LINE_IDS_BY_SQUARE[sq]:
+            count = counts[i]
+            score -= LINE_SCORES[count][ones[i] | zeros[i]]
+            count += 1
+            counts[i] = count
+            ones[i] &= code
+            zeros[i] &= ~code
+            shared = (ones[i] | zeros[i]) & 0xF
+            score += LINE_SCORES[count][shared]
+            if count == 3:
+                self.three |= 1 << i
+                self.deadly_mask |= DEADLY_BY_SHARED[ones[i] | zeros[i] << 4]
+            elif count == 4:
+                self.three &= ~(1 << i)
+                closed = True
+                if shared:
+                    self.wins += 1
+        if closed:
+            # Une ligne pleine ne menace plus : on recompose l'index sur les autres
+            deadly = 0
+            three = self.three
+            while three:
+                low = three & -three
+                i = low.bit_length() - 1
+                deadly |= DEADLY_BY_SHARED[ones[i] | zeros[i] << 4]
+                three ^= low
+            self.deadly_mask = deadly
+        self.score = score
+
+    def undo_play(self):
+        self.top -= 1
+        frame = self.frames[self.top]
+        sq = frame[0]
+        self.score = frame[1]
+        self.three = frame[2]
+        self.deadly_mask = frame[3]
+        self.wins = frame[4]
+        self.key = frame[5]
+        bit = ~(1 << sq)
+        self.occ &= bit
+        self.board[sq] = EMPTY_CODE
+        attrs = self.attrs
+        for i in range(4):
+            attrs[i] &= bit
+        counts, ones, zeros = self.counts, self.ones, self.zeros
+        j = 6
+        for i in LINE_IDS_BY_SQUARE[sq]:
+            counts[i] = frame[j]
+            ones[i] = frame[j + 1]
+            zeros[i] = frame[j + 2]
+            j += 3
+
+    def give(self, code):
+        """Retire `code` des pièces restantes et en fait la pièce courante"""
+        frame = self.frames[self.top]
+        self.top += 1
+        frame[0] = GIVE_FRAME
+        frame[1] = self.piece
+        key = self.key ^ Z_REMAINING[code] ^ Z_PIECE[code]
+        if self.piece is not None:
+            key ^= Z_PIECE[self.piece]
+        self.key = key
+        self.remaining &= ~(1 << code)
+        self.piece = code
+
+    def undo_give(self):
+        code = self.piece
+        self.top -= 1
+        self.piece = self.frames[self.top][1]
+        self.remaining |= 1 << code
+        key = self.key ^ Z_REMAINING[code] ^ Z_PIECE[code]
+        if self.piece is not None:
+            key ^= Z_PIECE[self.piece]
+        self.key = key
+
+    def undo_to(self, mark):
+        """Défait poses et dons jusqu'à ramener la pile à la hauteur `mark`"""
+        frames = self.frames
+        while self.top > mark:
+            if frames[self.top - 1][0] != GIVE_FRAME:
+                self.undo_play()
+            else:
+                self.undo_give()
+
+    def shared_mask(self, i):
+        """Attributs (4 bits) partagés par les pièces de la ligne i"""
+        return (self.ones[i] | self.zeros[i]) & 0xF
+
+    def can_win(self, code):
+        """Vrai si la pièce `code` complète une ligne gagnante quelque part"""
+        return bool(self.deadly_mask >> code & 1)
+
+    def deadly(self):
+        """Masque des pièces qui gagneraient posées maintenant"""
+        return self.deadly_mask
+
+    def safe(self):
+        """Masque des pièces restantes qu'on peut donner sans perdre au demi-coup suivant"""
+        return self.remaining & ~self.deadly_mask
+
+    def winning_square(self, code):
+        """Case où `code` gagne, ou None"""
+        three = self.three
+        while three:
+            low = three & -three
+            i = low.bit_length() - 1
+            if (self.ones[i] & code) | (self.zeros[i] & ~code & 0xF):
+                return (LINES[i] & ~self.occ).bit_length() - 1
+            three ^= low
+        return None
+
+    def evaluate(self):
+        """Même valeur que `evaluate_board`, tenue à jour à chaque coup"""
+        return float('inf') if self.wins else self.score
+
+# Recherche alpha-beta
+# Un coup est joint : poser la pièce reçue sur une case, puis choisir la pièce
+# donnée à l'adversaire. Il est codé case * 16 + pièce dans la table.
+# Scores entiers : l'heuristique de evaluate_board pour nous, ou WIN_SCORE - n
+# pour une victoire à la n-ième pose depuis la racine (-(WIN_SCORE - n) pour
+# une défaite), de sorte qu'on préfère les victoires rapides et les défaites
+# lentes. Dans la table, les distances sont relatives au nœud.
+WIN_SCORE = 10000  # au-delà de toute valeur heuristique
+WIN_BOUND = WIN_SCORE - 32  # au-delà, le score est une victoire ou une défaite prouvée
+
+def is_win_score(score):
+    """Vrai pour une victoire ou une défaite prouvée"""
+    return score is not None and abs(score) >= WIN_BOUND
+
+class SearchTimeout(Exception):
+    """Levée dans la recherche quand l'échéance est dépassée"""
+
+class SearchResult:
+    """Meilleur coup de la dernière itération complète"""
+    def __init__(self, pos, piece, score, depth, nodes):
+        self.pos = pos          # case où poser la pièce reçue (None s'il n'y en a pas)
+        self.piece = piece      # code de la pièce à donner (None s'il n'en reste pas)
+        self.score = score      # pour nous : heuristique, ou ±(WIN_SCORE - n) si prouvé
+        self.depth = depth      # profondeur de la dernière itération terminée (0 : aucune)
+        self.nodes = nodes
+        self.exact = False      # score exact du solveur de fin de partie
+
+    def __repr__(self):
+        return f"SearchResult(pos={self.pos}, piece={self.piece}, score={self.score}, depth={self.depth}, nodes={self.nodes})"
+
+class Searcher:
+    """Négamax alpha-beta sur les coups joints (case, pièce), par approfondissement itératif.
+
+    Après le premier coup de chaque nœud, les suivants sont réfutés par une
+    fenêtre nulle et recherchés à nouveau seulement s'ils la dépassent (PVS) ;
+    chaque itération part d'une fenêtre d'aspiration autour du score de la
+    précédente. Les nœuds de profondeur paire depuis la racine sont les nôtres :
+    l'heuristique y compte pour le joueur au trait, à l'opposé sinon.
+
+    L'échéance (`time.monotonic()`) est vérifiée dans la recherche elle-même,
+    ainsi que l'événement `stop` s'il est défini ; une itération interrompue
+    est abandonnée et on garde la précédente.
+    """
+    CHECK_EVERY = 256  # nœuds entre deux lectures de l'horloge
+
+    def __init__(self, tt=None):
+        self.tt = tt if tt is not None else TT
+        self.deadline = None
+        self.stop = None  # événement (ou PonderStop) qui interrompt la recherche : réflexion en cours
+        self.root_depth = 0  # profondeur de l'itération en cours, à la racine
+        self.nodes = 0
+        self.next_check = 0
+        self.depth_limited = False
+        self.reset_counters()
+        self.clear_history()
+
+    def clear_history(self):
+        """Tables d'ordonnancement apprises des coupures, par nombre de cases
+        remplies : deux coups tueurs, historique des cases et des pièces données"""
+        self.killers = [[] for _ in range(17)]
+        self.place_history = [[0] * 16 for _ in range(17)]
+        self.give_history = [[0] * 16 for _ in range(17)]
+
+    def history(self, ply, pos, give):
+        """Poids d'historique du coup joint (pos, give) à `ply` cases remplies"""
+        weight = self.give_history[ply][give] if give is not None else 0
+        return weight + (self.place_history[ply][pos] if pos is not None else 0)
+
+    def age_history(self):
+        """Entre deux recherches : oublie les tueurs et divise l'historique par deux"""
+        for killers in self.killers:
+            killers.clear()
+        for table in self.place_history + self.give_history:
+            for i, value in enumerate(table):
+                table[i] = value >> 1
+
+    def reset_counters(self):
+        self.cutoffs_max = 0   # coupures beta aux nœuds maximisants
+        self.cutoffs_min = 0   # coupures alpha aux nœuds minimisants
+        self.tt_cutoffs = 0    # nœuds résolus par la table de transposition
+        self.researches = 0    # fenêtres nulles dépassées, recherchées à nouveau
+        self.aspiration_fails = 0  # itérations reprises hors de la fenêtre d'aspiration
+        self.evaluations = 0   # feuilles évaluées par l'heuristique
+        self.extensions = 0    # coups à pièce forcée suivis sans réduire la profondeur
+        self.tablebase_hits = 0  # nœuds résolus par la table de fin de partie
+        self.root_times = {}   # coup racine -> secondes, toutes itérations comprises
+
+    def counters(self):
+        """Compteurs de la dernière recherche (journal des requêtes)"""
+        return {
+            "nodes": self.nodes,
+            "cutoffs": {"max": self.cutoffs_max, "min": self.cutoffs_min, "tt": self.tt_cutoffs},
+            "researches": self.researches,
+            "aspiration_fails": self.aspiration_fails,
+            "evaluations": self.evaluations,
+            "extensions": self.extensions,
+            "tablebase_hits": self.tablebase_hits,
+            "tt": {"hits": self.tt.hits, "misses": self.tt.misses},
+            "root_ms": {
+                f"{pos}/{PIECE_NAMES[give] if give is not None else None}": round(seconds * 1000, 2)
+                for (pos, give), seconds in self.root_times.items()
+            },
+        }
+
+    def search(self, masks, remaining, piece, deadline=None, max_depth=None):
+        """Approfondit jusqu'à l'échéance ; la position est à notre tour (maximisant)"""
+        self.deadline = deadline
+        self.nodes = self.next_check = 0
+        self.reset_counters()
+        self.age_history()
+        self.tt.reset_stats()
+        if self.stop is None:
+            # La réflexion garde la génération : elle ne rend pas remplaçables
+            # les entrées des recherches réelles
+            self.tt.new_search()
+        free = empty_squares(masks[0])
+        
+        # Victoire immédiate : inutile de chercher
+        if piece is not None:
+            for pos in free:
+                if wins_with(masks, pos, piece):
+                    gives = mask_to_codes(remaining)
+                    return SearchResult(pos, gives[0] if gives else None, WIN_SCORE - 1, 0, 0)
+        
+        moves = self._root_moves(masks, remaining, piece, free)
+        best = SearchResult(moves[0][0], moves[0][1], None, 0, 0)
+        limit = len(free) if max_depth is None else min(max_depth, len(free))
+        for depth in range(1, limit + 1):
+            self.depth_limited = False
+            try:
+                scored = self._aspiration(masks, remaining, piece, moves, depth, best.score)
+            except SearchTimeout:
+                break
+            # Meilleur coup d'abord à l'itération suivante : le premier au score
+            # maximal (les suivants à égalité n'en sont que majorés), puis les
+            # autres par score, l'historique départage
+            first = max(scored, key=lambda item: item[0])
+            scored.remove(first)
+            ply = masks[0].bit_count()
+            scored.sort(key=lambda item: (-item[0], -self.history(ply, *item[1])))
+            moves = [first[1]] + [move for _, move in scored]
+            score, (pos, give) = first
+            best = SearchResult(pos, give, score, depth, self.nodes)
+            if not self.depth_limited or is_win_score(score):
+                break  # arbre entièrement exploré ou résultat prouvé
+        best.nodes = self.nodes
+        return best
+
+    def _aspiration(self, masks, remaining, piece, moves, depth, guess):
+        """Itération à `depth` dans une fenêtre autour de `guess`, rouverte du côté
+        où le meilleur score en sort"""
+        delta = ASPIRATION_WINDOW
+        if guess is None or is_win_score(guess):
+            alpha, beta = -WIN_SCORE, WIN_SCORE
+        else:
+            alpha, beta = guess - delta, guess + delta
+        while True:
+            scored = self._search_root(masks, remaining, piece, moves, depth, alpha, beta)
+            score, move = max(scored, key=lambda item: item[0])
+            delta *= 2
+            if score <= alpha and alpha > -WIN_SCORE:
+                alpha = max(score - delta, -WIN_SCORE)
+            elif score >= beta and beta < WIN_SCORE:
+                beta = min(score + delta, WIN_SCORE)
+                moves = [move] + [other for other in moves if other != move]
+            else:
+                return scored
+            self.aspiration_fails += 1
+
+    def _root_moves(self, masks, remaining, piece, free):
+        """Coups racine : cases qui laissent une pièce sûre et au meilleur score statique d'abord,
+        puis pièces qui ne font pas gagner l'adversaire"""
+        if piece is None:
+            return [(None, give) for give in self._gives(remaining, deadly_pieces(masks))]
+        scores, deadly = self._placements(SearchState(masks, remaining, piece), free)
+        order = sorted(range(len(free)), key=lambda n: (not remaining & ~deadly[n], -scores[n]))
+        moves = []
+        for n in order:
+            if not remaining:
+                moves.append((free[n], None))
+            for give in self._gives(remaining, deadly[n]):
+                moves.append((free[n], give))
+        return moves
+
+    @staticmethod
+    def _gives(remaining, deadly):
+        """Pièces à essayer : les pièces sûres, ou une seule pièce perdante s'il n'y en a pas"""
+        safe = remaining & ~deadly
+        if safe:
+            return mask_to_codes(safe)
+        return mask_to_codes(remaining)[:1]
+
+    def _placements(self, state, free):
+        """Score heuristique et pièces gagnantes après chaque pose de la pièce courante.
+
+        En lot NumPy quand il y a assez de cases, sinon par faire/défaire.
+        """
+        if np is not None and BATCH_EVAL and len(free) >= BATCH_MIN:
+            rows = np.array(state.board, dtype=np.uint8)[None].repeat(len(free), axis=0)
+            rows[np.arange(len(free)), free] = state.piece
+            return batch_evaluate(rows).tolist(), batch_deadly(rows).tolist()
+        scores = []
+        deadly = []
+        for pos in free:
+            state.play(pos)
+            scores.append(state.evaluate())
+            deadly.append(state.deadly())
+            state.undo_play()
+        return scores, deadly
+
+    def _frontier(self, state, alpha, beta, ply):
+        """Nœud à profondeur 1, sans récursion : chaque fils vaut la victoire adverse
+        si la pièce donnée gagne, le score heuristique du plateau sinon (les lignes
+        forcées n'y sont pas prolongées : cela coûterait un nœud par pose)"""
+        self.depth_limited = True
+        occ = state.occ
+        remaining = state.remaining
+        free = [sq for sq in SQUARE_ORDER if not occ >> sq & 1]
+        self.nodes += len(free)
+        self.evaluations += len(free)
+        lost = -(WIN_SCORE - (ply + 2))  # l'adversaire gagne à la pose suivante
+        sign = -1 if ply & 1 else 1
+        if np is not None and BATCH_EVAL and len(free) >= BATCH_MIN:
+            scores, deadly = self._placements(state, free)
+            return max(sign * score if remaining & ~d else lost for score, d in zip(scores, deadly))
+        best = None
+        for pos in free:
+            state.play(pos)
+            value = sign * state.evaluate() if remaining & ~state.deadly_mask else lost
+            state.undo_play()
+            if best is None or value > best:
+                best = value
+                if best >= beta:
+                    break
+        return best
+
+    def _search_root(self, masks, remaining, piece, moves, depth, alpha=-WIN_SCORE, beta=WIN_SCORE):
+        """Scores des coups racine dans la fenêtre (alpha, beta) : exact pour le premier
+        meilleur, majorant pour les autres ; s'arrête au premier coup qui atteint beta"""
+        state = SearchState(masks, remaining, piece)
+        scored = []
+        root_times = self.root_times
+        self.root_depth = depth
+        for pos, give in moves:
+            start = time.perf_counter()
+            if pos is not None:
+                state.play(pos)
+            if give is None:
+                score = state.evaluate()
+            else:
+                child_depth = depth - 1
+                if FORCED_EXTENSION and state.safe() == 1 << give and depth >= 3:
+                    child_depth = depth
+                    self.extensions += 1
+                state.give(give)
+                if not scored:
+                    score = -self._negamax(state, child_depth, -beta, -alpha, 1)
+                else:
+                    score = -self._negamax(state, child_depth, -alpha - 1, -alpha, 1)
+                    if alpha < score < beta:
+                        self.researches += 1
+                        score = -self._negamax(state, child_depth, -beta, -alpha, 1)
+                state.undo_give()
+            if pos is not None:
+                state.undo_play()
+            scored.append((score, (pos, give)))
+            alpha = max(alpha, score)
+            root_times[pos, give] = root_times.get((pos, give), 0.0) + time.perf_counter() - start
+            if alpha >= beta:
+                break
+        return scored
+
+    def _value(self, state, depth, is_maximizing, alpha, beta):
+        """Valeur pour nous de la position où `state.piece` est à poser par nous
+        (`is_maximizing`) ou par l'adversaire"""
         if is_maximizing:
-            max_score = -float('inf')
-            for pos in get_available_positions(board):
-                new_board = board.copy()
-                new_board[pos] = current_piece
-                score = minimax_cached(
-                    tuple(new_board), tuple(remaining_pieces), None,
-                    depth-1, False, alpha, beta
-                )
-                max_score = max(max_score, score)
+            self.root_depth = depth
+            return self._negamax(state, depth, alpha, beta, 0)
+        self.root_depth = depth + 1
+        return -self._negamax(state, depth, -beta, -alpha, 1)
+
+    def _negamax(self, state, depth, alpha, beta, ply):
+        """Valeur, pour le joueur au trait, de la position où il doit poser `state.piece`,
+        `ply` poses après la racine"""
+        self.nodes += 1
+        if self.nodes >= self.next_check and self.deadline is not None:
+            if time.monotonic() > self.deadline or (self.stop is not None and self.stop.is_set()):
+                raise SearchTimeout()
+            self.next_check = self.nodes + self.CHECK_EVERY
+        
+        # Conditions terminales
+        if state.can_win(state.piece):
+            return WIN_SCORE - (ply + 1)
+        if not state.remaining:
+            self.evaluations += 1
+            return -state.evaluate() if ply & 1 else state.evaluate()
+        # Table de fin de partie : résultat exact. Pas aux feuilles, où la clé
+        # canonique coûterait plus que l'évaluation, ni sur une occupation absente
+        tablebase = TABLEBASE
+        if tablebase is not None and depth and ply <= TABLEBASE_PLY and state.occ in tablebase.occupancies:
+            result = tablebase.probe(
+                canonical_key(state.masks(), state.remaining, state.piece, False, BOARD_SYMMETRIES)[0])
+            if result is not None:
+                self.tablebase_hits += 1
+                return tablebase_score(result, ply, 16 - state.occ.bit_count())
+        if depth == 0:
+            self.depth_limited = True
+            self.evaluations += 1
+            return -state.evaluate() if ply & 1 else state.evaluate()
+        # Au mieux on gagne à la pose ply + 3, au pire on perd à la pose ply + 2
+        alpha = max(alpha, -(WIN_SCORE - (ply + 2)))
+        beta = min(beta, WIN_SCORE - (ply + 3))
+        if alpha >= beta:
+            return alpha
+        if depth == 1:
+            return self._frontier(state, alpha, beta, ply)
+        
+        # Consultation de la table de transposition ; près de la racine, la clé
+        # canonique partage le résultat entre toutes les positions symétriques.
+        # L'heuristique n'est pas symétrique entre les joueurs : la clé dit à qui
+        # est le nœud. La profondeur comptée est celle sans les extensions de
+        # la ligne : un nœud prolongé ne vaut pas le coût de la clé canonique.
+        tt = self.tt
+        sym = None
+        ours = not ply & 1
+        tt_key = state.key ^ Z_MAXIMIZING if ours else state.key
+        if self.root_depth - ply >= CANONICAL_DEPTH:
+            tt_key, sym = canonical_key(state.masks(), state.remaining, state.piece, ours)
+        hint = NO_MOVE
+        entry = tt.lookup(tt_key)
+        if entry is not None:
+            entry_depth, flag, entry_score, hint = entry
+            if sym is not None and hint != NO_MOVE:
+                hint = (square_from_canonical(sym, hint >> 4) << 4) | piece_from_canonical(sym, hint & 0xF)
+            if entry_depth >= depth:
+                entry_score = self._from_table(entry_score, ply)
+                # Le score stocké a pu être limité par la profondeur
+                if not is_win_score(entry_score):
+                    self.depth_limited = True
+                if flag == EXACT:
+                    self.tt_cutoffs += 1
+                    return entry_score
+                if flag == LOWER:
+                    alpha = max(alpha, entry_score)
+                else:
+                    beta = min(beta, entry_score)
+                if alpha >= beta:
+                    self.tt_cutoffs += 1
+                    return entry_score
+        alpha_orig = alpha
+        
+        # Ordre des coups : celui de la table, puis les coups tueurs de ce
+        # niveau, puis l'historique (à égalité, l'ordre statique des cases)
+        occ = state.occ
+        remaining = state.remaining
+        filled = occ.bit_count()
+        killers = self.killers[filled]
+        place_history = self.place_history[filled]
+        give_history = self.give_history[filled]
+        free = [sq for sq in SQUARE_ORDER if not occ >> sq & 1]
+        free.sort(key=place_history.__getitem__, reverse=True)
+        for move in reversed(killers):
+            if move >> 4 in free:
+                free.remove(move >> 4)
+                free.insert(0, move >> 4)
+        hint_give = None
+        if hint != NO_MOVE and hint >> 4 in free and remaining >> (hint & 0xF) & 1:
+            free.remove(hint >> 4)
+            free.insert(0, hint >> 4)
+            hint_give = hint & 0xF
+        
+        # Donner une pièce de l'index fait gagner l'adversaire : c'est le pire
+        # coup possible, on ne l'essaie que s'il n'y a pas de pièce sûre
+        best_score = -(WIN_SCORE - (ply + 2))
+        best_move = NO_MOVE
+        first = True
+        for pos in free:
+            state.play(pos)
+            safe = remaining & ~state.deadly_mask
+            if not safe:
+                state.undo_play()
+                if best_move == NO_MOVE:
+                    best_move = pos << 4 | (remaining & -remaining).bit_length() - 1
+                continue
+            gives = mask_to_codes(safe)
+            gives.sort(key=give_history.__getitem__, reverse=True)
+            for move in reversed(killers):
+                if move >> 4 == pos and safe >> (move & 0xF) & 1:
+                    gives.remove(move & 0xF)
+                    gives.insert(0, move & 0xF)
+            if hint_give is not None and safe >> hint_give & 1:
+                gives.remove(hint_give)
+                gives.insert(0, hint_give)
+            # Une seule pièce sûre : pas de vrai choix, la ligne est suivie sans
+            # réduire la profondeur (bornée par les cases restantes). Pas juste
+            # au-dessus de la frontière : le fils y deviendrait un nœud complet
+            # au lieu d'une évaluation statique, pour un coût de moitié en plus
+            child_depth = depth - 1
+            if FORCED_EXTENSION and len(gives) == 1 and depth >= 3:
+                child_depth = depth
+                self.extensions += 1
+            for give in gives:
+                state.give(give)
+                # Fenêtre complète pour le premier coup, nulle pour les suivants
+                if first:
+                    score = -self._negamax(state, child_depth, -beta, -alpha, ply + 1)
+                    first = False
+                else:
+                    score = -self._negamax(state, child_depth, -alpha - 1, -alpha, ply + 1)
+                    if alpha < score < beta:
+                        self.researches += 1
+                        score = -self._negamax(state, child_depth, -beta, -alpha, ply + 1)
+                state.undo_give()
+                if score > best_score or best_move == NO_MOVE:
+                    best_score, best_move = score, pos << 4 | give
                 alpha = max(alpha, score)
-                if beta <= alpha:
+                if alpha >= beta:
                     break
-            return max_score
+            state.undo_play()
+            if alpha >= beta:
+                if ply & 1:
+                    self.cutoffs_min += 1
+                else:
+                    self.cutoffs_max += 1
+                bonus = depth * depth
+                place_history[best_move >> 4] += bonus
+                give_history[best_move & 0xF] += bonus
+                if best_move not in killers:
+                    killers.insert(0, best_move)
+                    del killers[2:]
+                break
+        
+        if best_score <= alpha_orig:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
         else:
-            min_score = float('inf')
-            for pos in get_available_positions(board):
-                new_board = board.copy()
-                new_board[pos] = current_piece
-                score = minimax_cached(
-                    tuple(new_board), tuple(remaining_pieces), None,
-                    depth-1, True, alpha, beta
-                )
-                min_score = min(min_score, score)
-                beta = min(beta, score)
-                if beta <= alpha:
-                    break
-            return min_score
-    else:
-        # Choisir une pièce
-        pieces = sorted(remaining_pieces, key=lambda p: -piece_danger_score(p, board))
+            flag = EXACT
+        if sym is not None:
+            best_move = (square_to_canonical(sym, best_move >> 4) << 4) | piece_to_canonical(sym, best_move & 0xF)
+        tt.store(tt_key, depth, flag, self._to_table(best_score, ply), best_move)
+        return best_score
+
+    @staticmethod
+    def _to_table(score, ply):
+        """Distance de victoire comptée depuis le nœud plutôt que depuis la racine"""
+        return score + ply if score >= WIN_BOUND else score - ply if score <= -WIN_BOUND else score
+
+    @staticmethod
+    def _from_table(score, ply):
+        return score - ply if score >= WIN_BOUND else score + ply if score <= -WIN_BOUND else score
+
+SEARCHER = Searcher()
+
+# Résolution exacte de fin de partie
+# Score négamax du point de vue du joueur au trait : SOLVED_WIN - n pour une
+# victoire au n-ième demi-coup depuis la racine, -(SOLVED_WIN - n) pour une
+# défaite, 0 pour une nulle. Dans la table, les distances sont relatives au nœud.
+SOLVED_WIN = 100
+
+def solved_outcome(score):
+    """Traduit un score exact en (résultat, nombre de demi-coups)"""
+    if score > 0:
+        return "win", SOLVED_WIN - score
+    if score < 0:
+        return "loss", SOLVED_WIN + score
+    return "draw", None
+
+class EndgameSolver:
+    """Résolution exacte de fin de partie (négamax alpha-beta sans limite de profondeur).
+
+    Utilise sa propre table de transposition, indexée par les 32 symétries
+    du plateau (le résultat exact ne dépend pas de l'heuristique), et ne
+    considère que les pièces qui ne donnent pas la victoire immédiate.
+
+    Les positions de la table de fin de partie (TABLEBASE) y sont lues sans
+    recherche. Elle ne garde pas la distance : une victoire ou une défaite
+    lue y compte à la dernière pose possible du joueur concerné, si bien que
+    le résultat reste exact mais sa distance n'est qu'un majorant.
+    """
+    CHECK_EVERY = 256
+    CANONICAL_EMPTY = 6  # cases vides à partir desquelles la clé est canonique
+
+    def __init__(self, tt=None):
+        self.tt = tt if tt is not None else TranspositionTable(ENDGAME_TT_SIZE_MB)
+        self.deadline = None
+        self.nodes = 0
+        self.tablebase_hits = 0
+
+    def solve(self, masks, remaining, piece, deadline=None):
+        """Meilleur coup joint et score exact ; lève SearchTimeout après l'échéance"""
+        self.deadline = deadline
+        self.nodes = self.tablebase_hits = 0
+        free = empty_squares(masks[0])
+        gives = mask_to_codes(remaining)
+        if piece is not None:
+            for pos in free:
+                if wins_with(masks, pos, piece):
+                    return self._result(pos, gives[0] if gives else None, SOLVED_WIN - 1, free)
         
-        if is_maximizing:
-            max_score = -float('inf')
-            for piece in pieces:
-                new_remaining = [p for p in remaining_pieces if p != piece]
-                score = minimax_cached(
-                    tuple(board), tuple(new_remaining), piece,
-                    depth-1, False, alpha, beta
-                )
-                max_score = max(max_score, score)
+        state = SearchState(masks, remaining, piece)
+        alpha, beta = -SOLVED_WIN, SOLVED_WIN
+        best = None
+        for pos in free if piece is not None else [None]:
+            if pos is not None:
+                state.play(pos)
+            if not remaining:
+                candidates = [(0, None)]
+            else:
+                safe = state.safe()
+                if not safe:
+                    # Toutes les pièces font gagner l'adversaire au demi-coup suivant
+                    candidates = [(-(SOLVED_WIN - 2), gives[0])]
+                else:
+                    candidates = []
+                    for give in mask_to_codes(safe):
+                        state.give(give)
+                        score = -self._solve(state, -beta, -alpha, 1)
+                        state.undo_give()
+                        candidates.append((score, give))
+                        alpha = max(alpha, score)
+            if pos is not None:
+                state.undo_play()
+            for score, give in candidates:
+                if best is None or score > best[0]:
+                    best = (score, pos, give)
+            alpha = max(alpha, best[0])
+        score, pos, give = best
+        return self._result(pos, give, score, free)
+
+    def _result(self, pos, give, score, free):
+        result = SearchResult(pos, give, score, len(free), self.nodes)
+        result.exact = True
+        return result
+
+    def _solve(self, state, alpha, beta, ply):
+        """Score exact (joueur au trait) de la position où il faut poser `state.piece`"""
+        self.nodes += 1
+        if self.deadline is not None and not self.nodes % self.CHECK_EVERY and time.monotonic() > self.deadline:
+            raise SearchTimeout()
+        if state.deadly_mask >> state.piece & 1:
+            return SOLVED_WIN - (ply + 1)
+        remaining = state.remaining
+        if not remaining:
+            return 0  # la dernière pièce remplit le plateau sans gagner
+        
+        # Au mieux on gagne au demi-coup ply + 3, au pire on perd au demi-coup ply + 2
+        alpha = max(alpha, -(SOLVED_WIN - (ply + 2)))
+        beta = min(beta, SOLVED_WIN - (ply + 3))
+        if alpha >= beta:
+            return alpha
+        
+        free = empty_squares(state.occ)
+        tablebase = TABLEBASE
+        if tablebase is not None and state.occ in tablebase.occupancies:
+            result = tablebase.probe(canonical_key(state.masks(), remaining, state.piece, False, BOARD_SYMMETRIES)[0])
+            if result is not None:
+                self.tablebase_hits += 1
+                return self._tablebase_score(result, ply, len(free))
+        sym = None
+        tt_key = state.key
+        if len(free) >= self.CANONICAL_EMPTY:
+            tt_key, sym = canonical_key(state.masks(), remaining, state.piece, False, BOARD_SYMMETRIES)
+        hint = NO_MOVE
+        entry = self.tt.lookup(tt_key)
+        if entry is not None:
+            _, flag, entry_score, hint = entry
+            entry_score = self._from_table(entry_score, ply)
+            if sym is not None and hint != NO_MOVE:
+                hint = (square_from_canonical(sym, hint >> 4) << 4) | piece_from_canonical(sym, hint & 0xF)
+            if flag == EXACT:
+                return entry_score
+            if flag == LOWER:
+                alpha = max(alpha, entry_score)
+            else:
+                beta = min(beta, entry_score)
+            if alpha >= beta:
+                return entry_score
+        alpha_orig = alpha
+        
+        if hint != NO_MOVE and hint >> 4 in free:
+            free.remove(hint >> 4)
+            free.insert(0, hint >> 4)
+        best_score = -SOLVED_WIN
+        best_move = NO_MOVE
+        for pos in free:
+            state.play(pos)
+            safe = remaining & ~state.deadly_mask
+            if not safe:
+                state.undo_play()
+                score = -(SOLVED_WIN - (ply + 2))
+                if score > best_score or best_move == NO_MOVE:
+                    best_score, best_move = score, pos << 4 | (remaining & -remaining).bit_length() - 1
+                continue
+            gives = mask_to_codes(safe)
+            if hint != NO_MOVE and hint >> 4 == pos and hint & 0xF in gives:
+                gives.remove(hint & 0xF)
+                gives.insert(0, hint & 0xF)
+            for give in gives:
+                state.give(give)
+                score = -self._solve(state, -beta, -alpha, ply + 1)
+                state.undo_give()
+                if score > best_score or best_move == NO_MOVE:
+                    best_score, best_move = score, pos << 4 | give
                 alpha = max(alpha, score)
-                if beta <= alpha:
+                if alpha >= beta:
                     break
-            return max_score
+            state.undo_play()
+            if alpha >= beta:
+                break
+        
+        if best_score <= alpha_orig:
+            flag = UPPER
+        elif best_score >= beta:
+            flag = LOWER
         else:
-            min_score = float('inf')
-            for piece in pieces:
-                new_remaining = [p for p in remaining_pieces if p != piece]
-                score = minimax_cached(
-                    tuple(board), tuple(new_remaining), piece,
-                    depth-1, True, alpha, beta
-                )
-                min_score = min(min_score, score)
-                beta = min(beta, score)
-                if beta <= alpha:
-                    break
-            return min_score
+            flag = EXACT
+        if sym is not None:
+            best_move = (square_to_canonical(sym, best_move >> 4) << 4) | piece_to_canonical(sym, best_move & 0xF)
+        self.tt.store(tt_key, len(free), flag, self._to_table(best_score, ply), best_move)
+        return best_score
 
-def adaptive_depth(state, time_remaining):
-    """Détermine la profondeur de recherche en fonction du temps et de l'état du jeu"""
-    remaining_pieces = len(get_available_pieces(state))
-    
-    if time_remaining > 3.0:
-        if remaining_pieces > 12:
-            return 3
-        elif remaining_pieces > 8:
-            return 4
+    @staticmethod
+    def _to_table(score, ply):
+        return score + ply if score > 0 else score - ply if score < 0 else 0
+
+    @staticmethod
+    def _from_table(score, ply):
+        return score - ply if score > 0 else score + ply if score < 0 else 0
+
+    @staticmethod
+    def _tablebase_score(result, ply, empty):
+        """Score d'un résultat de la table, `empty` cases vides : le joueur au trait pose
+        aux demi-coups impairs après `ply`, son adversaire aux pairs"""
+        if result == TB_DRAW:
+            return 0
+        if result == TB_WIN:
+            return SOLVED_WIN - (ply + empty - 1 + (empty & 1))
+        return -(SOLVED_WIN - (ply + empty - (empty & 1)))
+
+ENDGAME_SOLVER = EndgameSolver()
+
+def random_position(empties, rng=random):
+    """Position tirée au hasard : aucune ligne gagnante et pas de victoire immédiate.
+
+    Retourne (masques, pièces restantes, pièce à placer).
+    """
+    while True:
+        codes = list(range(16))
+        rng.shuffle(codes)
+        masks = EMPTY_BOARD
+        for sq in rng.sample(range(16), 16 - empties):
+            code = codes.pop()
+            if wins_with(masks, sq, code):
+                break
+            masks = place(masks, sq, code)
         else:
-            return 5
-    elif time_remaining > 1.5:
-        return 3
-    else:
-        return 2
+            piece = codes.pop()
+            if not deadly_pieces(masks) >> piece & 1:
+                return masks, sum(1 << code for code in codes), piece
+
+def endgame_capacity(samples=5, timeout=TIMEOUT, seed=0):
+    """Plus grand nombre de cases vides que le solveur résout dans `timeout` pour tous les tirages"""
+    rng = random.Random(seed)
+    solved = 0
+    for empties in range(1, 17):
+        for _ in range(samples):
+            masks, remaining, piece = random_position(empties, rng)
+            try:
+                EndgameSolver().solve(masks, remaining, piece, time.monotonic() + timeout)
+            except SearchTimeout:
+                return solved
+        solved = empties
+    return solved
+
+# Table de fin de partie
+# Résultats exacts, pour le joueur au trait, de positions à peu de cases vides,
+# calculés hors ligne par tablebase_quarto.py. Le fichier ne garde pas la
+# distance de victoire : la recherche compte une victoire à la dernière pose
+# possible, si bien qu'elle préfère encore une victoire qu'elle voit plus tôt.
+TB_LOSS, TB_DRAW, TB_WIN = 0, 1, 2
+
+def tablebase_score(result, ply, empty):
+    """Score de recherche d'un résultat de la table au nœud `ply` poses après la racine"""
+    if result == TB_DRAW:
+        return 0
+    score = WIN_SCORE - (ply + empty)  # au plus tard à la dernière case
+    return score if result == TB_WIN else -score
+
+def _occupancy_images(occ):
+    """Images d'un masque de cases occupées par les 32 symétries du plateau"""
+    return {table[2][occ & 0xFF] | table[3][occ >> 8] for table in _SYMMETRY_TABLES[BOARD_SYMMETRIES]}
+
+class EndgameTablebase:
+    """Table de fin de partie binaire, projetée en mémoire et non lue à l'ouverture.
+
+    Fichier : un en-tête (signature, version du format, nombre maximal de cases
+    vides, nombre d'entrées, nombre d'occupations, CRC32 du corps) puis les
+    clés canoniques (32 symétries du plateau) triées, sur 8 octets, les masques
+    de cases occupées des positions de la table et de leurs symétriques, sur 2
+    octets, et les résultats sur 2 bits, quatre par octet. Seules les positions
+    où la pièce à poser ne gagne pas tout de suite et où il reste une pièce à
+    donner y figurent.
+
+    Une clé canonique coûte autant qu'une centaine de poses : `occupancies`
+    (chargé à l'ouverture) écarte sans la calculer toute position dont les
+    cases occupées ne sont celles d'aucune entrée.
+    """
+    MAGIC = b"QRTOTBAS"
+    VERSION = 2
+    HEADER = struct.Struct('<8sHHQII4x')
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < self.HEADER.size:
+                raise ValueError("fichier trop court")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, self.max_empty, count, occupied, self.crc = self.HEADER.unpack_from(self._map, 0)
+            if magic != self.MAGIC:
+                raise ValueError("signature invalide")
+            if version != self.VERSION:
+                raise ValueError(f"version de format {version}, attendue {self.VERSION}")
+            if size != self.HEADER.size + 8 * count + 2 * occupied + (count + 3) // 4:
+                raise ValueError("taille incohérente")
+        except ValueError:
+            self._map.close()
+            raise
+        self.count = count
+        start = self.HEADER.size + 8 * count
+        view = memoryview(self._map)
+        self.keys = view[self.HEADER.size:start].cast('Q')
+        with view[start:start + 2 * occupied].cast('H') as occupancies:
+            self.occupancies = frozenset(occupancies)
+        self.results = view[start + 2 * occupied:]
+        view.release()
+
+    @classmethod
+    def open(cls, path=TABLEBASE_PATH):
+        """Ouvre la table, ou retourne None si elle est absente ou invalide"""
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            print(f"Table de fin de partie ignorée ({path}) : {e}")
+            return None
+
+    def close(self):
+        self.keys.release()
+        self.results.release()
+        self._map.close()
+
+    def verify(self):
+        """Vérifie le CRC du corps (lit tout le fichier)"""
+        return zlib.crc32(self._map[self.HEADER.size:]) == self.crc
+
+    def probe(self, key):
+        """Résultat (TB_LOSS, TB_DRAW, TB_WIN) d'une clé canonique, ou None"""
+        i = bisect_left(self.keys, key)
+        if i < self.count and self.keys[i] == key:
+            return self.results[i >> 2] >> 2 * (i & 3) & 3
+        return None
+
+    def lookup(self, masks, remaining, piece):
+        """Résultat pour le joueur qui doit poser `piece`, ou None hors de la table"""
+        if masks[0] not in self.occupancies:
+            return None
+        return self.probe(canonical_key(masks, remaining, piece, False, BOARD_SYMMETRIES)[0])
+
+    def best_move(self, masks, remaining, piece):
+        """Coup joint qui atteint le résultat de la position : (case, pièce, résultat) ou None.
+
+        Une pièce qui fait gagner l'adversaire tout de suite n'est rendue que si
+        aucune pose ne laisse de pièce sûre.
+        """
+        if piece is None:
+            return None
+        free = empty_squares(masks[0])
+        for pos in free:
+            if wins_with(masks, pos, piece):
+                gives = mask_to_codes(remaining)
+                return pos, gives[0] if gives else None, TB_WIN
+        result = self.lookup(masks, remaining, piece)
+        if result is None:
+            return None
+        children = [(pos, place(masks, pos, piece)) for pos in free]
+        deadly = [deadly_pieces(child) for _, child in children]
+        any_safe = any(remaining & ~mask for mask in deadly)
+        for (pos, child), mask in zip(children, deadly):
+            for give in mask_to_codes(remaining):
+                if mask >> give & 1:
+                    if any_safe:
+                        continue
+                    outcome = TB_LOSS
+                else:
+                    reply = self.lookup(child, remaining & ~(1 << give), give)
+                    if reply is None:
+                        continue  # coup non exploré par le générateur
+                    outcome = TB_WIN - reply
+                if outcome == result:
+                    return pos, give, result
+        return None
+
+    @classmethod
+    def write(cls, path, max_empty, entries, occupancies):
+        """Écrit {clé canonique: résultat} et les cases occupées de ces positions (une
+        par position suffit, les symétriques sont ajoutées) ; remplacement atomique"""
+        keys = array('Q', sorted(entries))
+        images = set()
+        for occ in occupancies:
+            images |= _occupancy_images(occ)
+        images = array('H', sorted(images))
+        packed = bytearray((len(keys) + 3) // 4)
+        for i, key in enumerate(keys):
+            packed[i >> 2] |= entries[key] << 2 * (i & 3)
+        body = keys.tobytes() + images.tobytes() + bytes(packed)
+        header = cls.HEADER.pack(cls.MAGIC, cls.VERSION, max_empty, len(keys), len(images), zlib.crc32(body))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(body)
+        os.replace(tmp_path, path)
+
+TABLEBASE = EndgameTablebase.open()
+
+# Recherche parallèle
+# Les processus sont démarrés une seule fois (start_workers) ; chacun garde sa
+# propre table de transposition d'une requête à l'autre. Seul le serveur écrit
+# la sauvegarde : save_table() y fusionne d'abord les tables des processus.
+_pool = None
+_pool_size = 0
+_parallel_searcher = None
+_worker_search_id = None
+_worker_ponder = None
+_worker_barrier = None
+EXPORT_TIMEOUT = 10.0  # secondes d'attente des autres processus avant d'envoyer sa table
+
+def start_workers(count=WORKERS):
+    """Démarre le pool de processus de recherche (sans effet si count <= 1)"""
+    global _pool, _pool_size, _parallel_searcher, _worker_barrier
+    if _pool is None and count > 1:
+        tt = SEARCHER.tt
+        _worker_barrier = multiprocessing.Barrier(count)
+        _pool = multiprocessing.Pool(count, initializer=_init_worker,
+                                     initargs=(tt.path, len(tt) * tt.ENTRY_BYTES / 2**20, PONDERER.generation,
+                                               _worker_barrier))
+        _pool_size = count
+        _parallel_searcher = ParallelSearcher(_pool, count)
+    return _pool
+
+def stop_workers():
+    global _pool, _pool_size, _parallel_searcher
+    if _pool is not None:
+        _pool.terminate()
+        _pool.join()
+    _pool = _parallel_searcher = None
+    _pool_size = 0
+
+def _init_worker(path=None, size_mb=TT_SIZE_MB, ponder=None, barrier=None):
+    """Sans sauvegarde, table vide : les résultats ne dépendent pas de l'état du
+    processus parent. Avec une sauvegarde `path`, le processus garde la table
+    héritée par fork (copie privée de la projection) ou la relit s'il a été
+    démarré autrement ; seul le serveur l'écrit. `ponder` est la génération
+    partagée de la réflexion (Ponderer.generation), qui en interrompt les
+    recherches ; `barrier` regroupe les processus pour l'envoi de leurs tables."""
+    global _worker_ponder, _worker_barrier
+    _worker_ponder = ponder
+    _worker_barrier = barrier
+    if path is None:
+        SEARCHER.tt.clear()
+        return
+    if SEARCHER.tt.path != path:
+        SEARCHER.tt = TranspositionTable(size_mb, path)
+    SEARCHER.tt.path = None
+
+# Compteurs de Searcher tenus dans les processus, additionnés par ParallelSearcher
+WORKER_COUNTERS = ('nodes', 'cutoffs_max', 'cutoffs_min', 'tt_cutoffs', 'researches', 'evaluations',
+                   'extensions', 'tablebase_hits')
+
+def _search_root_chunk(args):
+    """Exécuté dans un processus du pool : cherche une partie des coups racine.
+    Retourne (scores, profondeur limitée, compteurs, durées par coup racine),
+    les scores valant None si la recherche a été interrompue"""
+    global _worker_search_id
+    search_id, masks, remaining, piece, moves, depth, alpha, beta, deadline, ponder = args
+    if search_id != _worker_search_id:
+        _worker_search_id = search_id
+        if ponder is None:
+            SEARCHER.tt.new_search()
+    SEARCHER.deadline = deadline
+    SEARCHER.stop = PonderStop(_worker_ponder, ponder) if ponder is not None else None
+    SEARCHER.nodes = SEARCHER.next_check = 0
+    SEARCHER.depth_limited = False
+    SEARCHER.reset_counters()
+    SEARCHER.tt.reset_stats()
+    try:
+        scored = SEARCHER._search_root(masks, remaining, piece, moves, depth, alpha, beta)
+    except SearchTimeout:
+        scored = None
+    counts = {name: getattr(SEARCHER, name) for name in WORKER_COUNTERS}
+    counts.update(tt_hits=SEARCHER.tt.hits, tt_misses=SEARCHER.tt.misses)
+    return scored, SEARCHER.depth_limited, counts, SEARCHER.root_times
+
+def _export_table(_):
+    """Exécuté dans un processus du pool : sa table, une fois que tous les processus
+    ont reçu leur tâche (chacun en reçoit donc exactement une) ; None si l'un manque"""
+    try:
+        _worker_barrier.wait(EXPORT_TIMEOUT)
+    except threading.BrokenBarrierError:
+        return None
+    return SEARCHER.tt.entries()
+
+def collect_worker_tables(tt=None):
+    """Fusionne dans `tt` (SEARCHER.tt) les tables des processus de recherche ;
+    retourne le nombre d'emplacements repris"""
+    tt = tt if tt is not None else SEARCHER.tt
+    if _pool is None:
+        return 0
+    if _worker_barrier.broken:
+        _worker_barrier.reset()  # un envoi précédent a manqué un processus
+    merged = 0
+    for entries in _pool.map(_export_table, range(_pool_size), chunksize=1):
+        if entries is not None:
+            merged += tt.merge(entries)
+    return merged
+
+def save_table(interval=None):
+    """Sauvegarde SEARCHER.tt si c'est l'heure (voir TranspositionTable.due), après y
+    avoir fusionné les tables des processus de recherche, où se fait la recherche"""
+    tt = SEARCHER.tt
+    if not tt.due(interval):
+        return
+    collect_worker_tables(tt)
+    tt.flush_if_due(0)
+
+class ParallelSearcher(Searcher):
+    """Approfondissement itératif dont chaque itération répartit les coups racine entre les processus.
+
+    Chaque processus part de la fenêtre d'aspiration sur sa part des coups :
+    le meilleur score est celui de la recherche séquentielle à la même
+    profondeur. Un coup racine revient toujours au même processus, d'une
+    itération et d'une recherche à l'autre : la réflexion remplit la table de
+    celui qui cherchera ce coup. Quand `stop` est donné (réflexion), c'est un
+    PonderStop : les processus en surveillent la génération sur le compteur
+    transmis à leur démarrage, PONDERER.generation.
+    Les compteurs du journal sont la somme de ceux des processus, y compris
+    les accès à leurs tables (`tt_hits`, `tt_misses`).
+    """
+
+    def __init__(self, pool, workers):
+        super().__init__()
+        self.pool = pool
+        self.workers = workers
+        self.search_id = 0
+
+    def search(self, masks, remaining, piece, deadline=None, max_depth=None):
+        self.search_id += 1
+        return super().search(masks, remaining, piece, deadline, max_depth)
+
+    def reset_counters(self):
+        super().reset_counters()
+        self.tt_hits = 0
+        self.tt_misses = 0
+
+    def counters(self):
+        report = super().counters()
+        report["tt"] = {"hits": self.tt_hits, "misses": self.tt_misses}
+        return report
+
+    def _search_root(self, masks, remaining, piece, moves, depth, alpha=-WIN_SCORE, beta=WIN_SCORE):
+        shares = [[] for _ in range(self.workers)]
+        for move in moves:
+            shares[self.worker_of(move)].append(move)
+        ponder = self.stop.generation if self.stop is not None else None
+        jobs = [
+            (self.search_id, masks, remaining, piece, share, depth, alpha, beta, self.deadline, ponder)
+            for share in shares if share
+        ]
+        results = self.pool.map(_search_root_chunk, jobs)
+        for _, _, counts, root_times in results:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+            for move, seconds in root_times.items():
+                self.root_times[move] = self.root_times.get(move, 0.0) + seconds
+        if any(scored is None for scored, _, _, _ in results):
+            raise SearchTimeout()
+        scores = {}
+        for scored, depth_limited, _, _ in results:
+            self.depth_limited |= depth_limited
+            for score, move in scored:
+                scores[move] = score
+        # Un processus s'arrête au premier coup qui atteint beta
+        return [(scores[move], move) for move in moves if move in scores]
+
+    def worker_of(self, move):
+        """Part (de 0 à workers - 1) du coup racine (case, pièce), fixe d'une recherche à l'autre"""
+        pos, give = move
+        return ((pos if pos is not None else 16) * 17 + (give if give is not None else 16)) % self.workers
+
+def minimax_cached(board_tuple, pieces_tuple, current_piece, depth, is_maximizing, alpha, beta):
+    """Valeur minimax à `depth` coups joints, avec table de transposition (pièces au format texte).
+
+    Sans pièce à placer, le joueur au trait choisit seulement la pièce à donner.
+    Les victoires valent WIN_SCORE moins leur distance, comme dans Searcher.
+    """
+    masks = board_to_masks(board_tuple)
+    remaining = pieces_to_mask(pieces_tuple or ())
+    SEARCHER.deadline = None
+    alpha, beta = max(alpha, -WIN_SCORE), min(beta, WIN_SCORE)
+    if current_piece is not None:
+        state = SearchState(masks, remaining, piece_to_code(current_piece))
+        return SEARCHER._value(state, depth, is_maximizing, alpha, beta)
+    if is_winning(masks):
+        return -WIN_SCORE if is_maximizing else WIN_SCORE
+    if depth == 0 or not remaining:
+        return evaluate_masks(masks)
+    state = SearchState(masks, remaining, None)
+    best_score = -WIN_SCORE if is_maximizing else WIN_SCORE
+    gives = Searcher._gives(remaining, state.deadly_mask)
+    gives.sort(key=lambda give: SEARCHER.history(masks[0].bit_count(), None, give), reverse=True)
+    for give in gives:
+        state.give(give)
+        score = SEARCHER._value(state, depth - 1, not is_maximizing, alpha, beta)
+        state.undo_give()
+        if is_maximizing:
+            best_score = max(best_score, score)
+            alpha = max(alpha, score)
+        else:
+            best_score = min(best_score, score)
+            beta = min(beta, score)
+        if beta <= alpha:
+            break
+    return best_score
+
+# Recherche Monte-Carlo
+# Alternative à l'alpha-beta en début de partie, où l'heuristique voit peu de
+# chose : chaque simulation descend l'arbre des coups joints par UCB1, y ajoute
+# un nœud puis finit la partie au hasard sur un SearchState (faire/défaire).
+# L'arbre est gardé d'une requête à l'autre : on y retrouve la position qui suit
+# notre coup et la réponse de l'adversaire.
+class MCTSNode:
+    """Nœud de l'arbre ; `wins` compte, pour le joueur qui a joué `move`, 1 par
+    victoire et 1/2 par nulle sur les `visits` simulations passées par ici"""
+    __slots__ = ('move', 'children', 'untried', 'visits', 'wins', 'outcome')
+
+    def __init__(self, move):
+        self.move = move        # coup joint (case, pièce donnée) qui mène ici
+        self.children = []
+        self.untried = None     # coups pas encore développés (None : pas encore calculés)
+        self.visits = 0
+        self.wins = 0.0
+        self.outcome = None     # résultat connu pour le joueur au trait : 1, 1/2 ou 0
+
+class MonteCarloSearcher:
+    """UCT sur les coups joints, avec simulations aléatoires jusqu'à la fin de la partie.
+
+    Comme dans Searcher, on ne donne une pièce de l'index que faute d'autre
+    choix ; les simulations gagnent aussi dès qu'elles le peuvent. Avec
+    `deadly_mask`, les deux règles ne coûtent qu'un masque par demi-coup et
+    rendent les simulations bien plus informatives que des coups uniformes.
+    """
+    CHECK_EVERY = 32  # simulations entre deux lectures de l'horloge
+
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.root = None
+        self.position = None  # (masques, pièces restantes, pièce) de la racine
+        self.playouts = 0
+        self.reused = 0       # simulations héritées de la requête précédente
+        self.elapsed = 0.0
+        self.best = None      # fils de la racine retenu par la dernière recherche
+
+    def search(self, masks, remaining, piece, deadline=None, max_playouts=None):
+        """Simule jusqu'à l'échéance (au moins une fois) ; retourne le coup le plus visité"""
+        start = time.perf_counter()
+        state = SearchState(masks, remaining, piece)
+        if piece is not None:
+            pos = state.winning_square(piece)
+            if pos is not None:
+                gives = mask_to_codes(remaining)
+                return SearchResult(pos, gives[0] if gives else None, WIN_SCORE - 1, 0, 0)
+        root = self._reuse(masks, remaining, piece)
+        if root is None:
+            root = MCTSNode(None)
+        self.root, self.position = root, (masks, remaining, piece)
+        self.reused = root.visits
+        self.playouts = 0
+        while True:
+            self._simulate(root, state)
+            self.playouts += 1
+            if max_playouts is not None and self.playouts >= max_playouts:
+                break
+            if deadline is not None and not self.playouts % self.CHECK_EVERY and time.monotonic() > deadline:
+                break
+        self.elapsed = time.perf_counter() - start
+        if not root.children:
+            # Toute pièce donnée fait gagner l'adversaire : n'importe quel coup
+            pos = empty_squares(masks[0])[0] if piece is not None else None
+            self.best = None
+            return SearchResult(pos, mask_to_codes(remaining)[0], -(WIN_SCORE - 2), 0, self.playouts)
+        best = self.best = max(root.children, key=lambda child: child.visits)
+        depth = 0
+        node = root
+        while node.children:
+            node = max(node.children, key=lambda child: child.visits)
+            depth += 1
+        return SearchResult(best.move[0], best.move[1], None, depth, self.playouts)
+
+    def win_rate(self):
+        """Part de victoires (nulles pour moitié) du coup retenu, selon les simulations"""
+        if self.best is None:
+            return 0.0
+        return self.best.wins / self.best.visits
+
+    def counters(self):
+        """Compteurs de la dernière recherche (journal des requêtes)"""
+        return {
+            "playouts": self.playouts,
+            "playouts_per_s": round(self.playouts / self.elapsed) if self.elapsed else None,
+            "reused": self.reused,
+            "win_rate": round(self.win_rate(), 3),
+        }
+
+    def _reuse(self, masks, remaining, piece):
+        """Sous-arbre de la position actuelle si elle suit la racine précédente
+        d'un coup joint de chaque joueur, None sinon"""
+        if self.root is None:
+            return None
+        old_masks, old_remaining, old_piece = self.position
+        if (masks, remaining, piece) == self.position:
+            return self.root
+        new = masks[0] & ~old_masks[0]
+        if old_masks[0] & ~masks[0] or new.bit_count() != (1 if old_piece is None else 2):
+            return None
+        placed = {piece_at(masks, sq): sq for sq in range(16) if new >> sq & 1}
+        if old_piece is None:
+            ((given, their_pos),) = placed.items()
+            ours = (None, given)
+        else:
+            if old_piece not in placed:
+                return None
+            our_pos = placed.pop(old_piece)
+            ((given, their_pos),) = placed.items()
+            ours = (our_pos, given)
+        for child in self.root.children:
+            if child.move == ours:
+                for grandchild in child.children:
+                    if grandchild.move == (their_pos, piece):
+                        return grandchild
+        return None
+
+    def _expand(self, node, state):
+        """Résultat immédiat du nœud, ou liste mélangée de ses coups qui ne perdent pas tout de suite"""
+        piece = state.piece
+        if piece is not None and state.can_win(piece):
+            node.outcome = 1.0
+            return
+        remaining = state.remaining
+        if not remaining:
+            node.untried = [(pos, None) for pos in empty_squares(state.occ)]
+            return
+        moves = []
+        if piece is None:
+            moves = [(None, give) for give in mask_to_codes(state.safe())]
+        else:
+            for pos in empty_squares(state.occ):
+                state.play(pos)
+                moves += [(pos, give) for give in mask_to_codes(state.safe())]
+                state.undo_play()
+        if not moves:
+            node.outcome = 0.0  # toute pièce donnée fait gagner l'adversaire
+            return
+        self.rng.shuffle(moves)
+        node.untried = moves
+
+    def _select(self, node):
+        """Fils au meilleur score UCB1"""
+        scale = MCTS_EXPLORATION * math.sqrt(math.log(node.visits))
+        best = None
+        best_value = -1.0
+        for child in node.children:
+            value = child.wins / child.visits + scale / math.sqrt(child.visits)
+            if value > best_value:
+                best, best_value = child, value
+        return best
+
+    @staticmethod
+    def _apply(state, move):
+        pos, give = move
+        if pos is not None:
+            state.play(pos)
+        if give is not None:
+            state.give(give)
+
+    def _simulate(self, root, state):
+        mark = state.top
+        path = [root]
+        node = root
+        # Descente tant que le nœud est entièrement développé
+        while node.outcome is None:
+            if node.untried is None:
+                self._expand(node, state)
+                continue
+            if node.untried:
+                child = MCTSNode(node.untried.pop())
+                if child.move[1] is None:
+                    child.outcome = 0.5  # la dernière pièce remplit le plateau sans gagner
+                node.children.append(child)
+                self._apply(state, child.move)
+                path.append(child)
+                node = child
+                break
+            node = self._select(node)
+            self._apply(state, node.move)
+            path.append(node)
+        value = node.outcome if node.outcome is not None else self._playout(state)
+        state.undo_to(mark)
+        # Remontée : `value` est le résultat du joueur au trait dans le nœud
+        for node in reversed(path):
+            node.visits += 1
+            node.wins += 1.0 - value
+            value = 1.0 - value
+
+    def _playout(self, state):
+        """Fin de partie au hasard ; résultat pour le joueur au trait au départ"""
+        rng = self.rng
+        turn = 0
+        while True:
+            piece = state.piece
+            if state.deadly_mask >> piece & 1:
+                value = 1.0  # le joueur au trait gagne
+                break
+            occ = state.occ
+            state.play(rng.choice([sq for sq in range(16) if not occ >> sq & 1]))
+            remaining = state.remaining
+            if not remaining:
+                value = 0.5
+                break
+            safe = remaining & ~state.deadly_mask
+            if not safe:
+                value = 0.0  # toute pièce fait gagner l'adversaire
+                break
+            state.give(rng.choice(mask_to_codes(safe)))
+            turn ^= 1
+        return value if turn == 0 else 1.0 - value
+
+MCTS_SEARCHER = MonteCarloSearcher()
+
+# Livre d'ouvertures
+class OpeningBook:
+    """Livre d'ouvertures binaire, projeté en mémoire (mmap) et non lu à l'ouverture.
+
+    Fichier : un en-tête (signature, version du format, EVAL_VERSION, nombre
+    d'entrées, CRC32 des entrées) puis des entrées (clé canonique, coup
+    canonique case * 16 + pièce, score) triées par clé. La case vaut 16 quand
+    il n'y a pas de pièce à poser.
+    """
+    MAGIC = b"QRTOBOOK"
+    VERSION = 1
+    HEADER = struct.Struct('<8sHHII')
+    ENTRY = struct.Struct('<QHh')
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < self.HEADER.size:
+                raise ValueError("fichier trop court")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, eval_version, count, self.crc = self.HEADER.unpack_from(self._map, 0)
+        if magic != self.MAGIC:
+            raise ValueError("signature invalide")
+        if version != self.VERSION:
+            raise ValueError(f"version de format {version}, attendue {self.VERSION}")
+        if eval_version != EVAL_VERSION:
+            raise ValueError(f"évaluation {eval_version}, attendue {EVAL_VERSION}")
+        if size != self.HEADER.size + count * self.ENTRY.size:
+            raise ValueError("taille incohérente")
+        self.count = count
+
+    @classmethod
+    def open(cls, path=BOOK_PATH):
+        """Ouvre le livre, ou retourne None s'il est absent ou invalide"""
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            print(f"Livre d'ouvertures ignoré ({path}) : {e}")
+            return None
+
+    def close(self):
+        self._map.close()
+
+    def verify(self):
+        """Vérifie le CRC des entrées (lit tout le fichier)"""
+        return zlib.crc32(self._map[self.HEADER.size:]) == self.crc
+
+    def probe(self, key):
+        """Recherche dichotomique d'une clé canonique ; retourne (coup, score) ou None"""
+        lo, hi = 0, self.count
+        entry = self.ENTRY
+        base = self.HEADER.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            mid_key, move, score = entry.unpack_from(self._map, base + mid * entry.size)
+            if mid_key < key:
+                lo = mid + 1
+            elif mid_key > key:
+                hi = mid
+            else:
+                return move, score
+        return None
+
+    def lookup(self, masks, remaining, piece):
+        """Coup du livre pour cette position, dans l'orientation réelle : (case, pièce, score) ou None"""
+        key, sym = canonical_key(masks, remaining, piece, True)
+        hit = self.probe(key)
+        if hit is None:
+            return None
+        move, score = hit
+        pos = None if move >> 4 == 16 else square_from_canonical(sym, move >> 4)
+        give = piece_from_canonical(sym, move & 0xF)
+        if (pos is not None and masks[0] >> pos & 1) or not remaining >> give & 1:
+            return None  # entrée corrompue ou collision de clé
+        return pos, give, score
+
+    @classmethod
+    def write(cls, path, entries):
+        """Écrit {clé canonique: (coup canonique, score)} ; remplacement atomique du fichier"""
+        body = bytearray()
+        for key in sorted(entries):
+            move, score = entries[key]
+            if score in (float('inf'), -float('inf')):
+                score = 32767 if score > 0 else -32767
+            body += cls.ENTRY.pack(key, move, max(-32767, min(32767, int(score))))
+        header = cls.HEADER.pack(cls.MAGIC, cls.VERSION, EVAL_VERSION, len(entries), zlib.crc32(body))
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(body)
+        os.replace(tmp_path, path)
+
+BOOK = OpeningBook.open()
+
+# Réflexion pendant le temps de l'adversaire
+# Après notre réponse, on connaît le plateau et la pièce donnée : on cherche
+# les positions où l'adversaire nous rendra la main, tour à tour et avec des
+# tranches de temps croissantes. Les résultats et la table de transposition
+# servent à la requête suivante si sa position a été anticipée.
+class PonderStop:
+    """Arrêt d'une réflexion, vu par la recherche comme un événement : levé dès que
+    le compteur partagé `shared` n'est plus à la génération `generation`"""
+    __slots__ = ('shared', 'generation')
+
+    def __init__(self, shared, generation):
+        self.shared = shared
+        self.generation = generation
+
+    def is_set(self):
+        return self.shared.value != self.generation
+
+class Ponderer:
+    """Recherche en arrière-plan des réponses probables de l'adversaire.
+
+    Chaque réflexion appartient à une génération : elle tourne tant que
+    `generation` (compteur multiprocessing, vu par les processus de recherche)
+    garde cette valeur et que des réponses restent à résoudre. cancel(), à
+    l'arrivée d'une requête, passe à la génération suivante : la réflexion en
+    cours, et celles déjà programmées pour une génération passée, s'arrêtent,
+    sans qu'aucune remise à zéro puisse effacer cet arrêt. `take` consulte les
+    résultats. Sans recherche donnée, la réflexion passe par celle du coup
+    joué, le pool de processus s'il est démarré : leurs tables sont celles que
+    la recherche retrouvera.
+    """
+    def __init__(self, searcher=None):
+        self._searcher = searcher
+        self.generation = multiprocessing.Value('q', 0)
+        self.results = {}  # (masques, pièce, pièces restantes) -> SearchResult
+        self.active = False  # une réflexion a eu lieu depuis la dernière requête
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def searcher(self):
+        if self._searcher is not None:
+            return self._searcher
+        return _parallel_searcher if _parallel_searcher is not None else SEARCHER
+
+    def replies(self, masks, remaining, piece):
+        """Positions où l'adversaire, qui doit poser `piece`, nous donne une pièce sans
+        gagner ni nous offrir la victoire ; les plus mauvaises pour nous d'abord"""
+        state = SearchState(masks, remaining, piece)
+        if state.can_win(piece) or not remaining:
+            return []
+        positions = []
+        for pos in empty_squares(masks[0]):
+            state.play(pos)
+            score = state.evaluate()
+            for give in mask_to_codes(state.safe()):
+                positions.append((score, (state.masks(), give, remaining & ~(1 << give))))
+            state.undo_play()
+        positions.sort(key=lambda item: item[0])
+        return [position for _, position in positions]
+
+    def cancel(self):
+        """Arrête toute réflexion en cours ou à venir ; retourne la nouvelle génération"""
+        with self.generation.get_lock():
+            self.generation.value += 1
+            return self.generation.value
+
+    def ponder(self, masks, remaining, piece, generation=None):
+        """Cherche les réponses à la position où l'adversaire doit poser `piece`, tant que
+        la génération est `generation` (par défaut, la génération courante)"""
+        stop = PonderStop(self.generation, self.generation.value if generation is None else generation)
+        if stop.is_set():
+            return
+        self.results = {}
+        self.active = True
+        pending = self.replies(masks, remaining, piece)
+        searcher = self.searcher
+        searcher.stop = stop
+        seconds = PONDER_SLICE
+        try:
+            while pending and not stop.is_set():
+                unresolved = []
+                for position in pending:
+                    board, give, rest = position
+                    result = searcher.search(board, rest, give, time.monotonic() + seconds)
+                    if stop.is_set():
+                        return
+                    self.results[position] = result
+                    free = (~board[0] & FULL_BOARD).bit_count()
+                    if result.depth < free and not is_win_score(result.score):
+                        unresolved.append(position)
+                pending = unresolved
+                seconds *= 2
+        finally:
+            searcher.stop = None
+
+    def take(self, position):
+        """Résultat anticipé pour `position` (None si elle ne l'a pas été) ; compte les succès"""
+        if not self.active:
+            return None
+        self.active = False
+        result = self.results.get(position)
+        if result is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        self.results = {}
+        return result
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+PONDERER = Ponderer()
+
+def position_after(state, move):
+    """Position (masques, pièces restantes, pièce donnée) après le coup `move` envoyé au
+    serveur, None si l'adversaire n'a plus rien à jouer"""
+    masks, piece, remaining = parse_state(state)
+    if move["piece"] is None:
+        return None
+    give = piece_to_code(move["piece"])
+    if piece is not None:
+        if move["pos"] is None or masks[0] >> move["pos"] & 1:
+            return None
+        masks = place(masks, move["pos"], piece)
+    return masks, remaining & ~(1 << give), give
 
 # Fonctions principales améliorées
+_last_search = (None, None)
+_last_report = {"source": "memo"}  # d'où vient le dernier coup calculé, pour le journal
+
+def find_best_move(state, start_time):
+    """Cherche le coup joint (case, pièce) pour l'état JSON reçu, dans le temps imparti"""
+    global _last_search, _last_report
+    masks, piece, remaining = parse_state(state)
+    position = (masks, piece, remaining)
+    if _last_search[0] == position:
+        return _last_search[1]
+    # Échéance monotone, décomptée depuis la réception de la requête
+    deadline = time.monotonic() + TIMEOUT * SEARCH_BUDGET - (time.time() - start_time)
+    result = None
+    report = {"source": "search"}
+    if BOOK is not None:
+        hit = BOOK.lookup(masks, remaining, piece)
+        if hit is not None:
+            result = SearchResult(hit[0], hit[1], hit[2], 0, 0)
+            _last_search = (position, result)
+            _last_report = {"source": "book"}
+            return result
+    if TABLEBASE is not None:
+        # Seules les victoires y répondent : la table ne garde pas les distances,
+        # le solveur et la recherche retardent mieux une défaite ou tiennent une nulle
+        hit = TABLEBASE.best_move(masks, remaining, piece)
+        if hit is not None and hit[2] == TB_WIN:
+            pos, give, outcome = hit
+            result = SearchResult(pos, give, tablebase_score(outcome, 0, (~masks[0] & FULL_BOARD).bit_count()), 0, 0)
+            result.exact = True
+            _last_search = (position, result)
+            _last_report = {"source": "tablebase", "score": result.score}
+            return result
+    if (~masks[0] & FULL_BOARD).bit_count() <= ENDGAME_EMPTY:
+        # Le solveur a la moitié du temps ; sa table garde le travail pour le coup suivant
+        now = time.monotonic()
+        try:
+            result = ENDGAME_SOLVER.solve(masks, remaining, piece, now + (deadline - now) / 2)
+            report["source"] = "solver"
+        except SearchTimeout:
+            pass
+        report["solver"] = {"nodes": ENDGAME_SOLVER.nodes, "tablebase_hits": ENDGAME_SOLVER.tablebase_hits,
+                            "solved": result is not None, "ms": round((time.monotonic() - now) * 1000, 2)}
+    pondered = PONDERER.take(position) if PONDER else None
+    report["pondered"] = pondered is not None
+    if result is None and (~masks[0] & FULL_BOARD).bit_count() >= MCTS_MIN_EMPTY:
+        result = MCTS_SEARCHER.search(masks, remaining, piece, deadline)
+        report["source"] = "mcts"
+        report["mcts"] = MCTS_SEARCHER.counters()
+    if result is None:
+        searcher = _parallel_searcher if _parallel_searcher is not None else SEARCHER
+        result = searcher.search(masks, remaining, piece, deadline)
+        report["search"] = searcher.counters()
+        if pondered is not None and pondered.depth > result.depth:
+            result = pondered  # la réflexion est allée plus loin que la recherche
+            report["source"] = "ponder"
+    _last_search = (position, result)
+    report.update(depth=result.depth, score=json_number(result.score), nodes=result.nodes, exact=result.exact)
+    _last_report = report
+    return result
+
 def find_best_pos(state, start_time):
     """Trouve la meilleure position pour placer la pièce actuelle"""
-    board = state["board"]
-    current_piece = state["piece"]
-    remaining_pieces = get_available_pieces(state)
-    time_remaining = TIMEOUT - (time.time() - start_time)
-    
-    # Vérifier les coups gagnants immédiats
-    for pos in get_available_positions(board):
-        new_board = board.copy()
-        new_board[pos] = current_piece
-        if check_winner(new_board):
-            return pos
-    
-    # Vérifier les coups perdants à bloquer
-    for piece in remaining_pieces:
-        for pos in get_available_positions(board):
-            new_board = board.copy()
-            new_board[pos] = piece
-            if check_winner(new_board):
-                # Éviter de donner cette position à l'adversaire
-                pass
-    
-    # Recherche Minimax avec profondeur adaptative
-    depth = adaptive_depth(state, time_remaining)
-    best_score = -float('inf')
-    best_pos = None
-    alpha = -float('inf')
-    beta = float('inf')
-    
-    for pos in get_available_positions(board):
-        if time.time() - start_time > TIMEOUT * 0.8:
-            break
-            
-        new_board = board.copy()
-        new_board[pos] = current_piece
-        score = minimax_cached(
-            tuple(new_board), tuple(remaining_pieces), None,
-            depth-1, False, alpha, beta
-        )
-        
-        if score > best_score:
-            best_score = score
-            best_pos = pos
-            alpha = max(alpha, score)
-    
-    return best_pos if best_pos is not None else get_available_positions(board)[0]
+    return find_best_move(state, start_time).pos
 
 def find_best_piece(state, start_time):
     """Trouve la meilleure pièce à donner à l'adversaire"""
-    board = state["board"]
-    remaining_pieces = get_available_pieces(state)
-    time_remaining = TIMEOUT - (time.time() - start_time)
-    depth = adaptive_depth(state, time_remaining)
-    
-    best_score = -float('inf')
-    best_piece = None
-    alpha = -float('inf')
-    beta = float('inf')
-    
-    # Trier les pièces par dangerosité
-    pieces = sorted(remaining_pieces, key=lambda p: piece_danger_score(p, board))
-    
-    for piece in pieces:
-        if time.time() - start_time > TIMEOUT * 0.8:
+    piece = find_best_move(state, start_time).piece
+    return PIECE_NAMES[piece] if piece is not None else None
+
+# Journal et profilage
+# Chaque requête play produit un enregistrement JSON d'une ligne (source du
+# coup, compteurs de la recherche, durées). Le profilage est désactivé par
+# défaut et ne coûte alors qu'un test par requête ; profile_next() l'arme pour
+# la seule requête suivante.
+_request_count = 0
+_profile_next = None
+
+def json_number(value):
+    """Score sérialisable en JSON strict (les infinis deviennent du texte)"""
+    if value in (float('inf'), -float('inf')):
+        return str(value)
+    return value
+
+def log_record(record):
+    """Écrit l'enregistrement sur une ligne, dans LOG_PATH ou sur la sortie standard"""
+    line = json.dumps(record, default=str)
+    if LOG_PATH is None:
+        print(line)
+    else:
+        with open(LOG_PATH, "a") as f:
+            f.write(line + "\n")
+
+def capture(req, response, received, latency):
+    """Ajoute la requête, notre réponse et sa durée (s) à CAPTURE_PATH.
+
+    Une ligne JSON compacte par requête, écrite d'un seul bloc en ajout : un
+    arrêt brutal ne peut tronquer que la dernière.
+    """
+    line = json.dumps({"t": round(received, 3), "ms": round(latency * 1000, 2), "req": req, "resp": response},
+                      separators=(',', ':'))
+    with open(CAPTURE_PATH, 'a', encoding='utf-8') as f:
+        f.write(line + "\n")
+
+def profile_next(kind="cprofile"):
+    """Profile la prochaine requête play ("cprofile" ou "sample")"""
+    global _profile_next
+    _profile_next = kind
+
+class Sampler:
+    """Profil par échantillonnage d'un fil d'exécution : pile relevée toutes les
+    `interval` secondes, écrite au format « pile repliée » (flamegraph, speedscope)"""
+    def __init__(self, thread_id, interval=PROFILE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self.done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                key = ";".join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.done.set()
+        self.thread.join()
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            for stack, count in sorted(self.counts.items(), key=lambda item: -item[1]):
+                f.write(f"{stack} {count}\n")
+
+def run_profiled(kind, func, args, name):
+    """Appelle func(*args) sous profilage ; retourne (résultat, fichier du profil)"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    if kind == "cprofile":
+        path = os.path.join(PROFILE_DIR, f"{name}.prof")
+        profiler = cProfile.Profile()
+        result = profiler.runcall(func, *args)
+        profiler.dump_stats(path)
+    elif kind == "sample":
+        path = os.path.join(PROFILE_DIR, f"{name}.folded")
+        with Sampler(threading.get_ident()) as sampler:
+            result = func(*args)
+        sampler.dump(path)
+    else:
+        raise ValueError(f"profil inconnu : {kind}")
+    return result, path
+
+# Traitement des requêtes
+def choose_move(state, start_time):
+    """Coup joint au format du serveur"""
+    return {
+        "pos": find_best_pos(state, start_time),
+        "piece": find_best_piece(state, start_time)
+    }
+
+def handle_request(req, start_time):
+    """Réponse (dictionnaire) à une requête du serveur de jeu, None si elle est inconnue"""
+    global _request_count, _last_report, _profile_next
+    message = req["request"]
+    if message == "ping":
+        return {'response': 'pong'}
+    if message == "play":
+        state = req["state"]
+        _request_count += 1
+        _last_report = {"source": "memo"}
+        start = time.perf_counter()
+        kind = PROFILE or _profile_next
+        profile = None
+        if kind is None:
+            chosen_move = choose_move(state, start_time)
+        else:
+            _profile_next = None
+            chosen_move, profile = run_profiled(kind, choose_move, (state, start_time), f"play-{_request_count}")
+        error_list = req.get("errors")
+        print("ERRORS : ", error_list)
+        print(chosen_move)
+        record = {
+            "event": "play",
+            "request": _request_count,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "ms": round((time.perf_counter() - start) * 1000, 2),
+            "move": chosen_move,
+            "errors": error_list,
+        }
+        record.update(_last_report)
+        if profile is not None:
+            record["profile"] = profile
+        log_record(record)
+        return {
+            'response': 'move',
+            'move': chosen_move,
+            'message': 'Stay humble ehh'
+        }
+    return None
+
+# Serveur persistant
+# Le serveur de jeu ouvre une connexion par requête et y écrit un document JSON
+# sans délimiteur : on lit jusqu'à obtenir un document complet. Les recherches
+# passent par un seul fil d'exécution, dans ce processus (tables et processus de
+# recherche restent chauds d'un coup à l'autre) ; la boucle asyncio reste libre
+# de répondre aux ping pendant ce temps.
+async def read_message(reader):
+    """Lit un message JSON complet, quel que soit son découpage en paquets"""
+    data = b""
+    while True:
+        chunk = await reader.read(MAX_RECV_LENGTH)
+        data += chunk
+        try:
+            return json.loads(data.decode())
+        except (UnicodeDecodeError, json.JSONDecodeError):
+            if not chunk:
+                raise ValueError("connexion fermée avant la fin du message")
+            if len(data) > MAX_MESSAGE_LENGTH:
+                raise ValueError(f"message de plus de {MAX_MESSAGE_LENGTH} octets")
+
+async def write_message(writer, message):
+    writer.write(json.dumps(message).encode())
+    await writer.drain()
+
+# Moteurs préchauffés (parties simultanées)
+def _verified(table):
+    """`table` (livre ou table de fin de partie) si son CRC est bon, ce qui en charge
+    toutes les pages ; sinon la ferme et retourne None"""
+    if table is None or table.verify():
+        return table
+    print(f"Table ignorée ({table.path}) : CRC invalide")
+    table.close()
+    return None
+
+def _engine_main(conn, cpu, book=True, tablebase=True):
+    """Boucle d'un processus moteur : répond aux requêtes (req, start_time) reçues sur `conn`.
+    `book` et `tablebase` à False écartent les tables que le serveur a refusées"""
+    global _parallel_searcher, BOOK, TABLEBASE
+    if not book and BOOK is not None:
+        BOOK.close()
+        BOOK = None
+    if not tablebase and TABLEBASE is not None:
+        TABLEBASE.close()
+        TABLEBASE = None
+    # Recherche séquentielle, et un seul processus sauvegarde la table : le serveur
+    _parallel_searcher = None
+    SEARCHER.tt.path = None
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    # Première recherche hors du temps de jeu : tables et chemins de code chauds
+    SEARCHER.search(*random_position(8, random.Random(0)), max_depth=2)
+    conn.send(os.getpid())
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
             break
-            
-        new_remaining = [p for p in remaining_pieces if p != piece]
-        score = minimax_cached(
-            tuple(board), tuple(new_remaining), piece,
-            depth-1, True, alpha, beta
-        )
-        
-        if score > best_score:
-            best_score = score
-            best_piece = piece
-            alpha = max(alpha, score)
-    
-    return best_piece if best_piece is not None else random.choice(remaining_pieces)
+        if message is None:
+            break
+        if message == "table":
+            conn.send(("ok", SEARCHER.tt.entries()))
+            continue
+        try:
+            conn.send(("ok", handle_request(*message)))
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}"))
 
-# Boucle principale
-def main():
-    with socket.socket() as s:
-        s.bind(('', PORT))
-        s.settimeout(1)
-        s.listen()
+def board_occupancy(board):
+    """Masque des cases occupées d'un plateau au format du serveur de jeu"""
+    return sum(1 << pos for pos, name in enumerate(board) if name is not None)
+
+class EngineWorker:
+    """Processus moteur vu du serveur : canal, cœur et compteurs"""
+    def __init__(self, index, cpu, context):
+        self.index = index
+        self.cpu = cpu
+        self.served = 0
+        self.busy_time = 0.0
+        self.occ = None  # cases occupées de la dernière position servie
+        self.start(context)
+
+    def start(self, context):
+        """Démarre le processus avec le contexte multiprocessing `context`"""
+        self.context = context
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_engine_main, daemon=True,
+                                       args=(child, self.cpu, BOOK is not None, TABLEBASE is not None))
+        self.process.start()
+        child.close()
+        self.pid = None
+        self.occ = None
+        self.failed = False
+
+    def wait_ready(self):
+        self.pid = self.conn.recv()
+
+    def call(self, req, start_time):
+        """Envoie la requête au processus et attend sa réponse (bloquant)"""
+        return self._exchange((req, start_time))
+
+    def table(self):
+        """Table de transposition du processus (voir TranspositionTable.entries)"""
+        return self._exchange("table")
+
+    def _exchange(self, message):
         try:
-            client, address = s.accept()
-            with client:
-                request = client.recv(MAX_RECV_LENGTH).decode()
-                req = json.loads(request)
-                message = req["request"]
-                
-                start_time = time.time()
-                
-                if message == "ping":
-                    client.send(json.dumps({'response': 'pong'}).encode())
-
-                elif message == "play":
-                    state = req["state"]
-                    chosen_move = {
-                        "pos": find_best_pos(state, start_time),
-                        "piece": find_best_piece(state, start_time)
-                    }
-                    client.send(json.dumps({
-                        'response': 'move',
-                        'move': chosen_move,
-                        'message': 'Stay humble ehh'
-                    }).encode())
-                    error_list = req["errors"]
-                    print("ERRORS : ", error_list)
-                    print(chosen_move)
-        except socket.timeout:
+            self.conn.send(message)
+            status, response = self.conn.recv()
+        except (EOFError, OSError) as e:
+            self.failed = True
+            raise RuntimeError(f"moteur {self.index} arrêté ({e!r})") from e
+        if status == "error":
+            raise RuntimeError(f"moteur {self.index} : {response}")
+        return response
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
             pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.conn.close()
+
+class EnginePool:
+    """Processus moteurs démarrés d'avance, entre lesquels le serveur répartit les requêtes play.
+
+    Les processus sont créés par fork avant tout fil du serveur : imports faits,
+    réglages du parent hérités, table de transposition chargée ; chacun fait une
+    recherche courte avant d'être déclaré prêt. Un moteur arrêté est remplacé
+    par un processus forkserver (spawn à défaut) : forké depuis le serveur, où
+    tournent alors des fils, il pourrait hériter d'un verrou tenu par l'un
+    d'eux. Celui-ci relit modules, tables et réglages par défaut. Le livre d'ouvertures et la
+    table de fin de partie sont des mmap en lecture seule : leurs pages, lues
+    une fois à la création du pool pour en vérifier le CRC, sont partagées par
+    tous les processus ; une table au CRC invalide n'est servie par aucun.
+
+    Une requête va à un moteur libre, de préférence celui dont la dernière
+    position servie précède la nouvelle (même partie, table déjà remplie) ;
+    sinon elle attend son tour. `depths` garde la longueur de la file d'attente
+    à l'arrivée de chaque requête, `waits` le temps passé à y attendre (s) ;
+    `max_busy` est le plus grand nombre de moteurs occupés à la fois.
+
+    Les moteurs ne sauvegardent pas leur table : save_table() les fusionne
+    dans celle du serveur (SEARCHER.tt), qui écrit seul la sauvegarde.
+    """
+    def __init__(self, size=ENGINE_POOL, pin=ENGINE_PIN_CPUS):
+        global BOOK, TABLEBASE
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        self.restart_context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        BOOK = _verified(BOOK)
+        TABLEBASE = _verified(TABLEBASE)
+        cpus = sorted(os.sched_getaffinity(0)) if pin and hasattr(os, "sched_setaffinity") else None
+        self.workers = [EngineWorker(index, cpus[index % len(cpus)] if cpus else None, context)
+                        for index in range(size)]
+        for worker in self.workers:
+            worker.wait_ready()
+        self.free = list(self.workers)
+        self.available = asyncio.Condition()
+        self.executor = ThreadPoolExecutor(max_workers=size)
+        self.waiting = 0
+        self.max_waiting = 0
+        self.max_busy = 0
+        self.depths = deque(maxlen=LATENCY_HISTORY)
+        self.waits = deque(maxlen=LATENCY_HISTORY)
+        self.sticky = 0
+        self.saving = False
+
+    def _choose(self, occ):
+        """Moteur libre qui a servi la position la plus avancée de la même partie, sinon le premier"""
+        best = None
+        for worker in self.free:
+            if worker.occ is not None and worker.occ & ~occ == 0 and (best is None or worker.occ > best.occ):
+                best = worker
+        if best is None:
+            return self.free[0]
+        self.sticky += 1
+        return best
+
+    async def submit(self, req, start_time):
+        """Réponse à la requête par un moteur libre (attend qu'il y en ait un)"""
+        occ = board_occupancy(req["state"]["board"])
+        queued = time.perf_counter()
+        async with self.available:
+            self.depths.append(self.waiting)
+            if not self.free:
+                self.waiting += 1
+                self.max_waiting = max(self.max_waiting, self.waiting)
+                try:
+                    await self.available.wait_for(lambda: self.free)
+                finally:
+                    self.waiting -= 1
+            worker = self._choose(occ)
+            self.free.remove(worker)
+            self.max_busy = max(self.max_busy, len(self.workers) - len(self.free))
+        self.waits.append(time.perf_counter() - queued)
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            response = await loop.run_in_executor(self.executor, worker.call, req, start_time)
+            worker.occ = occ
+            return response
+        finally:
+            worker.served += 1
+            worker.busy_time += time.perf_counter() - start
+            await self._release(worker)
+
+    async def _release(self, worker):
+        """Rend le moteur aux requêtes, remplacé s'il s'est arrêté"""
+        if worker.failed:
+            # Son préchauffage est attendu hors de la boucle asyncio
+            worker.stop()
+            worker.start(self.restart_context)
+            await asyncio.get_running_loop().run_in_executor(self.executor, worker.wait_ready)
+        async with self.available:
+            self.free.append(worker)
+            self.available.notify()
+
+    async def save_table(self, interval=None):
+        """Sauvegarde SEARCHER.tt si c'est l'heure, après y avoir fusionné la table de
+        chaque moteur, pris à son tour dès qu'il est libre"""
+        tt = SEARCHER.tt
+        if self.saving or not tt.due(interval):
+            return
+        self.saving = True
+        loop = asyncio.get_running_loop()
+        try:
+            for worker in self.workers:
+                async with self.available:
+                    await self.available.wait_for(lambda: worker in self.free)
+                    self.free.remove(worker)
+                try:
+                    entries = await loop.run_in_executor(self.executor, worker.table)
+                    await loop.run_in_executor(self.executor, tt.merge, entries)
+                except RuntimeError as e:
+                    print(f"Table du moteur {worker.index} ignorée : {e}")
+                finally:
+                    await self._release(worker)
+            await loop.run_in_executor(self.executor, tt.flush_if_due, 0)
+        finally:
+            self.saving = False
+
+    def stats(self):
+        """Longueur de la file d'attente et activité de chaque moteur"""
+        return {
+            "waiting": self.waiting,
+            "max_waiting": self.max_waiting,
+            "max_busy": self.max_busy,
+            "mean_depth": sum(self.depths) / len(self.depths) if self.depths else 0.0,
+            "mean_wait_ms": 1000 * sum(self.waits) / len(self.waits) if self.waits else 0.0,
+            "sticky": self.sticky,
+            "workers": [
+                {"index": worker.index, "pid": worker.pid, "cpu": worker.cpu, "busy": worker not in self.free,
+                 "served": worker.served, "busy_s": round(worker.busy_time, 3)}
+                for worker in self.workers
+            ],
+        }
+
+    def close(self):
+        for worker in self.workers:
+            worker.stop()
+        self.executor.shutdown()
+
+class GameServer:
+    """Serveur asyncio qui reste à l'écoute entre les requêtes.
+
+    `latencies[requête]` garde les dernières durées (en secondes) entre la
+    réception complète d'une requête et l'envoi de sa réponse. Avec un
+    EnginePool, les requêtes play de parties simultanées sont servies en
+    parallèle par ses moteurs, sans réflexion pendant le temps adverse.
+    """
+    def __init__(self, port=PORT, host='', pool=None):
+        self.port = port
+        self.host = host
+        self.server = None
+        self.pool = pool
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.latencies = {}
+        self.save_task = None  # fusion et sauvegarde des tables des moteurs en cours
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def run(self, subscribe=True):
+        """Écoute, s'inscrit auprès du serveur de jeu puis sert indéfiniment"""
+        if self.server is None:
+            await self.start()
+        if subscribe:
+            await asyncio.get_running_loop().run_in_executor(None, s_inscrire)
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        PONDERER.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+        if self.pool is not None:
+            if self.save_task is not None:
+                await self.save_task
+            await self.pool.save_table(0)
+            self.pool.close()
+        else:
+            self.executor.submit(save_table, 0)
+        self.executor.shutdown()
+
+    async def handle(self, reader, writer):
+        try:
+            req = await read_message(reader)
+            start_time = time.time()
+            start = time.perf_counter()
+            message = req["request"]
+            if message == "ping":
+                response = handle_request(req, start_time)
+            elif self.pool is not None and message == "play":
+                response = await self.pool.submit(req, start_time)
+            else:
+                # La réflexion en cours libère le fil de recherche au prochain contrôle ;
+                # celle qui suivra cette réponse appartient à la nouvelle génération
+                generation = PONDERER.cancel()
+                loop = asyncio.get_running_loop()
+                response = await loop.run_in_executor(self.executor, handle_request, req, start_time)
+            if response is not None:
+                await write_message(writer, response)
+            latency = time.perf_counter() - start
+            self.latencies.setdefault(message, deque(maxlen=LATENCY_HISTORY)).append(latency)
+            if CAPTURE_PATH is not None:
+                capture(req, response, start_time, latency)
+            if message == "play" and self.pool is not None:
+                stats = self.pool.stats()
+                print(f"play : {latency * 1000:.1f} ms, file d'attente : {stats['waiting']} "
+                      f"(max {stats['max_waiting']}), moteurs : {[w['served'] for w in stats['workers']]}")
+                if SEARCHER.tt.due() and self.save_task is None:
+                    self.save_task = asyncio.create_task(self.pool.save_table())
+                    self.save_task.add_done_callback(lambda _: setattr(self, "save_task", None))
+            elif message == "play":
+                print(f"play : {latency * 1000:.1f} ms, réflexion : {PONDERER.hit_rate():.0%} de positions anticipées")
+                # Sauvegarde dans le fil de recherche : la table n'y change pas pendant l'écriture
+                self.executor.submit(save_table)
+                if PONDER and response is not None:
+                    self.ponder(req["state"], response["move"], generation)
         except Exception as e:
             print(f"Erreur: {e}")
+        finally:
+            writer.close()
+
+    def ponder(self, state, move, generation):
+        """Lance la réflexion sur la position laissée à l'adversaire ; une requête arrivée
+        depuis la génération `generation` l'annule, même avant son début"""
+        position = position_after(state, move)
+        if position is not None:
+            self.executor.submit(PONDERER.ponder, *position, generation)
+
+    def latency_summary(self):
+        """{requête: (nombre, moyenne, maximum)} en secondes"""
+        return {
+            message: (len(values), sum(values) / len(values), max(values))
+            for message, values in self.latencies.items()
+        }
 
 # Point d'entrée
 if __name__ == '__main__':
-    s_inscrire()
-    while True:
-        main()
\ No newline at end of file
+    if ENGINE_POOL > 1:
+        asyncio.run(GameServer(pool=EnginePool()).run())
+    else:
+        start_workers()
+        asyncio.run(GameServer().run())
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""Rejoue hors ligne les requêtes enregistrées en partie (CAPTURE_PATH).
+
+    python replay_quarto.py capture.jsonl --share 0.8
+    python replay_quarto.py capture.jsonl --server --pace --set TIMEOUT=2.5
+
+Par défaut, chaque requête passe directement par handle_request ; avec
+--server, elle est envoyée à un GameServer local (lecture, file de recherche,
+réflexion), et --pace respecte les intervalles enregistrés, pendant lesquels
+le serveur réfléchit. Le rapport donne les percentiles des durées de coup, les
+coups qui changent par rapport à l'enregistrement et les positions qui
+dépassent `--share` du TIMEOUT ; le code de retour vaut 1 s'il y en a.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import time
+
+import projet_quarto as pq
+from arena_quarto import parse_overrides, percentile, send_request
+
+PACE_MAX_GAP = 10.0  # attente maximale (s) entre deux requêtes avec --pace
+
+
+def read_capture(path):
+    """(numéro de ligne, enregistrement) des requêtes ping et play du journal ; les
+    lignes illisibles, comme une dernière ligne tronquée par un arrêt brutal, sont sautées"""
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            try:
+                record = json.loads(line)
+                message = record["req"]["request"]
+            except (ValueError, KeyError, TypeError):
+                continue
+            if message in ("ping", "play"):
+                yield number, record
+
+
+def _result(number, record, response, latency):
+    req = record["req"]
+    recorded = record.get("resp") or {}
+    return {
+        "line": number,
+        "request": req["request"],
+        "ms": round(latency * 1000, 2),
+        "recorded_ms": record.get("ms"),
+        "move": (response or {}).get("move"),
+        "recorded_move": recorded.get("move"),
+        "state": req.get("state"),
+    }
+
+
+def replay_direct(records):
+    """Rejoue les requêtes une à une par handle_request"""
+    results = []
+    for number, record in records:
+        start = time.perf_counter()
+        response = pq.handle_request(record["req"], time.time())
+        results.append(_result(number, record, response, time.perf_counter() - start))
+    return results
+
+
+async def replay_server(records, pace=False):
+    """Rejoue les requêtes à travers un GameServer local, durées mesurées côté client"""
+    server = await pq.GameServer(port=0, host='127.0.0.1').start()
+    results = []
+    previous = None
+    try:
+        for number, record in records:
+            if pace and previous is not None:
+                await asyncio.sleep(min(max(record.get("t", previous) - previous, 0.0), PACE_MAX_GAP))
+            previous = record.get("t")
+            start = time.perf_counter()
+            response = await send_request(('127.0.0.1', server.port), record["req"])
+            results.append(_result(number, record, response, time.perf_counter() - start))
+    finally:
+        await server.close()
+    return results
+
+
+def summarize(results, share=0.8, timeout=None):
+    """Percentiles des durées des coups (ms), coups changés et positions hors budget"""
+    budget_ms = share * (pq.TIMEOUT if timeout is None else timeout) * 1000
+    plays = [result for result in results if result["request"] == "play"]
+
+    def distribution(values):
+        return {name: percentile(values, q) for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))} | {
+            "max": max(values, default=None)}
+    return {
+        "requests": len(results),
+        "plays": len(plays),
+        "latency_ms": distribution([result["ms"] for result in plays]),
+        "recorded_ms": distribution([result["recorded_ms"] for result in plays if result["recorded_ms"] is not None]),
+        "changed_moves": sum(1 for result in plays if result["recorded_move"] is not None
+                             and result["move"] != result["recorded_move"]),
+        "budget_ms": budget_ms,
+        "over_budget": [
+            {"line": result["line"], "ms": result["ms"], "recorded_ms": result["recorded_ms"], "state": result["state"]}
+            for result in plays if result["ms"] > budget_ms
+        ],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("capture", help="journal enregistré (CAPTURE_PATH)")
+    parser.add_argument("--server", action="store_true", help="passer par un GameServer local")
+    parser.add_argument("--pace", action="store_true", help="avec --server : respecter les intervalles enregistrés")
+    parser.add_argument("--share", type=float, default=0.8, help="part du TIMEOUT au-delà de laquelle un coup est signalé")
+    parser.add_argument("--set", action="append", help="réglage NOM=valeur du moteur (TIMEOUT, WORKERS...)")
+    parser.add_argument("--output", help="fichier JSON du rapport")
+    parser.add_argument("--verbose", action="store_true", help="garder les messages du moteur")
+    args = parser.parse_args(argv)
+    for name, value in parse_overrides(args.set):
+        setattr(pq, name, value)
+    records = read_capture(args.capture)
+    pq.start_workers(pq.WORKERS)
+    try:
+        with contextlib.ExitStack() as stack:
+            if not args.verbose:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+            if args.server:
+                results = asyncio.run(replay_server(records, args.pace))
+            else:
+                results = replay_direct(records)
+    finally:
+        pq.stop_workers()
+    summary = summarize(results, args.share)
+    print(f"{summary['requests']} requêtes, dont {summary['plays']} play ; "
+          f"{summary['changed_moves']} coups différents de l'enregistrement")
+    for name in ("latency_ms", "recorded_ms"):
+        print(f"{name} : " + ", ".join(f"{key} {value:.0f}" for key, value in summary[name].items() if value is not None))
+    for flagged in summary["over_budget"]:
+        print(f"ligne {flagged['line']} : {flagged['ms']:.0f} ms (enregistré : {flagged['recorded_ms']} ms), "
+              f"au-delà de {summary['budget_ms']:.0f} ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summary, f, indent=2)
+    return 1 if summary["over_budget"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
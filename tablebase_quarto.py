@@ -0,0 +1,196 @@
+"""Génération hors ligne de la table de fin de partie.
+
+Toutes les positions à N cases vides sont bien trop nombreuses pour une analyse
+rétrograde complète (16! façons de remplir le plateau) : la table couvre les
+sous-arbres de positions de départ, tirées au hasard ou prises dans des
+parties enregistrées (CAPTURE_PATH, JSONL d'analyse_quarto.py). Chaque
+sous-arbre est résolu exactement, sans élagage alpha-beta pour que chaque
+position visitée ait son résultat ; on s'arrête au premier coup gagnant.
+
+Les positions de départ sont découpées en lots répartis entre les processus ;
+chaque lot terminé est écrit dans le répertoire de travail, si bien qu'une
+génération interrompue reprend là où elle s'était arrêtée. Les lots sont
+enfin fusionnés dans le fichier lu par projet_quarto.EndgameTablebase.
+
+    python tablebase_quarto.py --empty 6 --positions 2000 --workers 8
+    python tablebase_quarto.py --empty 7 --from capture.jsonl --work tb-work --output quarto_tablebase.bin
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import time
+import zlib
+from array import array
+from multiprocessing import Pool
+
+import projet_quarto as pq
+
+BATCH = 50  # positions de départ par lot
+PART_FORMAT = 2  # à incrémenter quand le contenu des lots change
+
+
+def solve_subtree(state, results, occupancies=None):
+    """Résultat exact (TB_LOSS, TB_DRAW, TB_WIN) pour le joueur qui doit poser
+    `state.piece` ; ajoute à `results` celui de chaque position visitée, et à
+    `occupancies` ses cases occupées"""
+    if state.deadly_mask >> state.piece & 1:
+        return pq.TB_WIN
+    remaining = state.remaining
+    if not remaining:
+        return pq.TB_DRAW  # la dernière pièce remplit le plateau sans gagner
+    key = pq.canonical_key(state.masks(), remaining, state.piece, False, pq.BOARD_SYMMETRIES)[0]
+    best = results.get(key)
+    if best is not None:
+        return best
+    best = pq.TB_LOSS  # toute pièce donnée fait gagner l'adversaire
+    occ = state.occ
+    for pos in pq.SQUARE_ORDER:
+        if occ >> pos & 1:
+            continue
+        state.play(pos)
+        for give in pq.mask_to_codes(remaining & ~state.deadly_mask):
+            state.give(give)
+            best = max(best, pq.TB_WIN - solve_subtree(state, results, occupancies))
+            state.undo_give()
+            if best == pq.TB_WIN:
+                break
+        state.undo_play()
+        if best == pq.TB_WIN:
+            break
+    results[key] = best
+    if occupancies is not None:
+        occupancies.add(occ)
+    return best
+
+
+def random_positions(count, empty, seed=0):
+    """Positions de départ tirées au hasard (masques, pièces restantes, pièce à poser)"""
+    rng = random.Random(seed)
+    return [pq.random_position(empty, rng) for _ in range(count)]
+
+
+def recorded_positions(path, empty):
+    """Positions à au plus `empty` cases vides d'un JSONL d'états, de requêtes play ou
+    d'un enregistrement CAPTURE_PATH (sans doublon, dans l'ordre du fichier)"""
+    positions = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                item = json.loads(line)
+                item = item.get("req", item)
+                state = item.get("state", item)
+                if pq.check_winner(state["board"]) or not state["piece"]:
+                    continue
+                masks, piece, remaining = pq.parse_state(state)
+            except (ValueError, KeyError, TypeError, AttributeError):
+                continue
+            free = (~masks[0] & pq.FULL_BOARD).bit_count()
+            if free <= empty and remaining and not pq.deadly_pieces(masks) >> piece & 1:
+                key = pq.canonical_key(masks, remaining, piece, False, pq.BOARD_SYMMETRIES)[0]
+                positions.setdefault(key, (masks, remaining, piece))
+    return list(positions.values())
+
+
+def _part_path(work, index):
+    return os.path.join(work, f"part-{index:06d}.bin")
+
+
+def _solve_batch(job):
+    """Résout un lot de positions et l'écrit (nombre d'entrées, clés, résultats puis
+    cases occupées) ; retourne le nombre d'entrées"""
+    work, index, positions = job
+    results = {}
+    occupancies = set()
+    for masks, remaining, piece in positions:
+        solve_subtree(pq.SearchState(masks, remaining, piece), results, occupancies)
+    keys = array('Q', results)
+    values = array('B', (results[key] for key in keys))
+    path = _part_path(work, index)
+    with open(path + ".tmp", 'wb') as f:
+        array('Q', [len(keys)]).tofile(f)
+        keys.tofile(f)
+        values.tofile(f)
+        array('H', sorted(occupancies)).tofile(f)
+    os.replace(path + ".tmp", path)
+    return len(keys)
+
+
+def read_part(path):
+    """({clé: résultat}, cases occupées) d'un lot écrit par _solve_batch"""
+    header = array('Q')
+    keys = array('Q')
+    values = array('B')
+    occupancies = array('H')
+    with open(path, 'rb') as f:
+        header.fromfile(f, 1)
+        count = header[0]
+        keys.fromfile(f, count)
+        values.fromfile(f, count)
+        occupancies.frombytes(f.read())
+    return dict(zip(keys, values)), set(occupancies)
+
+
+def generate(positions, empty, work, output, workers=1, progress=False):
+    """Résout les lots manquants du répertoire `work` puis écrit la table ;
+    retourne le nombre de positions de la table"""
+    os.makedirs(work, exist_ok=True)
+    manifest = {"format": PART_FORMAT, "empty": empty, "positions": len(positions), "batch": BATCH,
+                "crc": zlib.crc32(json.dumps(positions).encode())}
+    manifest_path = os.path.join(work, "manifest.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        if previous != manifest:
+            raise ValueError(f"{work} contient une autre génération : {previous}")
+    else:
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f)
+    batches = [positions[start:start + BATCH] for start in range(0, len(positions), BATCH)]
+    jobs = [(work, index, batch) for index, batch in enumerate(batches)
+            if not os.path.exists(_part_path(work, index))]
+    if jobs:
+        with contextlib.ExitStack() as stack:
+            if workers <= 1:
+                solved = map(_solve_batch, jobs)
+            else:
+                solved = stack.enter_context(Pool(workers)).imap_unordered(_solve_batch, jobs)
+            for done, _ in enumerate(solved, len(batches) - len(jobs) + 1):
+                if progress:
+                    print(f"\r{done}/{len(batches)} lots", end="", flush=True)
+        if progress:
+            print()
+    entries = {}
+    occupancies = set()
+    for index in range(len(batches)):
+        part, occupied = read_part(_part_path(work, index))
+        entries.update(part)
+        occupancies |= occupied
+    pq.EndgameTablebase.write(output, empty, entries, occupancies)
+    return len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--empty", type=int, default=6, help="cases vides des positions de départ, au plus")
+    parser.add_argument("--positions", type=int, default=1000, help="positions de départ tirées au hasard")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--from", dest="source", help="positions de départ d'un JSONL d'états ou de requêtes play")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="nombre de processus")
+    parser.add_argument("--work", default="tablebase-work", help="répertoire des lots (reprise)")
+    parser.add_argument("--output", default=pq.TABLEBASE_PATH, help="fichier de la table")
+    args = parser.parse_args(argv)
+    if args.source is not None:
+        positions = recorded_positions(args.source, args.empty)
+    else:
+        positions = random_positions(args.positions, args.empty, args.seed)
+    start = time.perf_counter()
+    count = generate(positions, args.empty, args.work, args.output, args.workers, progress=True)
+    size = os.path.getsize(args.output)
+    print(f"{count} positions de {len(positions)} sous-arbres écrites dans {args.output} "
+          f"({size / 2**20:.1f} Mo, {time.perf_counter() - start:.0f} s)")
+
+
+if __name__ == '__main__':
+    main()
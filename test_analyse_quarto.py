@@ -0,0 +1,60 @@
+import gzip
+import json
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import projet_quarto
+import analyse_quarto
+
+STATE = {"board": ["BDEC", None, None, None, None, "BLEP", None, None, None, None, "SDFP", None, None, None, None,
+                   "SLFC"], "piece": "BDEP"}
+
+def test_analyse_position():
+    record = analyse_quarto.analyse_position(STATE, depth=2)
+    assert STATE["board"][record["pos"]] is None
+    assert record["piece"] in projet_quarto.PIECE_NAMES and record["piece"] != "BDEP"
+    assert record["depth"] == 2 and record["nodes"] > 0
+    masks, piece, remaining = projet_quarto.parse_state(STATE)
+    expected = projet_quarto.Searcher(projet_quarto.TranspositionTable(1)).search(masks, remaining, piece, max_depth=2)
+    assert record["score"] == expected.score
+    timed = analyse_quarto.analyse_position({"board": [None] * 16, "piece": None}, seconds=0.1)
+    assert timed["pos"] is None and timed["ms"] < 500
+
+def test_analyse_stream():
+    lines = [
+        json.dumps({"id": "a", "state": STATE}),
+        "",
+        "pas du json",
+        json.dumps({"board": [None] * 16, "piece": "SLFP"}),
+        json.dumps({"board": ["SDEC", "SLEP", "SDFC", "SLFP"] + [None] * 12, "piece": "BDEP"}),
+    ]
+    for workers in (1, 2):
+        records = list(analyse_quarto.analyse_stream(iter(lines), depth=1, workers=workers, window=2, tt_mb=1))
+        assert [record["line"] for record in records] == [1, 3, 4, 5]
+        assert records[0]["id"] == "a" and "pos" in records[0]
+        assert "error" in records[1] and "error" in records[3]
+        assert records[2]["depth"] == 1
+
+def test_analyse_stream_is_lazy():
+    read = []
+
+    def lines():
+        for n in range(100):
+            read.append(n)
+            yield json.dumps(STATE)
+    stream = analyse_quarto.analyse_stream(lines(), depth=1, workers=2, window=3, tt_mb=1)
+    next(stream)
+    assert len(read) <= 4
+    stream.close()
+
+def test_main(tmp_path):
+    source = str(tmp_path / "positions.jsonl.gz")
+    with gzip.open(source, "wt") as f:
+        for _ in range(3):
+            f.write(json.dumps({"request": "play", "state": STATE}) + "\n")
+    output = str(tmp_path / "analyses.jsonl")
+    assert analyse_quarto.main([source, "--depth", "1", "--workers", "1", "--tt-mb", "1", "--output", output]) == 0
+    with open(output) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 3 and all(record["depth"] == 1 for record in records)
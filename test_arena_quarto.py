@@ -0,0 +1,107 @@
+import asyncio
+import random
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import projet_quarto
+import arena_quarto
+
+def test_game_rules():
+    game = arena_quarto.Game(["a", "b"])
+    # Premier coup : on donne seulement une pièce
+    game.play({"pos": None, "piece": "SDEC"})
+    assert game.current == 1 and game.piece == "SDEC"
+    for move in ({"pos": 16, "piece": "SLFP"}, {"pos": 0, "piece": "SDEC"}, {"pos": 0, "piece": "XXXX"}, "e2e4"):
+        try:
+            game.play(move)
+        except arena_quarto.IllegalMove:
+            pass
+        else:
+            raise AssertionError(move)
+    assert game.board == [None] * 16 and game.current == 1
+    for pos, give in ((0, "SLEP"), (1, "SDFC"), (2, "SLFP")):
+        game.play({"pos": pos, "piece": give})
+    # La quatrième petite pièce gagne : pas besoin de donner de pièce
+    game.play({"pos": 3, "piece": None})
+    assert game.over and game.winner == 0 and game.moves == 5
+
+def test_game_errors():
+    game = arena_quarto.Game(["a", "b"], first=1)
+    assert game.submit({"pos": None, "piece": "BDEC"}, 5.0, time_limit=3.0)["message"].startswith("délai")
+    assert game.request()["lives"] == arena_quarto.LIVES - 1
+    assert len(game.request()["errors"]) == 1
+    game.submit({"pos": None, "piece": "ZZZZ"}, 0.1)
+    game.submit({"pos": None, "piece": "ZZZZ"}, 0.1)
+    assert game.over and game.winner == 0
+
+def test_random_move():
+    rng = random.Random(0)
+    for seed in range(20):
+        game = arena_quarto.Game(["a", "b"])
+        while not game.over:
+            game.play(arena_quarto.random_move(game, rng))
+        assert game.moves <= 17
+
+def test_play_engines():
+    spec = (projet_quarto.__file__, (("TIMEOUT", 0.05),))
+    engines = (arena_quarto.load_engine(spec), arena_quarto.load_engine(spec))
+    assert engines[0] is engines[1] and engines[0] is not projet_quarto
+    winner, moves, latencies = arena_quarto.play_engines(engines, first=0, random_plies=2, seed=1)
+    assert winner in (0, 1, None)
+    assert len(latencies[0]) + len(latencies[1]) == moves - 2
+    assert max(latencies[0] + latencies[1]) < arena_quarto.TIME_LIMIT
+
+def test_run_arena():
+    spec = (projet_quarto.__file__, (("TIMEOUT", 0.02),))
+    results, elapsed = arena_quarto.run_arena(spec, spec, games=4, workers=2, seed=3)
+    summary = arena_quarto.summarize(results, elapsed)
+    assert summary["games"] == 4
+    assert summary["wins_a"] + summary["wins_b"] + summary["draws"] == 4
+    low, high = summary["score_a_ci95"]
+    assert 0 <= low <= summary["score_a"] <= high <= 1
+    assert summary["moves_per_s"] > 0
+    assert summary["latency_a"]["p50"] <= summary["latency_a"]["max"]
+
+def test_summarize():
+    results = [(0, 10, ([0.1], [0.2])), (1, 12, ([0.3], [0.4])), (None, 17, ([0.5], [0.6]))]
+    summary = arena_quarto.summarize(results, 1.0)
+    assert (summary["wins_a"], summary["wins_b"], summary["draws"]) == (1, 1, 1)
+    assert summary["score_a"] == 0.5
+    assert summary["moves_per_s"] == 39
+    assert summary["latency_b"]["max"] == 0.6
+
+def test_parse_overrides():
+    assert arena_quarto.parse_overrides(["TIMEOUT=0.5", "NOM=test", "BATCH_EVAL=true"]) == (
+        ("BATCH_EVAL", True), ("NOM", "test"), ("TIMEOUT", 0.5))
+
+def test_local_server(monkeypatch):
+    monkeypatch.setattr(projet_quarto, "TIMEOUT", 0.1)
+    monkeypatch.setattr(projet_quarto, "PONDER", False)  # les deux joueurs partagent le module
+
+    async def scenario():
+        server = await arena_quarto.LocalServer(port=0, host='127.0.0.1', games=2, time_limit=1.0).start()
+        players = [await projet_quarto.GameServer(port=0, host='127.0.0.1').start() for _ in range(2)]
+        loop = asyncio.get_running_loop()
+        try:
+            monkeypatch.setattr(projet_quarto, "SERVER_ADDRESS", ('127.0.0.1', server.port))
+            for name, player in zip(("a", "b"), players):
+                monkeypatch.setattr(projet_quarto, "PORT", player.port)
+                monkeypatch.setattr(projet_quarto, "NOM", name)
+                await loop.run_in_executor(None, projet_quarto.s_inscrire)
+            for _ in range(200):
+                if len(server.results) == 2:
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            for player in players:
+                await player.close()
+            await server.close()
+        return server.results
+
+    results = asyncio.run(scenario())
+    assert len(results) == 2
+    for names, winner, errors in results:
+        assert sorted(names) == ["a", "b"]
+        assert winner in ("a", "b", None)
+        assert errors == [[], []]
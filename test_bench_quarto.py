@@ -0,0 +1,42 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import projet_quarto
+import bench_quarto
+
+def test_random_boards():
+    boards = bench_quarto.random_boards(50, seed=1)
+    assert len(boards) == 50
+    assert not any(projet_quarto.is_winning(masks) for masks in boards)
+
+def test_bench_batch_eval():
+    results = bench_quarto.bench_batch_eval(count=64, batch_sizes=(16,))
+    assert results["scalar"] > 0 and results["incremental"] > 0
+    if projet_quarto.np is not None:
+        assert results["numpy_16"] > 0
+
+def test_compare():
+    baseline = {"calibration_s": 1.0, "a.search_nodes_per_s": 1000, "a.time_to_depth_4_s": 1.0,
+                "a.find_best_move_depth": 4, "a.minimax_cached_s": 0.001, "peak_memory_kb": 1000}
+    assert bench_quarto.compare(dict(baseline), baseline) == []
+    slower = dict(baseline, **{"a.search_nodes_per_s": 500, "a.time_to_depth_4_s": 2.0,
+                               "a.find_best_move_depth": 2, "a.minimax_cached_s": 0.005})
+    names = [line.split(" : ")[0] for line in bench_quarto.compare(slower, baseline)]
+    # Les durées trop courtes pour être fiables sont ignorées
+    assert names == ["a.find_best_move_depth", "a.search_nodes_per_s", "a.time_to_depth_4_s"]
+    # Une machine deux fois plus lente n'est pas une régression du moteur
+    assert bench_quarto.compare(dict(slower, calibration_s=2.0, **{"a.find_best_move_depth": 4}), baseline) == []
+
+def test_suite(tmp_path, monkeypatch):
+    monkeypatch.setattr(bench_quarto, "CORPUS", bench_quarto.CORPUS[-1:])
+    baseline = str(tmp_path / "baseline.json")
+    output = str(tmp_path / "results.json")
+    args = ["suite", "--runs", "1", "--timeout", "0.2", "--baseline", baseline]
+    assert bench_quarto.main(args + ["--update-baseline"]) == 0
+    assert bench_quarto.main(args + ["--output", output, "--tolerance", "100"]) == 0
+    metrics = bench_quarto.read_metrics(output)
+    assert set(metrics) == set(bench_quarto.read_metrics(baseline))
+    assert metrics["endgame-8.find_best_move_depth"] > 0
+    assert metrics["endgame-8.search_nodes_per_s"] > 0
+    assert metrics["endgame-8.mcts_playouts_per_s"] > 0
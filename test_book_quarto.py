@@ -0,0 +1,28 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import projet_quarto
+import book_quarto
+
+def test_opening_positions():
+    # Plateau vide, puis une seule pièce à poser à symétrie près, puis 14 classes
+    assert [len(book_quarto.opening_positions(n)) for n in range(3)] == [1, 2, 14]
+
+def test_analyse():
+    positions = book_quarto.opening_positions(1)
+    for key, position in positions.items():
+        masks, remaining, piece = position
+        book_key, move, score = book_quarto.analyse((key, position, 0.05))
+        assert book_key == key
+        assert remaining >> projet_quarto.piece_from_canonical(
+            projet_quarto.canonical_key(masks, remaining, piece, True)[1], move & 0xF) & 1
+
+def test_build_book(tmp_path):
+    path = str(tmp_path / "book.bin")
+    assert book_quarto.build_book(path, 1, 0.05, workers=2) == 2
+    book = projet_quarto.OpeningBook.open(path)
+    assert book.verify()
+    pos, piece, _ = book.lookup(projet_quarto.EMPTY_BOARD, projet_quarto.ALL_PIECES, None)
+    assert pos is None and piece in range(16)
+    book.close()
@@ -3,9 +3,12 @@ import copy
 import random
 import socket
 import json
+import asyncio
+import threading
 from unittest.mock import MagicMock, patch
 import sys
 import os
+import time
 
 # Add the parent directory to path so we can import the module to test
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -162,21 +165,6 @@ def test_evaluate_board(empty_board, sample_board, winning_board):
     score_winning = projet_quarto.evaluate_board(winning_board)
     assert score_winning == float('inf')  # Should return infinity for winning board
 
-def test_adaptive_depth():
-    # Test with lots of time and many pieces
-    state = {"board": [None] * 16, "piece": "BDEP"}
-    depth = projet_quarto.adaptive_depth(state, 5.0)
-    assert depth >= 3
-    
-    # Test with little time
-    depth = projet_quarto.adaptive_depth(state, 1.0)
-    assert depth >= 2
-    
-    # Test with few pieces remaining
-    state["board"] = ["BDEC"] * 8 + [None] * 8
-    depth = projet_quarto.adaptive_depth(state, 5.0)
-    assert depth >= 3
-
 def test_minimax_cached():
     # Basic test with simple board
     board = [None] * 16
@@ -204,6 +192,441 @@ def test_minimax_cached():
     )
     assert isinstance(score, (int, float))
 
+def test_search_state(sample_board, nearly_winning_board):
+    for board in (sample_board, nearly_winning_board):
+        masks = projet_quarto.board_to_masks(board)
+        remaining = projet_quarto.ALL_PIECES & ~projet_quarto.pieces_to_mask([p for p in board if p] + ["BDEP"])
+        piece = projet_quarto.piece_to_code("BDEP")
+        state = projet_quarto.SearchState(masks, remaining, piece)
+        frames = [id(frame) for frame in state.frames]
+        assert state.evaluate() == projet_quarto.evaluate_board(board)
+        assert state.key == projet_quarto.zobrist_hash(masks, remaining, piece, False)
+        for pos in projet_quarto.get_available_positions(board):
+            give = projet_quarto.mask_to_codes(remaining)[0]
+            state.play(pos)
+            state.give(give)
+            new_board = list(board)
+            new_board[pos] = "BDEP"
+            assert state.masks() == projet_quarto.board_to_masks(new_board)
+            assert state.evaluate() == projet_quarto.evaluate_board(new_board)
+            state.undo_give()
+            state.undo_play()
+        assert state.masks() == masks and state.piece == piece and state.remaining == remaining
+        assert state.key == projet_quarto.zobrist_hash(masks, remaining, piece, False)
+        # Les cadres d'annulation sont réutilisés, pas réalloués
+        assert state.top == 0 and [id(frame) for frame in state.frames] == frames
+    # SLFP complète la ligne de petites pièces
+    assert state.can_win(projet_quarto.piece_to_code("SLFP"))
+    assert state.winning_square(projet_quarto.piece_to_code("SLFP")) == 3
+    assert not state.can_win(projet_quarto.piece_to_code("BLFP"))
+
+def test_deadly_index():
+    # L'index tenu à jour coup par coup doit égaler le calcul direct sur le plateau
+    rng = random.Random(3)
+    for _ in range(50):
+        codes = list(range(16))
+        rng.shuffle(codes)
+        state = projet_quarto.SearchState(projet_quarto.EMPTY_BOARD, projet_quarto.ALL_PIECES, None)
+        for sq in rng.sample(range(16), 12):
+            state.give(codes.pop())
+            state.play(sq)
+            masks = state.masks()
+            assert state.deadly() == projet_quarto.deadly_pieces(masks)
+            assert state.safe() == state.remaining & ~projet_quarto.deadly_pieces(masks)
+            for code in range(16):
+                squares = [pos for pos in projet_quarto.empty_squares(masks[0])
+                           if projet_quarto.wins_with(masks, pos, code)]
+                assert projet_quarto.danger_score(masks, code) == 100 * len(squares)
+        for _ in range(12):
+            state.undo_play()
+            state.undo_give()
+        assert state.deadly() == 0
+
+def test_batch_evaluate(sample_board, winning_board, nearly_winning_board):
+    pytest.importorskip("numpy")
+    boards = [sample_board, winning_board, nearly_winning_board, [None] * 16]
+    rows = projet_quarto.boards_to_array([projet_quarto.board_to_masks(b) for b in boards])
+    scores = projet_quarto.batch_evaluate(rows)
+    deadly = projet_quarto.batch_deadly(rows)
+    for board, score, mask in zip(boards, scores, deadly):
+        assert score == projet_quarto.evaluate_board(board)
+        if not projet_quarto.check_winner(board):
+            assert mask == projet_quarto.deadly_pieces(projet_quarto.board_to_masks(board))
+
+def test_eval_weights(tmp_path, sample_board):
+    pytest.importorskip("numpy")
+    path = str(tmp_path / "weights.json")
+    weights = {"shared": 7, "danger": 31, "center": -4}
+    with open(path, "w") as f:
+        json.dump({"version": projet_quarto.BASE_EVAL_VERSION, "weights": weights}, f)
+    rng = random.Random(5)
+    positions = [projet_quarto.random_position(empty, rng) for empty in (14, 10, 7, 4)]
+    try:
+        assert projet_quarto.load_eval_weights(path) == weights
+        assert projet_quarto.EVAL_VERSION != projet_quarto.BASE_EVAL_VERSION
+        rows = projet_quarto.boards_to_array([masks for masks, _, _ in positions])
+        for (masks, remaining, piece), batch in zip(positions, projet_quarto.batch_evaluate(rows)):
+            expected = projet_quarto.evaluate_masks(masks)
+            assert projet_quarto.SearchState(masks, remaining, piece).evaluate() == expected == batch
+        assert projet_quarto.evaluate_board([None] * 5 + ["BDEC"] + [None] * 10) == 3 * 4 * 7 - 4  # ligne, colonne, diagonale
+        with open(path, "w") as f:
+            json.dump({"version": projet_quarto.BASE_EVAL_VERSION, "weights": {"shared": 1000, "danger": 0,
+                                                                                "center": 0}}, f)
+        assert projet_quarto.load_eval_weights(path) == projet_quarto.DEFAULT_WEIGHTS
+    finally:
+        projet_quarto.set_eval_weights(projet_quarto.DEFAULT_WEIGHTS)
+    assert projet_quarto.EVAL_VERSION == projet_quarto.BASE_EVAL_VERSION
+    assert projet_quarto.evaluate_board(sample_board) == projet_quarto.evaluate_masks(
+        projet_quarto.board_to_masks(sample_board))
+
+def test_batch_search_matches_scalar():
+    pytest.importorskip("numpy")
+    rng = random.Random(2)
+    masks, remaining, piece = projet_quarto.random_position(12, rng)
+    results = []
+    for batch in (False, True):
+        with patch('projet_quarto.BATCH_EVAL', batch):
+            searcher = projet_quarto.Searcher(projet_quarto.TranspositionTable(size_mb=1))
+            results.append(searcher.search(masks, remaining, piece, max_depth=3).score)
+    assert results[0] == results[1]
+
+def test_searcher_iterative_deepening(sample_state):
+    masks, piece, remaining = projet_quarto.parse_state(sample_state)
+    searcher = projet_quarto.Searcher(projet_quarto.TranspositionTable(size_mb=1))
+    result = searcher.search(masks, remaining, piece, max_depth=2)
+    assert result.depth == 2
+    assert masks[0] >> result.pos & 1 == 0
+    assert remaining >> result.piece & 1
+    # Même valeur que la recherche à profondeur fixe
+    score = projet_quarto.minimax_cached(
+        tuple(sample_state["board"]), tuple(projet_quarto.get_available_pieces(sample_state)),
+        sample_state["piece"], 2, True, float('-inf'), float('inf')
+    )
+    assert result.score == score
+
+def test_searcher_history():
+    rng = random.Random(5)
+    masks, remaining, piece = projet_quarto.random_position(8, rng)
+    searcher = projet_quarto.Searcher(projet_quarto.TranspositionTable(size_mb=1))
+    first = searcher.search(masks, remaining, piece, max_depth=3)
+    ply = masks[0].bit_count() + 1
+    assert any(searcher.killers) and sum(map(sum, searcher.give_history)) > 0
+    assert len(searcher.killers[ply]) <= 2
+    # Les tables ordonnent seulement : la valeur ne change pas d'une recherche à l'autre
+    weights = sum(map(sum, searcher.place_history))
+    searcher.tt.clear()
+    again = searcher.search(masks, remaining, piece, max_depth=3)
+    assert again.score == first.score
+    assert sum(map(sum, searcher.place_history)) >= weights // 2
+    searcher.clear_history()
+    assert searcher.history(ply, 0, 0) == 0 and not any(searcher.killers)
+
+def test_searcher_forced_extension():
+    # Après la pose en 0, seule BDFC est sûre : à la profondeur 3, la ligne forcée
+    # est suivie un coup plus loin, jusqu'à la victoire
+    state = {"board": [None, None, None, None, None, "SLFP", "BDEP", "BLEC", "BDEC", "SLEP", "SDEC", None, None,
+                       "SDFC", "BLEP", "SLFC"], "piece": "BLFC"}
+    masks, piece, remaining = projet_quarto.parse_state(state)
+    searcher = projet_quarto.Searcher(projet_quarto.TranspositionTable(size_mb=1))
+    result = searcher.search(masks, remaining, piece, max_depth=3)
+    assert projet_quarto.is_win_score(result.score) and result.score > 0
+    assert searcher.counters()["extensions"] > 0
+    after = projet_quarto.place(masks, result.pos, piece)
+    assert remaining & ~projet_quarto.deadly_pieces(after) == 1 << result.piece
+    with patch('projet_quarto.FORCED_EXTENSION', False):
+        searcher = projet_quarto.Searcher(projet_quarto.TranspositionTable(size_mb=1))
+        assert not projet_quarto.is_win_score(searcher.search(masks, remaining, piece, max_depth=3).score)
+        assert searcher.extensions == 0
+    # Sous la profondeur 3, ni la racine ni les autres nœuds ne prolongent
+    searcher = projet_quarto.Searcher(projet_quarto.TranspositionTable(size_mb=1))
+    searcher.search(masks, remaining, piece, max_depth=2)
+    assert searcher.extensions == 0
+    searcher._search_root(masks, remaining, piece, [(result.pos, result.piece)], 2)
+    assert searcher.extensions == 0
+
+def test_searcher_win_distance():
+    win = projet_quarto.WIN_SCORE
+
+    def exhaustive(masks, remaining, piece, depth, ply):
+        # Négamax complet, sans élagage : heuristique pour nous aux poses paires,
+        # profondeur gardée quand la pièce donnée est la seule sûre, aux nœuds de
+        # profondeur 3 au moins
+        free = projet_quarto.empty_squares(masks[0])
+        if any(projet_quarto.wins_with(masks, pos, piece) for pos in free):
+            return win - (ply + 1)
+        if not remaining or depth == 0:
+            score = projet_quarto.evaluate_masks(masks)
+            return -score if ply & 1 else score
+        best = None
+        for pos in free:
+            child = projet_quarto.place(masks, pos, piece)
+            safe = remaining & ~projet_quarto.deadly_pieces(child)
+            for give in projet_quarto.mask_to_codes(remaining):
+                child_depth = depth if safe == 1 << give and depth >= 3 else depth - 1
+                score = -exhaustive(child, remaining & ~(1 << give), give, child_depth, ply + 1)
+                best = score if best is None else max(best, score)
+        return best
+    rng = random.Random(3)
+    proven = 0
+    for empties in (4, 5, 5, 6, 6):
+        masks, remaining, piece = projet_quarto.random_position(empties, rng)
+        expected = exhaustive(masks, remaining, piece, 3, 0)
+        # La fenêtre d'aspiration ne change que le coût de la recherche
+        for window in (1, 10**6):
+            with patch('projet_quarto.ASPIRATION_WINDOW', window):
+                searcher = projet_quarto.Searcher(projet_quarto.TranspositionTable(size_mb=1))
+                result = searcher.search(masks, remaining, piece, max_depth=3)
+            # Un résultat prouvé avant la profondeur 3 vaut déjà le score complet
+            assert result.score == expected
+        proven += projet_quarto.is_win_score(expected)
+    assert proven
+    assert projet_quarto.is_win_score(-(win - 4)) and not projet_quarto.is_win_score(500)
+
+def test_searcher_deadline(empty_state):
+    masks, piece, remaining = projet_quarto.parse_state(empty_state)
+    searcher = projet_quarto.Searcher(projet_quarto.TranspositionTable(size_mb=1))
+    start = time.monotonic()
+    result = searcher.search(masks, remaining, piece, deadline=start + 0.2)
+    assert time.monotonic() - start < 0.5
+    assert result.pos is not None and result.piece is not None
+
+def test_searcher_immediate_win(nearly_winning_board):
+    masks = projet_quarto.board_to_masks(nearly_winning_board)
+    piece = projet_quarto.piece_to_code("SLFP")
+    remaining = projet_quarto.ALL_PIECES & ~projet_quarto.pieces_to_mask(["SDEC", "SLEP", "SDFC", "SLFP"])
+    result = projet_quarto.Searcher().search(masks, remaining, piece)
+    assert result.pos == 3
+    assert result.score == projet_quarto.WIN_SCORE - 1
+
+def test_find_best_move_without_piece(empty_board):
+    state = {"board": empty_board, "piece": None}
+    with patch('projet_quarto.TIMEOUT', 0.3):
+        assert projet_quarto.find_best_pos(state, time.time()) is None
+        assert projet_quarto.find_best_piece(state, time.time()) in projet_quarto.PIECE_NAMES
+
+def test_parallel_search_matches_sequential():
+    rng = random.Random(4)
+    projet_quarto.start_workers(2)
+    try:
+        for empties in (13, 10):
+            masks, remaining, piece = projet_quarto.random_position(empties, rng)
+            sequential = projet_quarto.Searcher(projet_quarto.TranspositionTable(size_mb=1))
+            expected = sequential.search(masks, remaining, piece, max_depth=2)
+            projet_quarto.stop_workers()
+            projet_quarto.start_workers(2)
+            result = projet_quarto._parallel_searcher.search(masks, remaining, piece, max_depth=2)
+            assert (result.depth, result.score) == (expected.depth, expected.score)
+            # Le coup choisi vaut bien ce score
+            board = projet_quarto.masks_to_board(masks)
+            rest = [projet_quarto.PIECE_NAMES[c] for c in projet_quarto.mask_to_codes(remaining) if c != result.piece]
+            board[result.pos] = projet_quarto.PIECE_NAMES[piece]
+            score = projet_quarto.minimax_cached(
+                tuple(board), tuple(rest), projet_quarto.PIECE_NAMES[result.piece], 1, False,
+                float('-inf'), float('inf')
+            )
+            assert score == expected.score
+    finally:
+        projet_quarto.stop_workers()
+
+def test_endgame_solver():
+    def exhaustive(masks, remaining, piece, ply):
+        # Négamax complet, sans élagage, avec la même convention de score
+        free = projet_quarto.empty_squares(masks[0])
+        if any(projet_quarto.wins_with(masks, pos, piece) for pos in free):
+            return projet_quarto.SOLVED_WIN - (ply + 1)
+        if not remaining:
+            return 0
+        return max(
+            -exhaustive(projet_quarto.place(masks, pos, piece), remaining & ~(1 << give), give, ply + 1)
+            for pos in free for give in projet_quarto.mask_to_codes(remaining)
+        )
+    rng = random.Random(1)
+    for empties in (3, 4, 5):
+        masks, remaining, piece = projet_quarto.random_position(empties, rng)
+        result = projet_quarto.EndgameSolver().solve(masks, remaining, piece)
+        assert result.exact
+        assert result.score == exhaustive(masks, remaining, piece, 0)
+        assert masks[0] >> result.pos & 1 == 0
+
+def test_solved_outcome():
+    assert projet_quarto.solved_outcome(projet_quarto.SOLVED_WIN - 3) == ("win", 3)
+    assert projet_quarto.solved_outcome(-(projet_quarto.SOLVED_WIN - 2)) == ("loss", 2)
+    assert projet_quarto.solved_outcome(0) == ("draw", None)
+
+def test_ponderer(sample_state):
+    masks, piece, remaining = projet_quarto.parse_state(sample_state)
+    ponderer = projet_quarto.Ponderer(projet_quarto.Searcher(projet_quarto.TranspositionTable(1)))
+    replies = ponderer.replies(masks, remaining, piece)
+    assert replies
+    for board, give, rest in replies:
+        assert board[0].bit_count() == 5 and not rest >> give & 1
+
+    # La réflexion s'arrête à l'annulation, réponses encore en attente ; on
+    # annule au début de la deuxième recherche, la première étant enregistrée
+    search = ponderer.searcher.search
+    second = threading.Event()
+    calls = []
+
+    def counted_search(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 2:
+            second.set()
+        return search(*args, **kwargs)
+    ponderer.searcher.search = counted_search
+    thread = threading.Thread(target=ponderer.ponder, args=(masks, remaining, piece), daemon=True)
+    thread.start()
+    assert second.wait(30)
+    ponderer.cancel()
+    thread.join(30)
+    assert not thread.is_alive()
+    assert len(ponderer.results) < len(replies)
+    assert ponderer.searcher.stop is None
+    del ponderer.searcher.search
+    # La réflexion ne change pas la génération de la table des recherches réelles
+    assert ponderer.searcher.tt.generation == 0
+    # Une réflexion programmée avant la dernière requête ne démarre pas
+    generation = ponderer.generation.value
+    results = ponderer.results
+    ponderer.cancel()
+    ponderer.ponder(masks, remaining, piece, generation)
+    assert ponderer.results is results
+
+    assert ponderer.take(replies[0]) is not None
+    assert ponderer.take(replies[0]) is None  # pas de réflexion depuis la dernière requête
+    assert (ponderer.hits, ponderer.misses) == (1, 0)
+    assert ponderer.hit_rate() == 1.0
+
+def test_ponderer_uses_worker_pool(sample_state):
+    masks, piece, remaining = projet_quarto.parse_state(sample_state)
+    ponderer = projet_quarto.Ponderer()
+    assert ponderer.searcher is projet_quarto.SEARCHER
+    projet_quarto.start_workers(2)
+    try:
+        searcher = projet_quarto._parallel_searcher
+        assert ponderer.searcher is searcher
+        moves = [(pos, give) for pos in range(16) for give in range(16)]
+        assert [searcher.worker_of(move) for move in moves] == [searcher.worker_of(move) for move in moves]
+        assert {searcher.worker_of(move) for move in moves} == {0, 1}
+        # L'arrêt de la réflexion parvient aux processus du pool : sans échéance
+        # utile, seule l'annulation vue par les processus termine la réflexion
+        with patch('projet_quarto.PONDERER', ponderer), patch('projet_quarto.PONDER_SLICE', 3600.0):
+            projet_quarto.stop_workers()
+            projet_quarto.start_workers(2)
+            thread = threading.Thread(target=ponderer.ponder, args=(masks, remaining, piece), daemon=True)
+            thread.start()
+            time.sleep(0.5)
+            ponderer.cancel()
+            thread.join(60)
+            assert not thread.is_alive()
+            assert projet_quarto._parallel_searcher.stop is None
+            # La recherche du coup joué n'est pas interrompue par l'événement levé
+            result = projet_quarto._parallel_searcher.search(masks, remaining, piece, time.monotonic() + 5, max_depth=2)
+            assert result.depth == 2
+    finally:
+        projet_quarto.stop_workers()
+
+def test_position_after(sample_state):
+    move = {"pos": 3, "piece": "SLEC"}
+    masks, remaining, give = projet_quarto.position_after(sample_state, move)
+    board = list(sample_state["board"])
+    board[3] = "BDEP"
+    assert masks == projet_quarto.board_to_masks(board)
+    assert give == projet_quarto.piece_to_code("SLEC") and not remaining >> give & 1
+    assert projet_quarto.position_after(sample_state, {"pos": 0, "piece": "SLEC"}) is None
+
+def test_monte_carlo_searcher(sample_state, nearly_winning_board):
+    masks, piece, remaining = projet_quarto.parse_state(sample_state)
+    mcts = projet_quarto.MonteCarloSearcher(seed=0)
+    result = mcts.search(masks, remaining, piece, max_playouts=400)
+    assert masks[0] >> result.pos & 1 == 0 and remaining >> result.piece & 1
+    assert mcts.root.visits == 400 and 0 <= mcts.win_rate() <= 1
+    # Une simulation se défait d'un coup
+    state = projet_quarto.SearchState(masks, remaining, piece)
+    state.play(result.pos)
+    state.give(result.piece)
+    key, mark = state.key, state.top
+    assert mcts._playout(state) in (0.0, 0.5, 1.0)
+    state.undo_to(mark)
+    assert state.key == key and state.masks() == projet_quarto.place(masks, result.pos, piece)
+    # Notre coup puis la réponse la plus explorée : l'arbre est repris
+    reply = max(mcts.best.children, key=lambda child: child.visits)
+    inherited = reply.visits
+    state.play(reply.move[0])
+    state.give(reply.move[1])
+    mcts.search(state.masks(), state.remaining, state.piece, max_playouts=100)
+    assert mcts.reused == inherited and mcts.root.visits == inherited + 100
+    # Victoire immédiate sans simulation
+    near = projet_quarto.board_to_masks(nearly_winning_board)
+    rest = projet_quarto.ALL_PIECES & ~projet_quarto.pieces_to_mask(["SDEC", "SLEP", "SDFC", "SLFP"])
+    assert projet_quarto.MonteCarloSearcher().search(near, rest, projet_quarto.piece_to_code("SLFP")).pos == 3
+
+def test_find_best_move_mcts(empty_state):
+    with patch('projet_quarto.MCTS_MIN_EMPTY', 16), patch('projet_quarto.TIMEOUT', 0.3), \
+            patch('projet_quarto.BOOK', None), patch('projet_quarto.PONDER', False):
+        projet_quarto._last_search = (None, None)
+        assert projet_quarto.find_best_pos(empty_state, time.time()) in range(16)
+        assert projet_quarto._last_report["source"] == "mcts"
+        # Arrêt par l'échéance : seul un relevé de l'horloge interrompt les simulations
+        playouts = projet_quarto._last_report["mcts"]["playouts"]
+        assert playouts > 0 and not playouts % projet_quarto.MonteCarloSearcher.CHECK_EVERY
+
+def test_opening_book(tmp_path, sample_state):
+    masks, piece, remaining = projet_quarto.parse_state(sample_state)
+    key, sym = projet_quarto.canonical_key(masks, remaining, piece, True)
+    move = projet_quarto.square_to_canonical(sym, 3) << 4 | projet_quarto.piece_to_canonical(sym, 12)
+    path = str(tmp_path / "book.bin")
+    projet_quarto.OpeningBook.write(path, {key: (move, 42), key ^ 1: (0, 0)})
+    book = projet_quarto.OpeningBook.open(path)
+    assert book.count == 2 and book.verify()
+    assert book.lookup(masks, remaining, piece) == (3, 12, 42)
+    assert book.lookup(projet_quarto.EMPTY_BOARD, projet_quarto.ALL_PIECES, None) is None
+    # find_best_move répond depuis le livre sans chercher
+    with patch('projet_quarto.BOOK', book):
+        assert projet_quarto.find_best_pos(sample_state, time.time()) == 3
+        assert projet_quarto.find_best_piece(sample_state, time.time()) == projet_quarto.PIECE_NAMES[12]
+    book.close()
+
+def test_opening_book_rejects_stale_file(tmp_path):
+    path = str(tmp_path / "book.bin")
+    projet_quarto.OpeningBook.write(path, {})
+    with patch('projet_quarto.EVAL_VERSION', projet_quarto.EVAL_VERSION + 1):
+        with patch('builtins.print') as mock_print:
+            assert projet_quarto.OpeningBook.open(path) is None
+            mock_print.assert_called()
+    assert projet_quarto.OpeningBook.open(str(tmp_path / "absent.bin")) is None
+    assert projet_quarto.OpeningBook.open(None) is None
+
+def test_endgame_tablebase(tmp_path):
+    rng = random.Random(8)
+    positions = [projet_quarto.random_position(4, rng) for _ in range(6)]
+    keys = [projet_quarto.canonical_key(*position, False, projet_quarto.BOARD_SYMMETRIES)[0] for position in positions]
+    entries = {key: n % 3 for n, key in enumerate(keys)}
+    path = str(tmp_path / "tablebase.bin")
+    projet_quarto.EndgameTablebase.write(path, 4, entries, [masks[0] for masks, _, _ in positions])
+    table = projet_quarto.EndgameTablebase.open(path)
+    assert table.count == len(entries) and table.max_empty == 4 and table.verify()
+    assert all(masks[0] in table.occupancies for masks, _, _ in positions)
+    for (masks, remaining, piece), key in zip(positions, keys):
+        assert table.lookup(masks, remaining, piece) == entries[key]
+        # Les 32 symétries du plateau partagent l'entrée
+        perm = projet_quarto.BOARD_SYMMETRIES[5]
+        board = [None] * 16
+        for sq in range(16):
+            if masks[0] >> sq & 1:
+                board[perm[sq]] = projet_quarto.PIECE_NAMES[projet_quarto.piece_at(masks, sq)]
+        assert table.lookup(projet_quarto.board_to_masks(board), remaining, piece) == entries[key]
+    assert table.lookup(*projet_quarto.random_position(5, rng)) is None
+    assert table.probe(max(keys) + 1) is None
+    table.close()
+    assert projet_quarto.tablebase_score(projet_quarto.TB_WIN, 2, 5) == projet_quarto.WIN_SCORE - 7
+    assert projet_quarto.tablebase_score(projet_quarto.TB_DRAW, 2, 5) == 0
+    with open(path, "r+b") as f:
+        f.write(b"XXXXXXXX")
+    with patch('builtins.print') as mock_print:
+        assert projet_quarto.EndgameTablebase.open(path) is None
+        mock_print.assert_called()
+    assert projet_quarto.EndgameTablebase.open(str(tmp_path / "absent.bin")) is None
+
 def test_find_best_piece(sample_state, empty_state):
     # Test finding best piece on sample board
     start_time = 0
@@ -220,6 +643,205 @@ def test_find_best_piece(sample_state, empty_state):
             piece = projet_quarto.find_best_piece(empty_state, start_time)
             assert piece in ["SLFC", "SDEP"]
 
+def test_piece_codes():
+    # Chaque pièce a un code unique sur 4 bits
+    codes = [projet_quarto.piece_to_code(p) for p in projet_quarto.PIECE_NAMES]
+    assert codes == list(range(16))
+    assert projet_quarto.code_to_piece(0) == "BDEC"
+    # L'ordre des lettres n'a pas d'importance
+    assert projet_quarto.piece_to_code("PCSL") == projet_quarto.piece_to_code("SLCP")
+
+def test_board_masks(sample_board, winning_board):
+    masks = projet_quarto.board_to_masks(sample_board)
+    assert projet_quarto.masks_to_board(masks) == sample_board
+    assert masks[0] == (1 << 0) | (1 << 5) | (1 << 10) | (1 << 15)
+    assert len(projet_quarto.LINES) == 10
+    assert projet_quarto.is_winning(projet_quarto.board_to_masks(winning_board))
+
+def test_wins_with(nearly_winning_board):
+    masks = projet_quarto.board_to_masks(nearly_winning_board)
+    for piece in projet_quarto.PIECE_NAMES:
+        code = projet_quarto.piece_to_code(piece)
+        for pos in projet_quarto.empty_squares(masks[0]):
+            board = list(nearly_winning_board)
+            board[pos] = piece
+            assert projet_quarto.wins_with(masks, pos, code) == projet_quarto.check_winner(board)
+
+def test_get_available_pieces_order():
+    state = {"board": [None] * 16, "piece": "SLFP"}
+    state["board"][3] = "BDEC"
+    pieces = projet_quarto.get_available_pieces(state)
+    assert pieces == [p for p in projet_quarto.PIECE_NAMES if p not in ("SLFP", "BDEC")]
+
+def test_transposition_table():
+    tt = projet_quarto.TranspositionTable(size_mb=1)
+    assert tt.lookup(12345) is None
+    tt.store(12345, 3, projet_quarto.EXACT, 42.0, 7)
+    assert tt.lookup(12345) == (3, projet_quarto.EXACT, 42.0, 7)
+    # Même seau : l'entrée la plus profonde reste dans le premier emplacement
+    other = 12345 + (tt.bucket_mask + 1)
+    tt.store(other, 1, projet_quarto.LOWER, 5.0, 2)
+    assert tt.lookup(12345)[0] == 3
+    assert tt.lookup(other) == (1, projet_quarto.LOWER, 5.0, 2)
+    third = 12345 + 2 * (tt.bucket_mask + 1)
+    tt.store(third, 0, projet_quarto.UPPER, -1.0, 0)
+    assert tt.lookup(other) is None
+    stats = tt.stats()
+    assert stats["evictions"] == 1
+    assert stats["collisions"] == 1
+    assert stats["size_bytes"] <= 2**20
+
+def test_transposition_table_file(tmp_path, sample_state):
+    path = str(tmp_path / "tt.bin")
+    masks, piece, remaining = projet_quarto.parse_state(sample_state)
+    tt = projet_quarto.TranspositionTable(size_mb=1, path=path)  # pas encore de sauvegarde
+    projet_quarto.Searcher(tt).search(masks, remaining, piece, max_depth=3)
+    tt.store(12345, 3, projet_quarto.EXACT, 42.0, 7)
+    tt.flush_if_due()
+    assert not os.path.exists(path)  # trop tôt
+    tt.flush_if_due(0)
+    # Au redémarrage, la recherche repart de la sauvegarde
+    reopened = projet_quarto.TranspositionTable(size_mb=1, path=path)
+    assert reopened.lookup(12345) == (3, projet_quarto.EXACT, 42.0, 7)
+    warm = projet_quarto.Searcher(reopened)
+    warm.search(masks, remaining, piece, max_depth=3)
+    assert warm.tt_cutoffs > 0
+    # La recherche n'écrit pas dans le fichier, seule la sauvegarde le remplace
+    reopened.store(54321, 1, projet_quarto.LOWER, 5.0, 2)
+    assert projet_quarto.TranspositionTable(size_mb=1, path=path).lookup(54321) is None
+    # Arrêt pendant une sauvegarde : le fichier temporaire inachevé ne compte pas
+    with open(path + ".tmp", "wb") as f:
+        f.write(b"QRTOTTBL")
+    assert projet_quarto.TranspositionTable(size_mb=1, path=path).lookup(12345) is not None
+
+def _worker_entry(key):
+    return projet_quarto.SEARCHER.tt.lookup(key), projet_quarto.SEARCHER.tt.path
+
+def test_workers_keep_saved_table(tmp_path):
+    path = str(tmp_path / "tt.bin")
+    saved = projet_quarto.TranspositionTable(size_mb=1, path=path)
+    saved.store(12345, 3, projet_quarto.EXACT, 42.0, 7)
+    saved.flush()
+    entry = (3, projet_quarto.EXACT, 42.0, 7)
+    searcher = projet_quarto.Searcher(projet_quarto.TranspositionTable(size_mb=1, path=path))
+    with patch('projet_quarto.SEARCHER', searcher):
+        # Processus de recherche parallèle : la table chargée n'est pas vidée,
+        # et seul le serveur garde le droit de l'écrire
+        pool = projet_quarto.start_workers(2)
+        try:
+            assert pool.map(_worker_entry, [12345] * 4, chunksize=1) == [(entry, None)] * 4
+        finally:
+            projet_quarto.stop_workers()
+        assert searcher.tt.path == path
+        # Processus qui n'a pas hérité de la table : il relit la sauvegarde
+        searcher.tt = projet_quarto.TranspositionTable(size_mb=1)
+        projet_quarto._init_worker(path, 1)
+        assert searcher.tt.lookup(12345) == entry and searcher.tt.path is None
+        projet_quarto._init_worker(None)
+        assert searcher.tt.lookup(12345) is None
+
+def test_worker_tables_are_saved(tmp_path, sample_state):
+    masks, piece, remaining = projet_quarto.parse_state(sample_state)
+    merged = projet_quarto.TranspositionTable(size_mb=1)
+    theirs = projet_quarto.TranspositionTable(size_mb=1)
+    merged.store(1, 2, projet_quarto.EXACT, 1.0, 1)
+    theirs.store(1, 5, projet_quarto.LOWER, 2.0, 3)
+    theirs.store(2, 1, projet_quarto.UPPER, 3.0, 4)
+    merged.store(3, 4, projet_quarto.EXACT, 4.0, 5)
+    theirs.store(3, 1, projet_quarto.EXACT, 0.0, 0)
+    assert merged.merge(theirs.entries()) == 2
+    assert [merged.lookup(key)[0] for key in (1, 2, 3)] == [5, 1, 4]  # la plus profonde reste
+    # La recherche se fait dans les processus du pool : la sauvegarde reprend leurs tables
+    path = str(tmp_path / "tt.bin")
+    searcher = projet_quarto.Searcher(projet_quarto.TranspositionTable(size_mb=1, path=path))
+    with patch('projet_quarto.SEARCHER', searcher):
+        projet_quarto.start_workers(2)
+        try:
+            projet_quarto._parallel_searcher.search(masks, remaining, piece, max_depth=3)
+            assert searcher.tt.stats()["used"] == 0
+            projet_quarto.save_table(0)
+        finally:
+            projet_quarto.stop_workers()
+    assert projet_quarto.TranspositionTable(size_mb=1, path=path).stats()["used"] > 0
+    # Moteurs préchauffés : chacun envoie sa table au serveur qui la sauvegarde
+    os.remove(path)
+    searcher = projet_quarto.Searcher(projet_quarto.TranspositionTable(size_mb=1, path=path))
+
+    async def play_and_save(pool):
+        await pool.submit({"request": "play", "state": sample_state, "errors": []}, time.time())
+        await pool.save_table(0)
+    with patch('projet_quarto.SEARCHER', searcher), patch('projet_quarto.TIMEOUT', 0.3), \
+            patch('projet_quarto.BOOK', None), patch('projet_quarto.TABLEBASE', None):
+        pool = projet_quarto.EnginePool(2, pin=False)
+        try:
+            asyncio.run(play_and_save(pool))
+        finally:
+            pool.close()
+    assert searcher.tt.stats()["used"] > 0
+    assert projet_quarto.TranspositionTable(size_mb=1, path=path).stats()["used"] == searcher.tt.stats()["used"]
+
+def test_transposition_table_rejects_stale_file(tmp_path):
+    path = str(tmp_path / "tt.bin")
+    tt = projet_quarto.TranspositionTable(size_mb=1, path=path)
+    tt.store(12345, 3, projet_quarto.EXACT, 42.0, 7)
+    tt.flush()
+    maps = []
+    real_mmap = projet_quarto.mmap.mmap
+
+    def tracked_mmap(*args, **kwargs):
+        maps.append(real_mmap(*args, **kwargs))
+        return maps[-1]
+    with patch('projet_quarto.EVAL_VERSION', projet_quarto.EVAL_VERSION + 1), \
+            patch('projet_quarto.mmap.mmap', side_effect=tracked_mmap):
+        assert projet_quarto.TranspositionTable(size_mb=1, path=path).lookup(12345) is None
+    assert len(maps) == 1 and maps[0].closed  # la projection refusée est fermée
+    assert projet_quarto.TranspositionTable(size_mb=2, path=path).lookup(12345) is None
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"\xff")
+    assert projet_quarto.TranspositionTable(size_mb=1, path=path).lookup(12345) is None
+
+def test_zobrist_incremental(sample_board):
+    masks = projet_quarto.board_to_masks(sample_board)
+    remaining = projet_quarto.pieces_to_mask(["SLEP", "SDFC"])
+    piece = projet_quarto.piece_to_code("BDEP")
+    key = projet_quarto.zobrist_hash(masks, remaining, piece, True)
+    child = key ^ projet_quarto.Z_MAXIMIZING ^ projet_quarto.Z_PIECE[piece] ^ projet_quarto.Z_SQUARE[3][piece]
+    assert child == projet_quarto.zobrist_hash(projet_quarto.place(masks, 3, piece), remaining, None, False)
+
+def test_board_symmetries():
+    assert len(projet_quarto.BOARD_SYMMETRIES) == 32
+    assert len(projet_quarto.EVAL_SYMMETRIES) == 16
+    lines = set(projet_quarto.LINES)
+    for perm in projet_quarto.BOARD_SYMMETRIES:
+        for line in projet_quarto.LINES:
+            image = sum(1 << perm[sq] for sq in range(16) if line >> sq & 1)
+            assert image in lines
+
+def test_canonical_form(sample_board):
+    # Rotation d'un quart de tour et complément de la taille : même forme canonique
+    rotated = [None] * 16
+    swap = {"B": "S", "S": "B"}
+    for sq, piece in enumerate(sample_board):
+        if piece is not None:
+            r, c = divmod(sq, 4)
+            rotated[c*4 + (3-r)] = swap[piece[0]] + piece[1:]
+    for board, piece in ((sample_board, "BDEP"), (rotated, "SDEP")):
+        masks = projet_quarto.board_to_masks(board)
+        remaining = projet_quarto.ALL_PIECES & ~projet_quarto.pieces_to_mask([p for p in board if p] + [piece])
+        form = projet_quarto.canonical_form(masks, remaining, projet_quarto.piece_to_code(piece))
+        key = projet_quarto.canonical_key(masks, remaining, projet_quarto.piece_to_code(piece), True)[0]
+        if board is sample_board:
+            expected = form[:2], key
+        else:
+            assert (form[:2], key) == expected
+    # Les coups se ramènent dans l'orientation réelle
+    sym = form[2]
+    for sq in range(16):
+        assert projet_quarto.square_from_canonical(sym, projet_quarto.square_to_canonical(sym, sq)) == sq
+    for code in range(16):
+        assert projet_quarto.piece_from_canonical(sym, projet_quarto.piece_to_canonical(sym, code)) == code
+
 # Network/integration tests
 def test_s_inscrire():
     with patch('socket.socket') as mock_socket:
@@ -239,81 +861,241 @@ def test_s_inscrire():
         assert sent_json["name"] == projet_quarto.NOM
         assert sent_json["matricules"] == projet_quarto.MATRICULES
 
-def test_main_ping():
-    with patch('socket.socket') as mock_socket:
-        # Setup mock socket
-        mock_server = MagicMock()
-        mock_client = MagicMock()
-        mock_socket.return_value.__enter__.return_value = mock_server
-        mock_server.accept.return_value = (mock_client, ('127.0.0.1', 1234))
-        mock_client.__enter__.return_value = mock_client
-        mock_client.recv.return_value = json.dumps({
-            "request": "ping"
-        }).encode()
-        
-        projet_quarto.main()
-        
-        # Check response
-        sent_data = mock_client.send.call_args[0][0].decode()
-        sent_json = json.loads(sent_data)
-        assert sent_json["response"] == "pong"
+async def _server_request(port, data):
+    """Envoie `data` (octets) au serveur puis lit sa réponse jusqu'à la fermeture"""
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(data)
+    writer.write_eof()  # fin du message : un document incomplet ne se complétera plus
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return json.loads(response.decode()) if response else None
 
-def test_main_play():
-    with patch('socket.socket') as mock_socket:
-        # Setup mock socket
-        mock_server = MagicMock()
-        mock_client = MagicMock()
-        mock_socket.return_value.__enter__.return_value = mock_server
-        mock_server.accept.return_value = (mock_client, ('127.0.0.1', 1234))
-        mock_client.__enter__.return_value = mock_client
-        
-        # Create a game state
-        state = {
-            "board": [None] * 16,
-            "piece": "BDEP",
-            "errors": []
-        }
-        mock_client.recv.return_value = json.dumps({
-            "request": "play",
-            "state": state,
-            "errors": []
-        }).encode()
-        
-        # Mock time to avoid actual waiting
-        with patch('time.time', return_value=0):
-            # Mock decision functions to speed up test
-            with patch('projet_quarto.find_best_pos', return_value=0):
-                with patch('projet_quarto.find_best_piece', return_value="SLFC"):
-                    projet_quarto.main()
-        
-        # Check response
-        sent_data = mock_client.send.call_args[0][0].decode()
-        sent_json = json.loads(sent_data)
-        assert sent_json["response"] == "move"
-        assert "move" in sent_json
-        assert sent_json["move"]["pos"] == 0
-        assert sent_json["move"]["piece"] == "SLFC"
+def _serve(*messages):
+    """Réponses d'un GameServer local aux messages donnés, un par connexion"""
+    async def scenario():
+        server = await projet_quarto.GameServer(port=0, host='127.0.0.1').start()
+        try:
+            return [await _server_request(server.port, message) for message in messages]
+        finally:
+            await server.close()
+    return asyncio.run(scenario())
 
-def test_main_exception_handling():
-    # Test socket timeout
-    with patch('socket.socket') as mock_socket:
-        mock_server = MagicMock()
-        mock_socket.return_value.__enter__.return_value = mock_server
-        mock_server.accept.side_effect = socket.timeout
-        
-        # Should not raise exception
-        projet_quarto.main()
-    
-    # Test generic exception
-    with patch('socket.socket') as mock_socket:
-        mock_server = MagicMock()
-        mock_socket.return_value.__enter__.return_value = mock_server
-        mock_server.accept.side_effect = Exception("Test exception")
-        
-        # Should not raise exception, but print error
-        with patch('builtins.print') as mock_print:
-            projet_quarto.main()
+def test_server_ping():
+    assert _serve(json.dumps({"request": "ping"}).encode()) == [{"response": "pong"}]
+
+def test_server_play():
+    # Create a game state
+    state = {
+        "board": [None] * 16,
+        "piece": "BDEP",
+        "errors": []
+    }
+    message = json.dumps({"request": "play", "state": state, "errors": []}).encode()
+    # Mock decision functions to speed up test
+    with patch('projet_quarto.find_best_pos', return_value=0), \
+            patch('projet_quarto.find_best_piece', return_value="SLFC"), patch('projet_quarto.PONDER', False):
+        sent_json, = _serve(message)
+    assert sent_json["response"] == "move"
+    assert "move" in sent_json
+    assert sent_json["move"]["pos"] == 0
+    assert sent_json["move"]["piece"] == "SLFC"
+
+def test_server_exception_handling():
+    # Message invalide ou requête inconnue : pas de réponse, le serveur continue
+    with patch('builtins.print') as mock_print:
+        responses = _serve(b"{not json", json.dumps({"request": "unknown"}).encode(),
+                           json.dumps({"request": "ping"}).encode())
+        mock_print.assert_called()
+    assert responses == [None, None, {"response": "pong"}]
+
+def test_play_log_record(tmp_path, monkeypatch, sample_state):
+    log = tmp_path / "play.log"
+    monkeypatch.setattr(projet_quarto, "TIMEOUT", 0.3)
+    monkeypatch.setattr(projet_quarto, "LOG_PATH", str(log))
+    monkeypatch.setattr(projet_quarto, "PROFILE_DIR", str(tmp_path / "profiles"))
+    monkeypatch.setattr(projet_quarto, "BOOK", None)
+    monkeypatch.setattr(projet_quarto, "_last_search", (None, None))
+    states = []
+    for pos, piece in ((3, "SLEC"), (6, "BLFC"), (9, "SDEP")):
+        state = copy.deepcopy(sample_state)
+        state["board"][pos] = state["piece"]
+        state["piece"] = piece
+        states.append(state)
+    projet_quarto.handle_request({"request": "play", "state": states[0], "errors": []}, time.time())
+    projet_quarto.profile_next("cprofile")
+    projet_quarto.handle_request({"request": "play", "state": states[1], "errors": []}, time.time())
+    projet_quarto.profile_next("sample")
+    projet_quarto.handle_request({"request": "play", "state": states[2], "errors": []}, time.time())
+    records = [json.loads(line, parse_constant=pytest.fail) for line in log.read_text().splitlines()]
+    assert len(records) == 3
+    record = records[0]
+    assert record["event"] == "play" and record["source"] == "search"
+    assert record["depth"] >= 1 and record["nodes"] > 0
+    assert record["search"]["cutoffs"]["max"] + record["search"]["cutoffs"]["min"] > 0
+    assert record["search"]["tt"]["hits"] + record["search"]["tt"]["misses"] > 0
+    assert record["search"]["evaluations"] > 0 and record["search"]["root_ms"]
+    assert "profile" not in record
+    # Un profil pour la seule requête armée
+    pstats = pytest.importorskip("pstats")
+    assert pstats.Stats(records[1]["profile"]).total_calls > 0
+    assert open(records[2]["profile"]).read().strip()
+    assert records[2]["request"] == records[1]["request"] + 1
+
+def test_play_log_record_with_workers(tmp_path, monkeypatch, sample_state):
+    log = tmp_path / "play.log"
+    monkeypatch.setattr(projet_quarto, "TIMEOUT", 0.5)
+    monkeypatch.setattr(projet_quarto, "LOG_PATH", str(log))
+    monkeypatch.setattr(projet_quarto, "BOOK", None)
+    monkeypatch.setattr(projet_quarto, "TABLEBASE", None)
+    monkeypatch.setattr(projet_quarto, "PONDER", False)
+    monkeypatch.setattr(projet_quarto, "_last_search", (None, None))
+    # Les compteurs viennent des processus du pool, où se fait la recherche
+    projet_quarto.start_workers(2)
+    try:
+        projet_quarto.handle_request({"request": "play", "state": sample_state, "errors": []}, time.time())
+    finally:
+        projet_quarto.stop_workers()
+    record = json.loads(log.read_text().splitlines()[0], parse_constant=pytest.fail)
+    search = record["search"]
+    assert record["source"] == "search" and record["nodes"] == search["nodes"] > 0
+    assert search["cutoffs"]["max"] + search["cutoffs"]["min"] + search["cutoffs"]["tt"] > 0
+    assert search["tt"]["hits"] + search["tt"]["misses"] > 0
+    assert search["evaluations"] > 0
+    moves = {f"{pos}/{projet_quarto.PIECE_NAMES[give]}" for pos in range(16) for give in range(16)}
+    assert search["root_ms"] and set(search["root_ms"]) <= moves
+
+def test_game_server(sample_state, tmp_path):
+    searching, release = threading.Event(), threading.Event()
+
+    def slow_pos(state, start_time):
+        # La recherche ne finit qu'une fois le ping servi
+        searching.set()
+        release.wait(10)
+        time.sleep(0.3)
+        return 0
+
+    async def request(port, message, chunks=1):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        data = json.dumps(message).encode()
+        size = len(data) // chunks + 1
+        for i in range(0, len(data), size):
+            writer.write(data[i:i+size])
+            await writer.drain()
+            await asyncio.sleep(0.01)
+        response = json.loads((await reader.read()).decode())
+        writer.close()
+        return response
+
+    async def scenario():
+        server = await projet_quarto.GameServer(port=0, host='127.0.0.1').start()
+        try:
+            # Requête découpée en plusieurs paquets, ping pendant la recherche
+            play = asyncio.create_task(request(server.port, {"request": "play", "state": sample_state, "errors": []}, 4))
+            await asyncio.get_running_loop().run_in_executor(None, searching.wait, 10)
+            pong = await request(server.port, {"request": "ping"})
+            answered_during_search = not play.done()
+            release.set()
+            move = await play
+        finally:
+            release.set()
+            await server.close()
+        return pong, answered_during_search, move, server.latency_summary()
+
+    capture_path = str(tmp_path / "capture.jsonl")
+    with patch('projet_quarto.find_best_pos', side_effect=slow_pos), patch('projet_quarto.CAPTURE_PATH', capture_path):
+        with patch('projet_quarto.find_best_piece', return_value="SLFC"):
+            pong, answered_during_search, move, summary = asyncio.run(scenario())
+    assert pong == {"response": "pong"}
+    assert answered_during_search
+    assert move["response"] == "move"
+    assert move["move"] == {"pos": 0, "piece": "SLFC"}
+    assert summary["ping"][0] == 1 and summary["play"][0] == 1
+    assert summary["play"][2] >= 0.3
+    with open(capture_path) as f:
+        captured = [json.loads(line) for line in f]
+    assert [record["req"]["request"] for record in captured] == ["ping", "play"]
+    assert captured[1]["resp"] == move and captured[1]["ms"] >= 300
+
+def test_engine_pool(sample_state):
+    def slow_pos(state, start_time):
+        time.sleep(0.3)
+        return next(pos for pos, name in enumerate(state["board"]) if name is None)
+
+    async def request(port, message):
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(json.dumps(message).encode())
+        await writer.drain()
+        response = json.loads((await reader.read()).decode())
+        writer.close()
+        return response
+
+    first_empty = sample_state["board"].index(None)
+    later = dict(sample_state, board=list(sample_state["board"]))
+    later["board"][first_empty] = "BDEP"
+
+    async def scenario(pool):
+        server = await projet_quarto.GameServer(port=0, host='127.0.0.1', pool=pool).start()
+        play = {"request": "play", "state": sample_state, "errors": []}
+        moves = await asyncio.gather(*(request(server.port, play) for _ in range(3)))
+        concurrent = pool.stats()
+        # Même partie, un coup plus loin : servie par un moteur qui la connaît
+        await request(server.port, {"request": "play", "state": later, "errors": []})
+        for worker in pool.workers:
+            worker.process.kill()
+            worker.process.join()
+        for _ in pool.workers:
+            with pytest.raises(RuntimeError):
+                await pool.submit(play, time.time())
+        # Remplacés hors fork (le serveur a des fils) : sans les substituts du
+        # test, on vérifie seulement qu'ils répondent
+        after_restart = [worker.call({"request": "ping"}, time.time()) for worker in pool.workers]
+        return moves, concurrent, pool.stats(), after_restart
+
+    with patch('projet_quarto.find_best_pos', side_effect=slow_pos), \
+            patch('projet_quarto.find_best_piece', return_value="SLFC"):
+        pool = projet_quarto.EnginePool(2, pin=True)
+        try:
+            moves, concurrent, stats, after_restart = asyncio.run(scenario(pool))
+        finally:
+            pool.close()
+    assert all(move["move"] == {"pos": first_empty, "piece": "SLFC"} for move in moves)
+    assert after_restart == [{"response": "pong"}] * 2
+    assert all(worker.context.get_start_method() != "fork" for worker in pool.workers)
+    # Trois parties sur deux moteurs : deux en parallèle, la troisième attend son tour
+    assert concurrent["max_busy"] == 2 and concurrent["max_waiting"] == 1
+    assert sorted(worker["served"] for worker in concurrent["workers"]) == [1, 2]
+    assert stats["waiting"] == 0 and stats["mean_wait_ms"] > 0
+    assert stats["sticky"] >= 1
+    assert sum(worker["served"] for worker in stats["workers"]) == 6
+    assert all(worker["cpu"] in os.sched_getaffinity(0) for worker in stats["workers"])
+    assert len({worker["pid"] for worker in stats["workers"]}) == 2
+
+def test_engine_pool_drops_corrupt_tables(tmp_path):
+    path = str(tmp_path / "book.bin")
+    projet_quarto.OpeningBook.write(path, {1: (0, 0), 2: (17, 5)})
+    with open(path, "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        f.write(b"\xff")
+    book = projet_quarto.OpeningBook.open(path)
+    assert book is not None and not book.verify()
+    with patch('projet_quarto.BOOK', book), patch('projet_quarto.TABLEBASE', None), \
+            patch('builtins.print') as mock_print:
+        pool = projet_quarto.EnginePool(1, pin=False)
+        try:
+            # Refusé avant le fork
+            assert projet_quarto.BOOK is None and book._map.closed
             mock_print.assert_called()
+        finally:
+            pool.close()
+    # Un moteur redémarré, qui rouvre les fichiers, écarte lui aussi la table refusée
+    reopened = projet_quarto.OpeningBook.open(path)
+    conn, child = projet_quarto.multiprocessing.Pipe()
+    with patch('projet_quarto.BOOK', reopened), patch('projet_quarto._parallel_searcher', None):
+        conn.send(None)
+        projet_quarto._engine_main(child, None, book=False)
+        assert projet_quarto.BOOK is None and reopened._map.closed
+    assert conn.recv() > 0  # prêt après son préchauffage
 
 # Run the tests with coverage:
 # python -m pytest test_projet_quarto.py -v --cov=projet_quarto --cov-report term-missing
@@ -0,0 +1,68 @@
+import json
+import sys
+import os
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import projet_quarto
+import replay_quarto
+
+STATE = {"board": ["BDEC", None, None, None, None, "BLEP", None, None, None, None, "SDFP", None, None, None, None,
+                   "SLFC"], "piece": "BDEP"}
+
+def write_capture(path):
+    records = [
+        {"t": 100.0, "ms": 0.1, "req": {"request": "ping"}, "resp": {"response": "pong"}},
+        {"t": 100.2, "ms": 250.0, "req": {"request": "play", "state": STATE, "errors": []},
+         "resp": {"response": "move", "move": {"pos": 1, "piece": "SLEC"}}},
+        {"t": 100.5, "ms": 1.0, "req": {"request": "subscribe"}, "resp": None},
+    ]
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        f.write('{"t": 101.0, "ms": 3, "req": {"requ')
+
+def test_read_capture(tmp_path):
+    path = str(tmp_path / "capture.jsonl")
+    write_capture(path)
+    records = list(replay_quarto.read_capture(path))
+    assert [number for number, _ in records] == [1, 2]
+    assert records[1][1]["req"]["state"] == STATE
+
+def test_replay_direct(tmp_path):
+    path = str(tmp_path / "capture.jsonl")
+    write_capture(path)
+    with patch('projet_quarto.TIMEOUT', 0.3):
+        results = replay_quarto.replay_direct(replay_quarto.read_capture(path))
+        summary = replay_quarto.summarize(results, share=0.8)
+    assert [result["request"] for result in results] == ["ping", "play"]
+    play = results[1]
+    assert STATE["board"][play["move"]["pos"]] is None
+    assert play["recorded_ms"] == 250.0 and play["recorded_move"] == {"pos": 1, "piece": "SLEC"}
+    assert summary["requests"] == 2 and summary["plays"] == 1
+    assert summary["latency_ms"]["p50"] == play["ms"] == summary["latency_ms"]["max"]
+    assert summary["recorded_ms"]["p99"] == 250.0
+    assert summary["budget_ms"] == 240.0
+    assert summary["changed_moves"] == (play["move"] != play["recorded_move"])
+
+def test_summarize_flags_slow_moves():
+    results = [{"line": n, "request": "play", "ms": ms, "recorded_ms": None, "move": None, "recorded_move": None,
+                "state": STATE} for n, ms in enumerate([100.0, 200.0, 900.0], 1)]
+    summary = replay_quarto.summarize(results, share=0.5, timeout=1.0)
+    assert [flagged["line"] for flagged in summary["over_budget"]] == [3]
+    assert summary["latency_ms"] == {"p50": 200.0, "p95": 900.0, "p99": 900.0, "max": 900.0}
+    assert summary["recorded_ms"]["p50"] is None and summary["changed_moves"] == 0
+
+def test_main_server(tmp_path):
+    path = str(tmp_path / "capture.jsonl")
+    write_capture(path)
+    output = str(tmp_path / "summary.json")
+    with patch('projet_quarto.PONDER', False), patch('projet_quarto.TIMEOUT', projet_quarto.TIMEOUT), \
+            patch('projet_quarto.WORKERS', projet_quarto.WORKERS):
+        code = replay_quarto.main([path, "--server", "--pace", "--set", "TIMEOUT=0.3", "--set", "WORKERS=1",
+                                   "--share", "100", "--output", output])
+        assert projet_quarto.TIMEOUT == 0.3
+    assert code == 0
+    with open(output) as f:
+        summary = json.load(f)
+    assert summary["requests"] == 2 and summary["plays"] == 1 and summary["over_budget"] == []
@@ -0,0 +1,131 @@
+import json
+import os
+import random
+import sys
+import time
+from unittest.mock import patch
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import projet_quarto
+import tablebase_quarto
+
+def exact(masks, remaining, piece):
+    score = projet_quarto.EndgameSolver(projet_quarto.TranspositionTable(1)).solve(masks, remaining, piece).score
+    return projet_quarto.TB_WIN if score > 0 else projet_quarto.TB_LOSS if score < 0 else projet_quarto.TB_DRAW
+
+def test_solve_subtree():
+    for masks, remaining, piece in tablebase_quarto.random_positions(8, 5, seed=1):
+        results, occupancies = {}, set()
+        result = tablebase_quarto.solve_subtree(projet_quarto.SearchState(masks, remaining, piece), results,
+                                                occupancies)
+        assert result == exact(masks, remaining, piece)
+        assert masks[0] in occupancies and all(occ & masks[0] == masks[0] for occ in occupancies)
+        key = projet_quarto.canonical_key(masks, remaining, piece, False, projet_quarto.BOARD_SYMMETRIES)[0]
+        assert results[key] == result and len(results) > 1
+
+def test_generate_resumes(tmp_path):
+    positions = tablebase_quarto.random_positions(12, 5, seed=2)
+    work, output = str(tmp_path / "work"), str(tmp_path / "tablebase.bin")
+    with patch('tablebase_quarto.BATCH', 5):
+        count = tablebase_quarto.generate(positions, 5, work, output, workers=2)
+        parts = sorted(name for name in os.listdir(work) if name.startswith("part-"))
+        assert len(parts) == 3
+        with open(output, "rb") as f:
+            first = f.read()
+        # Reprise : seul le lot manquant est recalculé
+        os.remove(os.path.join(work, parts[1]))
+        with patch('tablebase_quarto._solve_batch', wraps=tablebase_quarto._solve_batch) as solve:
+            assert tablebase_quarto.generate(positions, 5, work, output, workers=1) == count
+            assert solve.call_count == 1
+        with open(output, "rb") as f:
+            assert f.read() == first
+        with pytest.raises(ValueError):
+            tablebase_quarto.generate(positions[:6], 5, work, output, workers=1)
+        with pytest.raises(ValueError):
+            tablebase_quarto.generate(tablebase_quarto.random_positions(12, 5, seed=9), 5, work, output, workers=1)
+    table = projet_quarto.EndgameTablebase.open(output)
+    assert table.count == count and table.verify()
+    for masks, remaining, piece in positions:
+        assert table.lookup(masks, remaining, piece) == exact(masks, remaining, piece)
+    table.close()
+
+def test_recorded_positions(tmp_path):
+    (masks, remaining, piece), = tablebase_quarto.random_positions(1, 4, seed=3)
+    board = [projet_quarto.PIECE_NAMES[projet_quarto.piece_at(masks, sq)] if masks[0] >> sq & 1 else None
+             for sq in range(16)]
+    state = {"board": board, "piece": projet_quarto.PIECE_NAMES[piece]}
+    path = str(tmp_path / "capture.jsonl")
+    with open(path, "w") as f:
+        f.write(json.dumps({"t": 1.0, "ms": 2.0, "req": {"request": "play", "state": state}, "resp": None}) + "\n")
+        f.write(json.dumps(state) + "\n")  # même position
+        f.write(json.dumps({"board": [None] * 16, "piece": "BDEC"}) + "\n")  # trop de cases vides
+        f.write("{tronqué\n")
+    assert tablebase_quarto.recorded_positions(path, 4) == [(masks, remaining, piece)]
+    assert tablebase_quarto.recorded_positions(path, 3) == []
+
+def test_search_probes_tablebase(tmp_path):
+    positions = tablebase_quarto.random_positions(6, 6, seed=4)
+    output = str(tmp_path / "tablebase.bin")
+    tablebase_quarto.generate(positions, 6, str(tmp_path / "work"), output, workers=1)
+    start = time.perf_counter()
+    table = projet_quarto.EndgameTablebase.open(output)
+    assert time.perf_counter() - start < 0.05
+    try:
+        for masks, remaining, piece in positions:
+            expected = exact(masks, remaining, piece)
+            with patch('projet_quarto.TABLEBASE', table):
+                searcher = projet_quarto.Searcher(projet_quarto.TranspositionTable(1))
+                result = searcher.search(masks, remaining, piece, max_depth=2)
+                assert searcher.tablebase_hits > 0
+                assert (result.score > 0) - (result.score < 0) == expected - projet_quarto.TB_DRAW
+                pos, give, outcome = table.best_move(masks, remaining, piece)
+                assert outcome == expected and not masks[0] >> pos & 1 and remaining >> give & 1
+                # Même perdant, on ne donne pas une pièce gagnante s'il en reste une sûre
+                child = projet_quarto.place(masks, pos, piece)
+                assert not projet_quarto.deadly_pieces(child) >> give & 1 or not any(
+                    remaining & ~projet_quarto.deadly_pieces(projet_quarto.place(masks, sq, piece))
+                    for sq in projet_quarto.empty_squares(masks[0]))
+        # Le solveur lit la table sous la racine : même résultat, distance majorée
+        for masks, remaining, piece in positions:
+            plain = projet_quarto.EndgameSolver(projet_quarto.TranspositionTable(1))
+            expected = projet_quarto.solved_outcome(plain.solve(masks, remaining, piece).score)
+            with patch('projet_quarto.TABLEBASE', table):
+                solver = projet_quarto.EndgameSolver(projet_quarto.TranspositionTable(1))
+                outcome = projet_quarto.solved_outcome(solver.solve(masks, remaining, piece).score)
+            assert solver.tablebase_hits > 0 and solver.nodes < plain.nodes
+            assert outcome[0] == expected[0]
+            if outcome[0] != "draw":
+                assert outcome[1] >= expected[1] and outcome[1] % 2 == expected[1] % 2
+        # Occupation absente de la table : aucune clé canonique calculée pour elle
+        other = projet_quarto.random_position(9, random.Random(4))
+        assert other[0][0] not in table.occupancies
+        with patch('projet_quarto.TABLEBASE', table), \
+                patch('projet_quarto.canonical_key', wraps=projet_quarto.canonical_key) as key:
+            searcher = projet_quarto.Searcher(projet_quarto.TranspositionTable(1))
+            searcher.search(*other, max_depth=2)
+            assert key.call_count == 0 and searcher.tablebase_hits == 0
+        # La table ne répond qu'aux victoires ; les défaites vont au solveur
+        for masks, remaining, piece in positions:
+            board = [projet_quarto.PIECE_NAMES[projet_quarto.piece_at(masks, sq)] if masks[0] >> sq & 1 else None
+                     for sq in range(16)]
+            state = {"board": board, "piece": projet_quarto.PIECE_NAMES[piece]}
+            pos, _, outcome = table.best_move(masks, remaining, piece)
+            with patch('projet_quarto.TABLEBASE', table), patch('projet_quarto._last_search', (None, None)):
+                chosen = projet_quarto.find_best_pos(state, time.time())
+                if outcome == projet_quarto.TB_WIN:
+                    assert chosen == pos and projet_quarto._last_report["source"] == "tablebase"
+                else:
+                    assert projet_quarto._last_report["source"] == "solver"
+                    assert projet_quarto._last_report["solver"]["tablebase_hits"] > 0
+    finally:
+        table.close()
+
+def test_main(tmp_path):
+    output = str(tmp_path / "tablebase.bin")
+    tablebase_quarto.main(["--empty", "4", "--positions", "10", "--workers", "1",
+                           "--work", str(tmp_path / "work"), "--output", output])
+    table = projet_quarto.EndgameTablebase.open(output)
+    assert table.max_empty == 4 and table.count > 0
+    table.close()
@@ -0,0 +1,88 @@
+import json
+import random
+import sys
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import projet_quarto
+import tune_quarto
+
+def test_self_play():
+    rows = tune_quarto.self_play(random.Random(1))
+    assert rows
+    for row in rows:
+        board, piece, result = row[:16], row[16], row[17]
+        assert piece not in board and result in (0, 1, 2)
+        masks = projet_quarto.board_to_masks(
+            [projet_quarto.PIECE_NAMES[code] if code != projet_quarto.EMPTY_CODE else None for code in board])
+        assert not projet_quarto.deadly_pieces(masks) >> piece & 1
+    # Les positions d'une même partie alternent de joueur au trait
+    decisive = [row[17] for row in rows if row[17] != 1]
+    assert all(a != b for a, b in zip(decisive, decisive[1:]))
+
+def test_self_play_solved_labels():
+    rng = random.Random(3)
+    solver = projet_quarto.EndgameSolver(projet_quarto.TranspositionTable(1))
+    rows = tune_quarto.self_play(rng, solver, solve_empty=5)
+    for row in rows:
+        if row[:16].count(projet_quarto.EMPTY_CODE) <= 5:
+            board = [projet_quarto.PIECE_NAMES[code] if code != projet_quarto.EMPTY_CODE else None for code in row[:16]]
+            state = {"board": board, "piece": projet_quarto.PIECE_NAMES[row[16]]}
+            masks, piece, remaining = projet_quarto.parse_state(state)
+            score = projet_quarto.EndgameSolver(projet_quarto.TranspositionTable(1)).solve(masks, remaining, piece).score
+            assert row[17] == (2 if score > 0 else 0 if score < 0 else 1)
+
+def test_generate(tmp_path):
+    data = tune_quarto.generate(30, seed=4, workers=1)
+    assert data.dtype == np.uint8 and data.shape[1] == tune_quarto.COLUMNS and len(data) > 30
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(tune_quarto, "GAMES_PER_CHUNK", 10)
+        split = tune_quarto.generate(30, seed=4, workers=2)
+        assert (split == tune_quarto.generate(30, seed=4, workers=1)).all()
+    path = str(tmp_path / "positions.npy")
+    np.save(path, data)
+    assert (tune_quarto.load_positions([path, path]) == np.concatenate([data, data])).all()
+    np.save(path, data[:, :16])
+    with pytest.raises(ValueError):
+        tune_quarto.load_positions([path])
+
+def test_position_features():
+    data = tune_quarto.generate(20, seed=5, workers=1)
+    features, results = tune_quarto.position_features(data)
+    weights = projet_quarto.eval_weights()
+    scores = features @ np.array([weights[name] for name in tune_quarto.WEIGHT_NAMES])
+    assert (scores == projet_quarto.batch_evaluate(np.ascontiguousarray(data[:, :16]))).all()
+    assert set(results) <= {0.0, 0.5, 1.0}
+
+def test_fit(tmp_path):
+    # Positions synthétiques : le résultat suit le terme des cases centrales
+    rng = np.random.default_rng(0)
+    data = tune_quarto.generate(400, seed=6, workers=1)
+    features, _ = tune_quarto.position_features(data)
+    probability = 1.0 / (1.0 + np.exp(-(features[:, 2] - 2.0)))
+    data = np.array(data)
+    data[:, 17] = 2 * (rng.random(len(data)) >= probability)  # résultat du joueur au trait
+    result = tune_quarto.fit(data)
+    stats = result["fit"]
+    assert stats["loss_after"] < stats["loss_before"]
+    assert result["weights"]["center"] > projet_quarto.DEFAULT_WEIGHTS["center"]
+    path = str(tmp_path / "weights.json")
+    with open(path, "w") as f:
+        json.dump(result, f)
+    try:
+        assert projet_quarto.load_eval_weights(path) == result["weights"]
+    finally:
+        projet_quarto.set_eval_weights(projet_quarto.DEFAULT_WEIGHTS)
+
+def test_main(tmp_path):
+    positions = str(tmp_path / "positions.npy")
+    tune_quarto.main(["generate", positions, "--games", "50", "--workers", "1"])
+    output = str(tmp_path / "weights.json")
+    tune_quarto.main(["fit", positions, "--output", output])
+    with open(output) as f:
+        result = json.load(f)
+    assert result["version"] == projet_quarto.BASE_EVAL_VERSION
+    assert result["fit"]["positions"] == len(np.load(positions))
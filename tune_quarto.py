@@ -0,0 +1,241 @@
+"""Ajustement hors ligne des poids de evaluate_board (méthode de Texel).
+
+Des parties jouées au hasard (gain immédiat joué, pièces perdantes évitées)
+fournissent des positions étiquetées par le résultat de la partie, ou par la
+résolution exacte quand il reste au plus `--solve-empty` cases vides. Les
+positions sont stockées dans un tableau NumPy (.npy, 18 octets par position :
+16 codes de case, pièce à placer, résultat pour le joueur au trait). Les
+termes de l'évaluation sont calculés une fois pour toutes par batch_features :
+un jeu de poids s'évalue alors par un produit matriciel sur tout le lot. On
+ajuste d'abord l'échelle K de la sigmoïde aux poids actuels, puis les poids
+entiers par recherche locale, en minimisant l'erreur quadratique entre le
+résultat et sigmoïde(K * évaluation + décalage) ; l'échelle des scores est
+conservée. Les poids écrits sont chargés par projet_quarto au démarrage.
+
+    python tune_quarto.py generate positions.npy --games 200000 --solve-empty 6 --workers 8
+    python tune_quarto.py fit positions.npy --output quarto_weights.json
+"""
+import argparse
+import json
+import os
+import random
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+import projet_quarto as pq
+
+WEIGHT_NAMES = ("shared", "danger", "center")  # dans l'ordre des colonnes de batch_features
+SIGNS = np.array([1, -1, 1])  # sens de chaque terme dans le score
+COLUMNS = 18  # 16 cases, pièce à placer, résultat
+GAMES_PER_CHUNK = 500
+FIT_CHUNK = 1 << 20  # positions par appel à batch_features
+STEPS = (8, 4, 2, 1)  # pas successifs de la recherche locale
+
+
+def self_play(rng, solver=None, solve_empty=0):
+    """Joue une partie au hasard ; retourne ses positions, une liste par position :
+    codes des cases, pièce à placer, résultat (0 : défaite, 1 : nulle, 2 : victoire
+    du joueur au trait).
+
+    Les positions où la pièce reçue gagne tout de suite sont écartées : elles
+    ne disent rien de l'heuristique.
+    """
+    state = pq.SearchState(pq.EMPTY_BOARD, pq.ALL_PIECES, None)
+    state.give(rng.choice(pq.mask_to_codes(pq.ALL_PIECES)))
+    positions = []  # (ligne sans résultat, joueur au trait, résultat exact ou None)
+    turn = 0
+    winner = None
+    while True:
+        piece = state.piece
+        if state.deadly_mask >> piece & 1:
+            winner = turn
+            break
+        exact = None
+        if solver is not None and 16 - state.occ.bit_count() <= solve_empty:
+            score = solver.solve(state.masks(), state.remaining, piece).score
+            exact = 2 if score > 0 else 0 if score < 0 else 1
+        positions.append((state.board + [piece], turn, exact))
+        occ = state.occ
+        state.play(rng.choice([sq for sq in range(16) if not occ >> sq & 1]))
+        if not state.remaining:
+            break  # plateau plein sans victoire
+        safe = state.safe()
+        if not safe:
+            winner = turn ^ 1  # toute pièce fait gagner l'adversaire
+            break
+        state.give(rng.choice(pq.mask_to_codes(safe)))
+        turn ^= 1
+    return [
+        row + [exact if exact is not None else 1 if winner is None else 2 if winner == player else 0]
+        for row, player, exact in positions
+    ]
+
+
+def _play_chunk(job):
+    seed, games, solve_empty = job
+    rng = random.Random(seed)
+    solver = pq.EndgameSolver(pq.TranspositionTable(pq.ENDGAME_TT_SIZE_MB)) if solve_empty else None
+    rows = []
+    for _ in range(games):
+        rows += self_play(rng, solver, solve_empty)
+    return np.array(rows, dtype=np.uint8).reshape(-1, COLUMNS)
+
+
+def generate(games, seed=0, solve_empty=0, workers=1):
+    """Positions étiquetées de `games` parties, tableau (N, 18) d'octets
+    (même résultat quel que soit le nombre de processus)"""
+    jobs = [(seed * 1000003 + n, min(GAMES_PER_CHUNK, games - start), solve_empty)
+            for n, start in enumerate(range(0, games, GAMES_PER_CHUNK))]
+    if workers <= 1:
+        chunks = list(map(_play_chunk, jobs))
+    else:
+        with Pool(workers) as pool:
+            chunks = pool.map(_play_chunk, jobs)
+    return np.concatenate(chunks) if chunks else np.zeros((0, COLUMNS), dtype=np.uint8)
+
+
+def load_positions(paths):
+    """Concatène des fichiers de positions (.npy lus par mmap)"""
+    arrays = []
+    for path in paths:
+        data = np.load(path, mmap_mode='r')
+        if data.dtype != np.uint8 or data.ndim != 2 or data.shape[1] != COLUMNS:
+            raise ValueError(f"{path} : tableau (N, {COLUMNS}) d'octets attendu, {data.dtype} {data.shape} trouvé")
+        arrays.append(data)
+    return np.concatenate(arrays) if len(arrays) > 1 else arrays[0]
+
+
+def position_features(data):
+    """Termes de l'évaluation (N, 3) et résultats dans [0, 1] des positions.
+
+    Le résultat est celui du joueur qui vient de donner la pièce : c'est ainsi
+    que la recherche lit l'heuristique aux feuilles qui suivent notre coup joint.
+    """
+    features = np.concatenate([
+        pq.batch_features(np.ascontiguousarray(data[start:start + FIT_CHUNK, :16]))[0]
+        for start in range(0, len(data), FIT_CHUNK)
+    ]) if len(data) else np.zeros((0, 3), dtype=np.int64)
+    return features.astype(np.float64) * SIGNS, 1.0 - data[:, 17] / 2.0
+
+
+def loss(features, results, weights, scale, bias=0.0):
+    """Erreur quadratique moyenne entre résultats et sigmoïde(scale * évaluation + bias)"""
+    scores = features @ np.array([weights[name] for name in WEIGHT_NAMES], dtype=np.float64)
+    return float(np.mean((results - 1.0 / (1.0 + np.exp(-(scale * scores + bias)))) ** 2))
+
+
+def _golden(error, a, b, iterations=40):
+    """Minimum d'une fonction unimodale sur [a, b] (section dorée)"""
+    ratio = (np.sqrt(5) - 1) / 2
+    for _ in range(iterations):
+        c, d = b - ratio * (b - a), a + ratio * (b - a)
+        if error(c) < error(d):
+            b = d
+        else:
+            a = c
+    return (a + b) / 2
+
+
+def fit_bias(features, results, weights, scale):
+    """Décalage de la sigmoïde : l'heuristique n'est pas antisymétrique (un plateau
+    vaut autant pour les deux joueurs) et une constante ne change aucun choix de coup"""
+    return float(_golden(lambda bias: loss(features, results, weights, scale, bias), -4.0, 4.0))
+
+
+def fit_sigmoid(features, results, weights, rounds=3):
+    """Échelle K (section dorée sur log K) et décalage qui minimisent l'erreur pour ces poids"""
+    bias = 0.0
+    for _ in range(rounds):
+        scale = float(np.exp(_golden(lambda k: loss(features, results, weights, np.exp(k), bias),
+                                     np.log(1e-5), np.log(1.0))))
+        bias = fit_bias(features, results, weights, scale)
+    return scale, bias
+
+
+def tune(features, results, weights, scale, bias=0.0, steps=STEPS):
+    """Recherche locale de Texel : chaque poids bouge de ±pas tant que l'erreur baisse,
+    pas décroissants, dans les bornes de pq.set_eval_weights ; le décalage est
+    réajusté après chaque pas. Retourne (poids, décalage, erreur)"""
+    weights = dict(weights)
+    best = loss(features, results, weights, scale, bias)
+    for step in steps:
+        improved = True
+        while improved:
+            improved = False
+            for name in WEIGHT_NAMES:
+                for delta in (step, -step):
+                    trial = dict(weights, **{name: weights[name] + delta})
+                    if sum(abs(value) * pq.FEATURE_BOUNDS[key] for key, value in trial.items()) > pq.EVAL_LIMIT:
+                        continue
+                    error = loss(features, results, trial, scale, bias)
+                    if error < best:
+                        weights, best, improved = trial, error, True
+                        break
+        bias = fit_bias(features, results, weights, scale)
+        best = loss(features, results, weights, scale, bias)
+    return weights, bias, best
+
+
+def fit(data, weights=None):
+    """Ajuste les poids (par défaut ceux en vigueur) sur les positions ; retourne le
+    contenu du fichier de poids, statistiques de l'ajustement comprises.
+
+    L'échelle K est ajustée une fois pour les poids de départ puis fixée : sans
+    cela, poids et K pourraient grandir ensemble sans changer l'erreur.
+    """
+    weights = dict(weights or pq.eval_weights())
+    features, results = position_features(data)
+    scale, bias = fit_sigmoid(features, results, weights)
+    start = time.perf_counter()
+    before = loss(features, results, weights, scale, bias)
+    elapsed = time.perf_counter() - start
+    tuned, bias, after = tune(features, results, weights, scale, bias)
+    return {
+        "version": pq.BASE_EVAL_VERSION,
+        "weights": tuned,
+        "fit": {
+            "positions": len(results),
+            "scale": scale,
+            "bias": bias,
+            "start": weights,
+            "loss_before": before,
+            "loss_after": after,
+            "positions_per_s": round(len(results) / elapsed) if elapsed > 0 else None,
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    generate_parser = commands.add_parser("generate", help="génère des positions étiquetées")
+    generate_parser.add_argument("output", help="fichier .npy des positions")
+    generate_parser.add_argument("--games", type=int, default=100000, help="nombre de parties")
+    generate_parser.add_argument("--seed", type=int, default=0)
+    generate_parser.add_argument("--solve-empty", type=int, default=0,
+                                 help="cases vides à partir desquelles l'étiquette est le résultat exact (0 : jamais)")
+    generate_parser.add_argument("--workers", type=int, default=os.cpu_count(), help="nombre de processus")
+    fit_parser = commands.add_parser("fit", help="ajuste les poids sur des positions")
+    fit_parser.add_argument("inputs", nargs="+", help="fichiers .npy des positions")
+    fit_parser.add_argument("--output", default=pq.EVAL_WEIGHTS_PATH, help="fichier des poids")
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        start = time.perf_counter()
+        data = generate(args.games, args.seed, args.solve_empty, args.workers)
+        np.save(args.output, data)
+        print(f"{len(data)} positions de {args.games} parties écrites dans {args.output} "
+              f"({time.perf_counter() - start:.1f} s)")
+        return
+    result = fit(load_positions(args.inputs))
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2)
+    stats = result["fit"]
+    print(f"{stats['positions']} positions, K = {stats['scale']:.3g}, erreur {stats['loss_before']:.5f} -> "
+          f"{stats['loss_after']:.5f}, {stats['positions_per_s'] / 1e6:.0f} M positions évaluées/s")
+    print(f"poids {stats['start']} -> {result['weights']}, écrits dans {args.output}")
+
+
+if __name__ == '__main__':
+    main()